@@ -299,9 +299,15 @@ class ProxyProducer:
         print("    return Unpickler.call_threadsafe_method(target._proxy, target, method_name, *args, **kwargs)")
         print("")
         print("def get_property(target, property_name):")
+        print("    snapshot = getattr(target, \"_snapshot\", None)")
+        print("    if snapshot and property_name in snapshot:")
+        print("        return snapshot[property_name]")
         print("    return Unpickler.get_property(target._proxy, target, property_name)")
         print("")
         print("def set_property(target, property_name, value):")
+        print("    snapshot = getattr(target, \"_snapshot\", None)")
+        print("    if snapshot:")
+        print("        snapshot.pop(property_name, None)")
         print("    return Unpickler.set_property(target._proxy, target, property_name, value)")
 
     def print_class(self, class_name: str) -> None:
@@ -33,10 +33,12 @@ from nion.swift import ToolbarPanel
 from nion.swift import Workspace
 from nion.swift.model import ApplicationData
 from nion.swift.model import Cache
+from nion.swift.model import DataItem
 from nion.swift.model import ColorMaps
 from nion.swift.model import DocumentModel
 from nion.swift.model import FileStorageSystem
 from nion.swift.model import HardwareSource
+from nion.swift.model import NDataHandler
 from nion.swift.model import PlugInManager
 from nion.swift.model import Profile
 from nion.ui import Application as UIApplication
@@ -64,6 +66,7 @@ class Application(UIApplication.BaseApplication):
         # reset these values for tests. otherwise tests run slower after app.start is called in any previous test.
         DocumentModel.DocumentModel.computation_min_period = 0.0
         DocumentModel.DocumentModel.computation_min_factor = 0.0
+        DocumentModel.DocumentModel.computation_thread_count = 1
 
         logging.getLogger("migration").setLevel(logging.ERROR)
         logging.getLogger("loader").setLevel(logging.ERROR)
@@ -113,6 +116,9 @@ class Application(UIApplication.BaseApplication):
             app_data_file_path = self.ui.get_configuration_location() / pathlib.Path("nionswift_appdata.json")
             ApplicationData.set_file_path(app_data_file_path)
             logging.info("Application data: " + str(app_data_file_path))
+            app_data = ApplicationData.get_data()
+            NDataHandler.NDataHandler.use_memory_map = bool(app_data.get("ndata_memory_map", False))
+            DataItem.DataMemoryManager().memory_budget = int(app_data.get("data_memory_budget", 0))
             PlugInManager.load_plug_ins(self, get_root_dir() if use_root_dir else None)
             color_maps_dir = self.ui.get_configuration_location() / pathlib.Path("Color Maps")
             if color_maps_dir.exists():
@@ -183,6 +189,7 @@ class Application(UIApplication.BaseApplication):
         # configure the document model object.
         DocumentModel.DocumentModel.computation_min_period = 0.1
         DocumentModel.DocumentModel.computation_min_factor = 1.0
+        DocumentModel.DocumentModel.computation_thread_count = 4
 
         project_reference: typing.Optional[Profile.ProjectReference] = None
 
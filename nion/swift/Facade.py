@@ -1766,7 +1766,8 @@ class ViewTask:
                 self.__hardware_source.set_channel_enabled(channel_index, channel_enabled)
         if not self.__was_playing:
             self.__hardware_source.start_playing()
-        self.__data_channel_buffer = HardwareSourceModule.DataChannelBuffer(self.__hardware_source.data_channels, buffer_size)
+        # the grabbed frames are returned to the caller, so store each frame in its own array rather than in reused slots.
+        self.__data_channel_buffer = HardwareSourceModule.DataChannelBuffer(self.__hardware_source.data_channels, buffer_size, reuse_slots=False)
         self.__data_channel_buffer.start()
         self.on_will_start_frame = None  # prepare the hardware here
         self.on_did_finish_frame = None  # restore the hardware here, modify the data_and_metadata here
@@ -3460,7 +3461,7 @@ class API_1:
 def _new_api_object(object):
     if isinstance(object, DocumentModelModule.DocumentModel):
         return Library(object)
-    if isinstance(object, DataItemModule.DataItem):
+    if isinstance(object, (DataItemModule.DataItem, DataItemModule.DataItemTarget)):
         return DataItem(object)
     if isinstance(object, Graphics.Graphic):
         return Graphic(object)
@@ -3489,16 +3490,15 @@ def get_api(version: str, ui_version: str=None) -> API_1:
     return _get_api_with_app(version, ui_version, ApplicationModule.app)
 
 
-import base64
-import functools
 import io
 import pickle
+import socket
+import socketserver
 import threading
 
 from nion.data import Calibration
 from nion.data import DataAndMetadata
-
-from xmlrpc.server import SimpleXMLRPCServer
+from nion.swift.model import RemoteTransport
 
 all_classes = API_1, Application, DataGroup, DataItem, Display, DisplayPanel, DocumentWindow, HardwareSource, Instrument, Library, Graphic
 class_names = {API_1: "API"}
@@ -3508,26 +3508,69 @@ struct_names = {DataAndMetadata.DataAndMetadata: "ExtendedData"}
 
 class Pickler(pickle.Pickler):
 
+    def __init__(self, file, shared_paths: typing.Optional[typing.List[str]] = None, buffers: typing.Optional[typing.List] = None):
+        if buffers is not None and RemoteTransport.rpc_out_of_band:
+            super().__init__(file, protocol=RemoteTransport.rpc_pickle_protocol, buffer_callback=buffers.append)
+        else:
+            super().__init__(file)
+        # large arrays are only shared in files when the caller collects the paths to remove any the receiver skips.
+        # results returned by the server are never shared since the server cannot tell whether the client loads them.
+        self.__shared_paths = shared_paths
+        # when arrays can travel as out of band buffers, pass extended data arrays directly instead of encoding them.
+        self.__inline_arrays = buffers is not None and RemoteTransport.rpc_out_of_band
+
     @classmethod
-    def pickle(cls, x):
+    def dumps(cls, x, shared_paths: typing.Optional[typing.List[str]] = None) -> typing.Tuple[bytes, typing.List]:
+        """Pickle x for the binary rpc transport, returning the pickle and its out of band buffers."""
         f = io.BytesIO()
-        cls(f).dump(x)
-        return base64.b64encode(f.getvalue()).decode('utf-8')
+        buffers = list()
+        cls(f, shared_paths, buffers).dump(x)
+        return f.getvalue(), buffers
 
     def persistent_id(self, obj):
         for class_ in all_classes:
             if isinstance(obj, class_):
-                obj_specifier = obj.specifier
+                obj_specifier = getattr(obj, "specifier", None)  # the api object has no specifier
                 return class_names.get(class_, class_.__name__), getattr(obj_specifier, "rpc_dict", None)
         for struct in all_structs:
             if isinstance(obj, struct):
+                if isinstance(obj, DataAndMetadata.DataAndMetadata) and (self.__inline_arrays or RemoteTransport.is_shared_array(obj.data)):
+                    return RemoteTransport.shared_extended_data_type_tag, self.__make_shared_extended_data_dict(obj)
                 return struct_names.get(struct, struct.__name__), obj.rpc_dict
         return None
 
+    def __is_shared_array(self, data) -> bool:
+        return self.__shared_paths is not None and RemoteTransport.is_shared_array(data)
+
+    def __make_shared_extended_data_dict(self, xdata: DataAndMetadata.DataAndMetadata) -> dict:
+        # the persistent id is pickled without persistent ids, so it must be made of plain python values only.
+        data = xdata.data
+        if self.__is_shared_array(data):
+            handle = RemoteTransport.share_array(data)
+            self.__shared_paths.append(handle["path"])
+            d = {"data": handle}
+        else:
+            d = {"data": data}
+        if xdata.intensity_calibration:
+            d["intensity_calibration"] = xdata.intensity_calibration.rpc_dict
+        if xdata.dimensional_calibrations:
+            d["dimensional_calibrations"] = [dimensional_calibration.rpc_dict for dimensional_calibration in xdata.dimensional_calibrations]
+        if xdata.timestamp:
+            d["timestamp"] = xdata.timestamp
+        if xdata.metadata:
+            d["metadata"] = copy.deepcopy(xdata.metadata)
+        data_descriptor = xdata.data_descriptor
+        if data_descriptor:
+            d["data_descriptor"] = (data_descriptor.is_sequence, data_descriptor.collection_dimension_count, data_descriptor.datum_dimension_count)
+        return d
+
 
 class Unpickler(pickle.Unpickler):
-    def __init__(self, file, api):
-        super().__init__(file)
+    def __init__(self, file, api, buffers: typing.Optional[typing.Sequence] = None):
+        if buffers is not None and RemoteTransport.rpc_out_of_band:
+            super().__init__(file, buffers=buffers)
+        else:
+            super().__init__(file)
         self.__api = api
     def persistent_load(self, pid):
         type_tag, d = pid
@@ -3537,12 +3580,30 @@ class Unpickler(pickle.Unpickler):
         for struct in all_structs:
             if type_tag == struct_names.get(struct, struct.__name__):
                 return struct.from_rpc_dict(d)
+        if type_tag == RemoteTransport.shared_extended_data_type_tag:
+            return Unpickler.__load_shared_extended_data(d)
 
         # Always raises an error if you cannot return the correct object.
         # Otherwise, the unpickler will think None is the object referenced
         # by the persistent ID.
         raise pickle.UnpicklingError("unsupported persistent object")
 
+    @staticmethod
+    def __load_shared_extended_data(d: dict) -> DataAndMetadata.DataAndMetadata:
+        data = d["data"]
+        if isinstance(data, dict):
+            data = RemoteTransport.load_shared_array(data)
+        intensity_calibration = Calibration.Calibration.from_rpc_dict(d["intensity_calibration"]) if "intensity_calibration" in d else None
+        if "dimensional_calibrations" in d:
+            dimensional_calibrations = [Calibration.Calibration.from_rpc_dict(dc) for dc in d["dimensional_calibrations"]]
+        else:
+            dimensional_calibrations = None
+        data_descriptor = DataAndMetadata.DataDescriptor(*d["data_descriptor"]) if "data_descriptor" in d else None
+        return DataAndMetadata.new_data_and_metadata(data, intensity_calibration=intensity_calibration,
+                                                     dimensional_calibrations=dimensional_calibrations,
+                                                     metadata=d.get("metadata"), timestamp=d.get("timestamp"),
+                                                     data_descriptor=data_descriptor)
+
 
 def queued(method):
     def queued(*args, **kw):
@@ -3564,30 +3625,138 @@ def queued(method):
     return queued
 
 
-def call_threadsafe_method(api, pickled_object, method_name, pickled_args, pickled_kwargs):
-    object = Unpickler(io.BytesIO(base64.b64decode(pickled_object.encode('utf-8'))), api).load()
-    args = Unpickler(io.BytesIO(base64.b64decode(pickled_args.encode('utf-8'))), api).load()
-    kwargs = Unpickler(io.BytesIO(base64.b64decode(pickled_kwargs.encode('utf-8'))), api).load()
+def call_threadsafe_method(api, body: bytes, buffers: typing.Sequence) -> typing.Tuple[bytes, typing.List]:
+    object, method_name, args, kwargs = Unpickler(io.BytesIO(body), api, buffers).load()
     result = getattr(object, method_name)(*args, **kwargs)
-    return Pickler.pickle(result)
+    return Pickler.dumps(result)
 
 
 @queued
-def call_method(api, pickled_object, method_name, pickled_args, pickled_kwargs):
-    return call_threadsafe_method(api, pickled_object, method_name, pickled_args, pickled_kwargs)
+def call_method(api, body: bytes, buffers: typing.Sequence) -> typing.Tuple[bytes, typing.List]:
+    return call_threadsafe_method(api, body, buffers)
 
 
 @queued
-def get_property(api, pickled_object, name):
-    object = Unpickler(io.BytesIO(base64.b64decode(pickled_object.encode('utf-8'))), api).load()
-    return Pickler.pickle(getattr(object, name))
+def get_property(api, body: bytes, buffers: typing.Sequence) -> typing.Tuple[bytes, typing.List]:
+    object, name = Unpickler(io.BytesIO(body), api, buffers).load()
+    return Pickler.dumps(getattr(object, name))
 
 
 @queued
-def set_property(api, pickled_object, name, pickled_value):
-    object = Unpickler(io.BytesIO(base64.b64decode(pickled_object.encode('utf-8'))), api).load()
-    value = Unpickler(io.BytesIO(base64.b64decode(pickled_value.encode('utf-8'))), api).load()
+def set_property(api, body: bytes, buffers: typing.Sequence) -> typing.Tuple[bytes, typing.List]:
+    object, name, value = Unpickler(io.BytesIO(body), api, buffers).load()
     setattr(object, name, value)
+    return Pickler.dumps(None)
+
+
+# property values of these types are cheap to compute and pickle, so they can be fetched together in a snapshot.
+simple_property_types = (type(None), bool, int, float, str, dict, datetime.datetime, uuid_module.UUID, Calibration.Calibration)
+
+
+def is_simple_property_annotation(annotation) -> bool:
+    if annotation in simple_property_types:
+        return True
+    # typing constructs such as typing.Tuple[float, float] or typing.Union[float, NormPointType].
+    if getattr(annotation, "__origin__", None) in (tuple, list, typing.Union):
+        return all(is_simple_property_annotation(arg) for arg in annotation.__args__ if arg is not Ellipsis)
+    return False
+
+
+def get_simple_property_names(class_) -> typing.List[str]:
+    """Return the names of the released properties of the api class whose values are simple."""
+    property_names = list()
+    for name in getattr(class_, "release", list()):
+        member = getattr(class_, name, None)
+        if isinstance(member, property) and member.fget:
+            if is_simple_property_annotation(member.fget.__annotations__.get("return")):
+                property_names.append(name)
+    return property_names
+
+
+def get_properties(object, property_names: typing.Optional[typing.Sequence[str]] = None) -> typing.Dict[str, typing.Any]:
+    """Return a dict of property values, by default the simple properties of the object.
+
+    Some simple properties are only valid for some instances, for instance the bounds of a graphic depend on its type.
+    By default, properties which are not valid for the object are left out; named properties must be valid."""
+    if property_names is not None:
+        return {property_name: getattr(object, property_name) for property_name in property_names}
+    properties = dict()
+    for property_name in get_simple_property_names(type(object)):
+        try:
+            properties[property_name] = getattr(object, property_name)
+        except AttributeError:
+            pass
+    return properties
+
+
+@queued
+def call_batch(api, body: bytes, buffers: typing.Sequence) -> typing.Tuple[bytes, typing.List]:
+    """Run a list of operations in order with a single hop to the ui thread and return the list of their results.
+
+    Each operation is (kind, object, name, args, kwargs), where kind is call_method, get_property, set_property or
+    get_properties. The first operation to fail stops the batch."""
+    operations = Unpickler(io.BytesIO(body), api, buffers).load()
+    results = list()
+    for kind, object, name, args, kwargs in operations:
+        if kind == "get_property":
+            results.append(getattr(object, name))
+        elif kind == "set_property":
+            setattr(object, name, *args)
+            results.append(None)
+        elif kind == "get_properties":
+            results.append(get_properties(object, *args))
+        else:
+            results.append(getattr(object, name)(*args, **kwargs))
+    return Pickler.dumps(results)
+
+
+# thread safe calls run directly on the connection thread; the others are queued to the ui thread.
+remote_functions = {
+    "call_method": call_method,
+    "call_threadsafe_method": call_threadsafe_method,
+    "get_property": get_property,
+    "set_property": set_property,
+    "call_batch": call_batch,
+}
+
+def handle_remote_request(api, payload: bytes, buffers: typing.Sequence) -> typing.Tuple[bytes, typing.List]:
+    """Run the request and return the response payload and buffers.
+
+    The request payload is a pickle of (function name, body), where body is the argument pickle whose out of band
+    buffers are the frame buffers. The response is ("result", body) or ("error", (error type name, error string))."""
+    try:
+        function_name, body = pickle.loads(payload)
+        function = remote_functions.get(function_name)
+        if not function:
+            raise AttributeError("Unknown remote function: {}".format(function_name))
+        result_body, result_buffers = function(api, body, buffers)
+        return pickle.dumps(("result", result_body)), result_buffers
+    except Exception as e:
+        return pickle.dumps(("error", (type(e).__name__, str(e)))), list()
+
+
+class RemoteRequestHandler(socketserver.BaseRequestHandler):
+    """Serve requests on a connection until the client closes it."""
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                payload, buffers = RemoteTransport.receive_frame(self.request)
+            except (EOFError, ConnectionError):
+                return
+            response_payload, response_buffers = handle_remote_request(self.server.api, payload, buffers)
+            RemoteTransport.send_frame(self.request, response_payload, response_buffers)
+
+
+class RemoteServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Serve remote api calls, one thread per connection."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, api):
+        super().__init__(server_address, RemoteRequestHandler)
+        self.api = api
 
 
 class ObjectConverter:
@@ -3609,11 +3778,7 @@ class ObjectConverter:
 
 
 def runOnThread(api):
-    server = SimpleXMLRPCServer(("localhost", 8199), allow_none=True, logRequests=False)
-    server.register_function(functools.partial(call_method, api), "call_method")
-    server.register_function(functools.partial(call_threadsafe_method, api), "call_threadsafe_method")
-    server.register_function(functools.partial(get_property, api), "get_property")
-    server.register_function(functools.partial(set_property, api), "set_property")
+    server = RemoteServer(("localhost", 8199), api)
     server.serve_forever()
 
 
@@ -476,9 +476,50 @@ class StatisticsWidget(Widgets.CompositeWidgetBase):
 
 # import asyncio
 
+def get_display_data_key(display_values: typing.Optional[DisplayItem.DisplayValues]) -> typing.Optional[typing.Tuple]:
+    # display data is identified by the data generation and the parameters used to calculate it from the data rather
+    # than by its array, since display values calculate new arrays for sequence, collection, complex and rgb data.
+    return display_values.display_data_key if display_values else None
+
+
+def calculate_data_statistics(data: numpy.ndarray, calculate_range: bool, chunk_element_count: int = 1 << 18) -> typing.Tuple:
+    """Return the mean, std, rms, min, and max of the data in a single pass.
+
+    The data is processed in chunks along its first axis so that each chunk stays in cache while its statistics are
+    calculated, and the chunk statistics are then combined. The min and max are None unless calculate_range is True.
+    """
+    chunk_length = max(1, chunk_element_count // max(1, data.size // max(1, data.shape[0]))) if data.ndim > 0 else 1
+    chunks = [data[i:i + chunk_length] for i in range(0, data.shape[0], chunk_length)] if data.ndim > 0 else [data]
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    data_min = data_max = None
+    for chunk in chunks:
+        chunk_count = chunk.size
+        chunk_mean = numpy.mean(chunk, dtype=numpy.float64)
+        chunk_deviation = chunk - chunk_mean
+        chunk_m2 = numpy.sum(numpy.square(numpy.absolute(chunk_deviation)), dtype=numpy.float64)
+        # combine the chunk mean and sum of squared deviations with the running values (Chan et al.)
+        delta = chunk_mean - mean
+        total_count = count + chunk_count
+        mean += delta * chunk_count / total_count
+        m2 += chunk_m2 + numpy.square(numpy.absolute(delta)) * count * chunk_count / total_count
+        count = total_count
+        if calculate_range:
+            chunk_min, chunk_max = numpy.amin(chunk), numpy.amax(chunk)
+            data_min = chunk_min if data_min is None else min(data_min, chunk_min)
+            data_max = chunk_max if data_max is None else max(data_max, chunk_max)
+    std = numpy.sqrt(m2 / count)
+    rms = numpy.sqrt(m2 / count + numpy.square(numpy.absolute(mean)))
+    return mean, std, rms, data_min, data_max
+
+
 class HistogramPanel(Panel.Panel):
     """ A panel to present a histogram of the selected data item. """
 
+    # the histogram is calculated from a strided sample of frames larger than this.
+    histogram_sample_threshold = 1024 * 1024
+
     def __init__(self, document_controller, panel_id, properties, debounce=True, sample=True):
         super().__init__(document_controller, panel_id, _("Histogram"))
 
@@ -498,29 +539,26 @@ class HistogramPanel(Panel.Panel):
                         return cropped_data_and_metadata
             return display_data_and_metadata
 
-        def calculate_region_data_func(display_data_and_metadata, region):
-            return functools.partial(calculate_region_data, display_data_and_metadata, region)
+        def calculate_region_data_and_statistics(display_data_and_metadata, region, data_statistics):
+            # the display data statistics are shared with the display values; the data of a region has none.
+            region_data_and_metadata = calculate_region_data(display_data_and_metadata, region)
+            return region_data_and_metadata, data_statistics if region_data_and_metadata is display_data_and_metadata else None
+
+        def calculate_region_data_func(display_data_and_metadata, region, data_statistics):
+            return functools.partial(calculate_region_data_and_statistics, display_data_and_metadata, region, data_statistics)
 
         def calculate_histogram_widget_data(display_data_and_metadata_func, display_range):
             bins = 320
-            subsample = 0  # hard coded subsample size
-            subsample_fraction = None  # fraction of total pixels
-            subsample_min = 1024  # minimum subsample size
-            display_data_and_metadata = display_data_and_metadata_func()
+            display_data_and_metadata, data_statistics = display_data_and_metadata_func()
             display_data = display_data_and_metadata.data if display_data_and_metadata else None
             if display_data is not None:
-                total_pixels = numpy.product(display_data.shape, dtype=numpy.uint64)
-                if not subsample and subsample_fraction:
-                    subsample = min(max(total_pixels * subsample_fraction, subsample_min), total_pixels)
-                if subsample:
-                    factor = total_pixels / subsample
-                    data_sample = numpy.random.choice(display_data.reshape(numpy.product(display_data.shape, dtype=numpy.uint64)), subsample)
-                else:
-                    factor = 1.0
-                    data_sample = numpy.copy(display_data)
-                if display_range is None or data_sample is None:
+                if display_range is None:
                     return HistogramWidgetData()
-                histogram_data = factor * numpy.histogram(data_sample, range=display_range, bins=bins)[0]
+                if data_statistics is None:
+                    # data statistics works on (possibly strided) views of the data; large regions are sampled.
+                    data_statistics = DisplayItem.DataStatistics(display_data)
+                    data_statistics.sample_threshold = HistogramPanel.histogram_sample_threshold
+                histogram_data = data_statistics.get_histogram(bins, display_range)
                 histogram_max = numpy.max(histogram_data)  # assumes that histogram_data is int
                 if histogram_max > 0:
                     histogram_data = histogram_data / float(histogram_max)
@@ -533,11 +571,10 @@ class HistogramPanel(Panel.Panel):
         display_item_stream = TargetDisplayItemStream(document_controller)
         display_data_channel_stream = StreamPropertyStream(display_item_stream, "display_data_channel")
         region_stream = TargetRegionStream(display_item_stream)
-        def compare_data(a, b):
-            return numpy.array_equal(a.data if a else None, b.data if b else None)
-        display_data_and_metadata_stream = DisplayDataChannelTransientsStream(display_data_channel_stream, "display_data_and_metadata", cmp=compare_data)
+        display_data_and_metadata_stream = DisplayDataChannelTransientsStream(display_data_channel_stream, "display_data_and_metadata", key_fn=get_display_data_key)
+        data_statistics_stream = DisplayDataChannelTransientsStream(display_data_channel_stream, "data_statistics", key_fn=get_display_data_key)
         display_range_stream = DisplayDataChannelTransientsStream(display_data_channel_stream, "display_range")
-        region_data_and_metadata_func_stream = Stream.CombineLatestStream((display_data_and_metadata_stream, region_stream), calculate_region_data_func)
+        region_data_and_metadata_func_stream = Stream.CombineLatestStream((display_data_and_metadata_stream, region_stream, data_statistics_stream), calculate_region_data_func)
         histogram_widget_data_func_stream = Stream.CombineLatestStream((region_data_and_metadata_func_stream, display_range_stream), calculate_histogram_widget_data_func)
         color_map_data_stream = StreamPropertyStream(display_data_channel_stream, "color_map_data", cmp=numpy.array_equal)
         if debounce:
@@ -563,18 +600,14 @@ class HistogramPanel(Panel.Panel):
         self._histogram_widget = HistogramWidget(document_controller, display_item_stream, self.__histogram_widget_data_model, self.__color_map_data_model, cursor_changed_fn)
 
         def calculate_statistics(display_data_and_metadata_func, display_data_range, region, displayed_intensity_calibration):
-            display_data_and_metadata = display_data_and_metadata_func()
+            display_data_and_metadata, data_statistics = display_data_and_metadata_func()
             data = display_data_and_metadata.data if display_data_and_metadata else None
             data_range = display_data_range
             if data is not None and data.size > 0 and displayed_intensity_calibration:
-                mean = numpy.mean(data)
-                std = numpy.std(data)
-                rms = numpy.sqrt(numpy.mean(numpy.square(numpy.absolute(data))))
+                mean, std, rms, data_min, data_max = calculate_data_statistics(data, region is not None)
                 sum_data = mean * functools.reduce(operator.mul, Image.dimensional_shape_from_shape_and_dtype(data.shape, data.dtype))
                 if region is None:
                     data_min, data_max = data_range if data_range is not None else (None, None)
-                else:
-                    data_min, data_max = numpy.amin(data), numpy.amax(data)
                 mean_str = displayed_intensity_calibration.convert_to_calibrated_value_str(mean)
                 std_str = displayed_intensity_calibration.convert_to_calibrated_value_str(std)
                 data_min_str = displayed_intensity_calibration.convert_to_calibrated_value_str(data_min)
@@ -767,13 +800,19 @@ class StreamPropertyStream(Stream.ConcatStream):
 class DisplayDataChannelTransientsStream(Stream.AbstractStream):
     # TODO: add a display_data_changed to Display class and use it here
 
-    def __init__(self, display_data_channel_stream, property_name, cmp=None):
+    def __init__(self, display_data_channel_stream, property_name, cmp=None, key_fn=None):
         super().__init__()
         # outgoing messages
         self.value_stream = Event.Event()
         # initialize
         self.__property_name = property_name
         self.__value = None
+        # values are compared using their keys, if a key function is specified, which are calculated from the display
+        # values when the value is set.
+        self.__key_fn = key_fn
+        self.__has_key_fn = key_fn is not None
+        self.__no_key = object()
+        self.__key = self.__no_key
         self.__display_values_changed_listener = None
         self.__next_calculated_display_values_listener = None
         self.__cmp = cmp if cmp else operator.eq
@@ -798,8 +837,10 @@ class DisplayDataChannelTransientsStream(Stream.AbstractStream):
         def display_values_changed():
             display_values = display_data_channel.get_calculated_display_values(True)
             new_value = getattr(display_values, self.__property_name) if display_values else None
-            if not self.__cmp(new_value, self.__value):
+            new_key = self.__key_fn(display_values) if self.__has_key_fn else new_value
+            if not self.__cmp(new_key, self.__key):
                 self.__value = new_value
+                self.__key = new_key
                 self.value_stream.fire(self.__value)
         if self.__next_calculated_display_values_listener:
             self.__next_calculated_display_values_listener.close()
@@ -807,6 +848,8 @@ class DisplayDataChannelTransientsStream(Stream.AbstractStream):
         if self.__display_values_changed_listener:
             self.__display_values_changed_listener.close()
             self.__display_values_changed_listener = None
+        # the key of the values of another display data channel is not comparable; always send its first value.
+        self.__key = self.__no_key
         if display_data_channel:
             # there are two listeners - the first when new display properties have triggered new display values.
             # the second whenever actual new display values arrive. this ensures the display gets updated after
@@ -373,6 +373,20 @@ def calculate_origin_and_size(canvas_size, data_shape, image_canvas_mode, image_
     return image_canvas_origin, image_canvas_size
 
 
+def calculate_display_level(data_shape: typing.Optional[typing.Sequence[int]], canvas_size: typing.Optional[Geometry.IntSize], level_count: int) -> int:
+    """Return the level of display data to draw into a canvas of canvas_size.
+
+    Each level halves the size of the data in each dimension. The returned level is the highest level which still has
+    at least as many pixels as the canvas in each dimension, so that reducing the data does not lose visible detail.
+    """
+    if not data_shape or len(data_shape) != 2 or not canvas_size or canvas_size.height <= 0 or canvas_size.width <= 0:
+        return 0
+    level = 0
+    while level + 1 < level_count and data_shape[0] >> (level + 1) >= canvas_size.height and data_shape[1] >> (level + 1) >= canvas_size.width:
+        level += 1
+    return level
+
+
 class ImageCanvasItem(CanvasItem.LayerCanvasItem):
     """A canvas item to paint an image.
 
@@ -1241,7 +1255,10 @@ class ImageCanvasItem(CanvasItem.LayerCanvasItem):
         if self.__data_shape is not None:
             # configure the bitmap canvas item
             display_values = self.__display_values
-            display_data = display_values.transformed_display_data
+            # use the smallest level of the display data which is at least as large as the displayed bitmap. levels
+            # above 0 are float32 and always take the first branch.
+            level = calculate_display_level(self.__data_shape, self.__bitmap_canvas_item.canvas_size, display_values.level_count)
+            display_data = display_values.get_transformed_display_data_level(level)
             if display_data is not None and display_data.dtype == numpy.float32:
                 display_range = display_values.transformed_display_range
                 color_map_data = display_values.color_map_data
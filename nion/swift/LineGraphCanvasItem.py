@@ -43,43 +43,37 @@ def nice_label(value: float, precision: int) -> str:
         return (u"{0:0." + u"{0:d}".format(precision) + "f}").format(value)
 
 
+def calculate_data_range(uncalibrated_data: numpy.ndarray, data_style: str) -> typing.Tuple[float, float]:
+    if data_style == "log":
+        positive_data = uncalibrated_data[uncalibrated_data > 0]
+        return numpy.amin(positive_data, initial=numpy.inf), numpy.amax(positive_data, initial=-numpy.inf)
+    return numpy.amin(uncalibrated_data), numpy.amax(uncalibrated_data)
+
+
 def calculate_y_axis(uncalibrated_data_list, data_min, data_max, y_calibration, data_style):
     y_calibration = y_calibration if y_calibration else Calibration.Calibration()
 
     min_specified = data_min is not None
     max_specified = data_max is not None
 
+    # gather the minimum and maximum of each layer in one loop over the layers rather than one loop per limit.
+    data_ranges = list()
+    if not min_specified or not max_specified:
+        for uncalibrated_data in uncalibrated_data_list or list():
+            if uncalibrated_data is not None and uncalibrated_data.shape[-1] > 0:
+                data_ranges.append(calculate_data_range(uncalibrated_data, data_style))
+
     if min_specified:
         uncalibrated_data_min = data_min
     else:
-        uncalibrated_data_min = None
-        for uncalibrated_data in uncalibrated_data_list:
-            if uncalibrated_data is not None and uncalibrated_data.shape[-1] > 0:
-                if data_style == "log":
-                    partial_uncalibrated_data_min = numpy.amin(uncalibrated_data[uncalibrated_data > 0], initial=numpy.inf)
-                else:
-                    partial_uncalibrated_data_min = numpy.amin(uncalibrated_data)
-                if uncalibrated_data_min is not None:
-                    uncalibrated_data_min = min(uncalibrated_data_min, partial_uncalibrated_data_min)
-                else:
-                    uncalibrated_data_min = partial_uncalibrated_data_min
+        uncalibrated_data_min = min(data_range[0] for data_range in data_ranges) if data_ranges else None
         if uncalibrated_data_min is None or not numpy.isfinite(uncalibrated_data_min):
                 uncalibrated_data_min = 0.0
 
     if max_specified:
         uncalibrated_data_max = data_max
     else:
-        uncalibrated_data_max = None
-        for uncalibrated_data in uncalibrated_data_list:
-            if uncalibrated_data is not None and uncalibrated_data.shape[-1] > 0:
-                if data_style == "log":
-                    partial_uncalibrated_data_max = numpy.amax(uncalibrated_data[uncalibrated_data > 0], initial=-numpy.inf)
-                else:
-                    partial_uncalibrated_data_max = numpy.amax(uncalibrated_data)
-                if uncalibrated_data_max is not None:
-                    uncalibrated_data_max = max(uncalibrated_data_max, partial_uncalibrated_data_max)
-                else:
-                    uncalibrated_data_max = partial_uncalibrated_data_max
+        uncalibrated_data_max = max(data_range[1] for data_range in data_ranges) if data_ranges else None
         if uncalibrated_data_max is None or not numpy.isfinite(uncalibrated_data_max):
             uncalibrated_data_max = 0.0
 
@@ -338,6 +332,51 @@ def draw_vertical_grid_lines(drawing_context, plot_height, plot_origin_y, x_tick
         drawing_context.stroke()
 
 
+def decimate_envelope_1d(data: numpy.ndarray, binned_length: int) -> typing.List[numpy.ndarray]:
+    """Return the minimum and maximum of each of binned_length bins of data.
+
+    Unlike averaging, the envelope preserves narrow peaks when there are more channels than pixels. A bin containing
+    nan is nan in both returned arrays.
+    """
+    length = data.shape[-1]
+    assert 0 < binned_length <= length
+    bin_starts = numpy.arange(binned_length) * length // binned_length
+    return [numpy.minimum.reduceat(data, bin_starts), numpy.maximum.reduceat(data, bin_starts)]
+
+
+def calculate_line_graph_path(pys: numpy.ndarray, px_origin: int, start_py: float, end_px: int, end_py: typing.Optional[float]) -> typing.Tuple[typing.List[float], typing.List[float]]:
+    """Return the vertices of a stepped line graph path through pixel y-coordinates.
+
+    pys has a row per value to visit at each pixel (one row, or two rows for a min/max envelope) and a column per
+    pixel starting at px_origin. The path starts at start_py, steps across each pixel and ends with a horizontal line
+    to end_px, dropping to end_py if it is not None. Vertices which do not change the shape of the path are removed.
+    """
+    rows, width = pys.shape
+    # each pixel is entered at the level the previous pixel was left at, then visits each of its values.
+    pixel_pys = numpy.empty((width, rows + 1))
+    pixel_pys[0, 0] = start_py
+    pixel_pys[1:, 0] = pys[-1, :-1]
+    pixel_pys[:, 1:] = pys.T
+    xs = numpy.repeat(numpy.arange(px_origin, px_origin + width, dtype=float), rows + 1)
+    ys = pixel_pys.reshape(-1)
+    end_xs = [end_px] + ([end_px] if end_py is not None else [])
+    end_ys = [ys[-1]] + ([end_py] if end_py is not None else [])
+    xs = numpy.concatenate((xs, end_xs))
+    ys = numpy.concatenate((ys, end_ys))
+    # drop repeated vertices, then vertices in the middle of a horizontal or vertical run in the same direction.
+    distinct = numpy.concatenate(([True], (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])))
+    xs = xs[distinct]
+    ys = ys[distinct]
+    if len(xs) > 2:
+        dx0, dx1 = xs[1:-1] - xs[:-2], xs[2:] - xs[1:-1]
+        dy0, dy1 = ys[1:-1] - ys[:-2], ys[2:] - ys[1:-1]
+        redundant = ((dy0 == 0) & (dy1 == 0) & (dx0 * dx1 > 0)) | ((dx0 == 0) & (dx1 == 0) & (dy0 * dy1 > 0))
+        keep = numpy.concatenate(([True], ~redundant, [True]))
+        xs = xs[keep]
+        ys = ys[keep]
+    return xs.tolist(), ys.tolist()
+
+
 def draw_line_graph(drawing_context, plot_height, plot_width, plot_origin_y, plot_origin_x, calibrated_xdata, calibrated_data_min, calibrated_data_range, calibrated_left_channel, calibrated_right_channel, x_calibration, fill_color: str, stroke_color: str, rebin_cache, data_style: str):
     # calculate how the data is displayed
     xdata_calibration = calibrated_xdata.dimensional_calibrations[-1]
@@ -372,7 +411,6 @@ def draw_line_graph(drawing_context, plot_height, plot_width, plot_origin_y, plo
     uncalibrated_right_channel = x_calibration.convert_from_calibrated_value(calibrated_right_channel)
     uncalibrated_width = uncalibrated_right_channel - uncalibrated_left_channel
     with drawing_context.saver():
-        stroke_path = DrawingContext.DrawingContext()
         drawing_context.begin_path()
         if calibrated_data_range != 0.0 and uncalibrated_width > 0.0:
             if data_style == "log":
@@ -385,55 +423,38 @@ def draw_line_graph(drawing_context, plot_height, plot_width, plot_origin_y, plo
             # rebin so that uncalibrated_width corresponds to plot width
             calibrated_data = calibrated_xdata.data
             binned_length = int(calibrated_data.shape[-1] * plot_width / uncalibrated_width)
-            shape_origin_x = plot_origin_x
-            shape_origin_y = baseline
-            did_draw = False
             if binned_length > 0:
-                binned_data = Image.rebin_1d(calibrated_data, binned_length, rebin_cache)
+                if binned_length < calibrated_data.shape[-1]:
+                    # more channels than pixels; draw the min/max envelope so peaks are not averaged away.
+                    binned_data_list = decimate_envelope_1d(calibrated_data, binned_length)
+                else:
+                    binned_data_list = [Image.rebin_1d(calibrated_data, binned_length, rebin_cache)]
                 binned_left = int(uncalibrated_left_channel * plot_width / uncalibrated_width)
-                # draw the plot
-                px = plot_origin_x
-                last_py = baseline
-                for i in range(0, plot_width):
-                    px = plot_origin_x + i
-                    binned_index = binned_left + i
-                    data_value = binned_data[binned_index] if binned_index >= 0 and binned_index < binned_length else numpy.nan
-                    if not numpy.isnan(data_value):
-                        # plot_origin_y is the TOP of the drawing
-                        # py extends DOWNWARDS
-                        py = plot_origin_y + plot_height - (plot_height * (data_value - calibrated_data_min) / calibrated_data_range)
-                        py = max(plot_origin_y, py)
-                        py = min(plot_origin_y + plot_height, py)
-                        if did_draw:
-                            # only draw horizontal lines when necessary
-                            if py != last_py:
-                                # draw forward from last_px to px at last_py level
-                                stroke_path.line_to(px, last_py)
-                                stroke_path.line_to(px, py)
-                        else:
-                            did_draw = True
-                            shape_origin_x = px
-                            shape_origin_y = baseline
-                            if i == 0:
-                                stroke_path.move_to(px, py)
-                            else:
-                                stroke_path.move_to(px, baseline)
-                                stroke_path.line_to(px, py)
-                        last_py = py
-                    else:
-                        if did_draw:
-                            did_draw = False
-                            stroke_path.line_to(px, last_py)
-                            if stroke_color and not fill_color:
-                                stroke_path.line_to(px, shape_origin_y)
-                            finalize_path(drawing_context, stroke_path, shape_origin_x, px, shape_origin_y, fill_color, stroke_color)
-                            stroke_path = DrawingContext.DrawingContext()
-                            drawing_context.begin_path()
-
-                stroke_path.line_to(plot_origin_x + plot_width, last_py)
-
-                if did_draw:
-                    finalize_path(drawing_context, stroke_path, shape_origin_x, px, shape_origin_y, fill_color, stroke_color)
+                binned_indexes = numpy.arange(binned_left, binned_left + plot_width)
+                binned_valid = (binned_indexes >= 0) & (binned_indexes < binned_length)
+                # calculate the y-coordinate(s) of every pixel; nan marks pixels without data.
+                # plot_origin_y is the TOP of the drawing; py extends DOWNWARDS.
+                pys = numpy.full((len(binned_data_list), plot_width), numpy.nan)
+                for row, binned_data in enumerate(binned_data_list):
+                    pys[row, binned_valid] = plot_origin_y + plot_height - (plot_height * (binned_data[binned_indexes[binned_valid]] - calibrated_data_min) / calibrated_data_range)
+                pys = numpy.clip(pys, plot_origin_y, plot_origin_y + plot_height)
+                # find the runs of pixels with data; each run is drawn as its own shape.
+                pixel_drawn = numpy.concatenate(([False], ~numpy.isnan(pys).any(axis=0), [False]))
+                run_edges = numpy.flatnonzero(pixel_drawn[1:] != pixel_drawn[:-1])
+                for run_start, run_end in zip(run_edges[0::2].tolist(), run_edges[1::2].tolist()):
+                    shape_origin_x = plot_origin_x + run_start
+                    shape_end_x = plot_origin_x + run_end
+                    start_py = pys[0, run_start] if run_start == 0 else baseline
+                    end_py = baseline if run_end < plot_width and stroke_color and not fill_color else None
+                    pxs, path_pys = calculate_line_graph_path(pys[:, run_start:run_end], shape_origin_x, start_py, shape_end_x, end_py)
+                    stroke_path = DrawingContext.DrawingContext()
+                    stroke_path.move_to(pxs[0], path_pys[0])
+                    for px, py in zip(pxs[1:], path_pys[1:]):
+                        stroke_path.line_to(px, py)
+                    # the fill of a run reaching the right edge closes at the last pixel, as the stroke ends at the edge.
+                    fill_end_x = shape_end_x - 1 if run_end == plot_width else shape_end_x
+                    finalize_path(drawing_context, stroke_path, shape_origin_x, fill_end_x, baseline, fill_color, stroke_color)
+                    drawing_context.begin_path()
 
         else:
             if fill_color or stroke_color:
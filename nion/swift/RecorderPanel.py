@@ -42,6 +42,8 @@ class Recorder:
         self.__recording_error = False
         self.__recording_interval = None
         self.__recording_count = None
+        self.__recording_data_metadata = None
+        self.__recording_frame_count = 0
 
         def data_item_content_changed():
             is_live = data_item.is_live
@@ -54,7 +56,7 @@ class Recorder:
         # called when an item is removed from the document
         def item_removed(key, value, index):
             if value == self.__recording_data_item:
-                self.__stop_recording()
+                self.__stop_recording(trim=False)
             if value == self.__data_item:
                 self.__stop_recording()
                 if callable(self.on_data_item_removed):
@@ -179,20 +181,14 @@ class Recorder:
                     # no first image yet
                     return
                 # now record the new data. it may or may not be a new frame at this point.
-                last_xdata = self.__recording_data_item.xdata
+                recording_data_metadata = self.__recording_data_metadata
                 self.__recording_index += 1
-                if current_xdata and last_xdata and current_xdata.data_shape == self.__recording_data_item.data_shape[1:]:
-                    # continue, append the new data to existing data and update existing data item
-                    intensity_calibration = last_xdata.intensity_calibration
-                    dimensional_calibrations = last_xdata.dimensional_calibrations
-                    data_descriptor = last_xdata.data_descriptor
-                    sequence_xdata = DataAndMetadata.new_data_and_metadata(
-                        numpy.vstack([last_xdata.data, [current_xdata.data]]),
-                        intensity_calibration=intensity_calibration, dimensional_calibrations=dimensional_calibrations,
-                        data_descriptor=data_descriptor)
-                    self.__recording_data_item.set_xdata(sequence_xdata)
-                elif current_xdata and not last_xdata:
-                    # first acquisition, create the sequence
+                if current_xdata and recording_data_metadata and current_xdata.data_shape_and_dtype == (recording_data_metadata.data_shape[1:], recording_data_metadata.data_dtype) and self.__recording_frame_count < recording_data_metadata.data_shape[0]:
+                    # continue, write the new frame in place
+                    self.__write_recording_frame(current_xdata)
+                elif current_xdata and not recording_data_metadata:
+                    # first acquisition, reserve the sequence for all frames and write the first frame. the sequence is
+                    # written in place, frame by frame, and trimmed if the recording stops early.
                     intensity_calibration = current_xdata.intensity_calibration
                     dimensional_calibrations = [Calibration.Calibration(scale=self.__recording_interval,
                                                                         units="s")] + list(
@@ -200,11 +196,13 @@ class Recorder:
                     data_descriptor = DataAndMetadata.DataDescriptor(True,
                                                                      current_xdata.data_descriptor.collection_dimension_count,
                                                                      current_xdata.data_descriptor.datum_dimension_count)
-                    sequence_xdata = DataAndMetadata.new_data_and_metadata(current_xdata.data[numpy.newaxis, ...],
-                                                                           intensity_calibration=intensity_calibration,
-                                                                           dimensional_calibrations=dimensional_calibrations,
-                                                                           data_descriptor=data_descriptor)
-                    self.__recording_data_item.set_xdata(sequence_xdata)
+                    data_shape = (max(self.__recording_count, 1),) + tuple(current_xdata.data_shape)
+                    self.__recording_data_item.reserve_data(data_shape=data_shape, data_dtype=current_xdata.data_dtype, data_descriptor=data_descriptor)
+                    self.__recording_data_item.set_intensity_calibration(intensity_calibration)
+                    self.__recording_data_item.set_dimensional_calibrations(dimensional_calibrations)
+                    self.__recording_data_metadata = self.__recording_data_item.xdata.data_metadata
+                    self.__recording_frame_count = 0
+                    self.__write_recording_frame(current_xdata)
                     self.__recording_transaction = self.__document_model.item_transaction(self.__recording_data_item)
                 else:
                     # something is amiss. stop.
@@ -214,6 +212,27 @@ class Recorder:
             if self.__recording_index >= self.__recording_count:
                 self.__stop_recording()
 
+    def __write_recording_frame(self, xdata: DataAndMetadata.DataAndMetadata) -> None:
+        # write only the region of the new frame into the reserved sequence.
+        frame_index = self.__recording_frame_count
+        frame_slices = tuple(slice(0, n) for n in xdata.data_shape)
+        frame_xdata = DataAndMetadata.new_data_and_metadata(xdata.data[numpy.newaxis, ...])
+        self.__recording_data_item.set_data_and_metadata_partial(self.__recording_data_metadata, frame_xdata,
+                                                                 (slice(0, 1),) + frame_slices,
+                                                                 (slice(frame_index, frame_index + 1),) + frame_slices)
+        self.__recording_frame_count += 1
+
+    def __trim_recording(self) -> None:
+        # remove the frames reserved but not recorded.
+        recording_xdata = self.__recording_data_item.xdata
+        if recording_xdata and 0 < self.__recording_frame_count < recording_xdata.data_shape[0]:
+            sequence_xdata = DataAndMetadata.new_data_and_metadata(
+                numpy.array(recording_xdata.data[:self.__recording_frame_count]),
+                intensity_calibration=recording_xdata.intensity_calibration,
+                dimensional_calibrations=recording_xdata.dimensional_calibrations,
+                data_descriptor=recording_xdata.data_descriptor)
+            self.__recording_data_item.set_xdata(sequence_xdata)
+
     def start_recording(self, recording_start: float, recording_interval: float, recording_count: int) -> None:
         self.__recording_state = "recording"
         self.__recording_start = recording_start
@@ -227,16 +246,20 @@ class Recorder:
     def stop_recording(self):
         self.__stop_recording()
 
-    def __stop_recording(self):
+    def __stop_recording(self, *, trim: bool = True):
         if self.__recording_state == "recording":
             self.__recording_state = "stopped"
             self.__recording_start = 0.0
             self.__recording_index = 0
             self.__recording_error = False
             if self.__recording_data_item and self.__recording_transaction:
+                if trim:
+                    self.__trim_recording()
                 self.__recording_transaction.close()
                 self.__recording_transaction = None
                 self.__recording_data_item = None
+                self.__recording_data_metadata = None
+                self.__recording_frame_count = 0
             if callable(self.on_recording_state_changed):
                 self.on_recording_state_changed(self.__recording_state)
 
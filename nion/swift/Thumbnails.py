@@ -3,10 +3,10 @@
 """
 
 # standard libraries
-import concurrent.futures
 import threading
 import time
 import typing
+import zlib
 
 # third-party libraries
 import numpy
@@ -21,9 +21,95 @@ from nion.utils import Event
 from nion.utils import ReferenceCounting
 
 
+def encode_thumbnail_data(thumbnail_data: numpy.ndarray) -> typing.Dict:
+    """Return the thumbnail data compressed for storing in the display cache."""
+    thumbnail_data = numpy.ascontiguousarray(thumbnail_data)
+    return {"shape": thumbnail_data.shape, "dtype": thumbnail_data.dtype.str, "data": zlib.compress(thumbnail_data.tobytes(), 1)}
+
+
+def decode_thumbnail_data(value) -> typing.Optional[numpy.ndarray]:
+    """Return the thumbnail data from a value stored in the display cache. Uncompressed arrays are also accepted."""
+    if isinstance(value, dict):
+        return numpy.frombuffer(bytearray(zlib.decompress(value["data"])), dtype=numpy.dtype(value["dtype"])).reshape(value["shape"])
+    return value
+
+
+class ThumbnailScheduler(metaclass=Utility.Singleton):
+    """Recompute thumbnails on a bounded number of worker threads.
+
+    Pending thumbnails which are ready are recomputed in order of priority, highest first. Thumbnail processors use
+    the time their thumbnail was last requested as the priority so that thumbnails being drawn, for instance those
+    visible in the data panel, are produced before the others. Worker threads exit when nothing is pending.
+    """
+
+    max_workers = 2
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__pending = dict()  # type: typing.Dict["ThumbnailProcessor", typing.Tuple[float, UserInterface.UserInterface]]
+        self.__running = set()
+        self.__worker_count = 0
+
+    def schedule(self, thumbnail_processor: "ThumbnailProcessor", ui: UserInterface.UserInterface, ready_time: float) -> None:
+        """Schedule the thumbnail processor to be recomputed at or after ready_time. Thread safe."""
+        with self.__condition:
+            pending = self.__pending.get(thumbnail_processor)
+            self.__pending[thumbnail_processor] = (min(ready_time, pending[0]) if pending else ready_time, ui)
+            if self.__worker_count < min(max(ThumbnailScheduler.max_workers, 1), len(self.__pending)):
+                self.__worker_count += 1
+                threading.Thread(target=self.__run, name="thumbnail", daemon=True).start()
+            self.__condition.notify_all()
+
+    def cancel(self, thumbnail_processor: "ThumbnailProcessor") -> None:
+        """Remove the thumbnail processor from the pending recomputes. Thread safe."""
+        with self.__condition:
+            self.__pending.pop(thumbnail_processor, None)
+            self.__condition.notify_all()
+
+    def __next_thumbnail_processor(self) -> typing.Tuple[typing.Optional["ThumbnailProcessor"], typing.Optional[UserInterface.UserInterface]]:
+        # wait for the highest priority ready processor not already being recomputed. return None when nothing is
+        # pending. must be called with the condition held.
+        while self.__pending:
+            current_time = time.time()
+            next_ready_time = None
+            ready_thumbnail_processor = None
+            for thumbnail_processor, (ready_time, ui) in self.__pending.items():
+                if thumbnail_processor in self.__running:
+                    continue
+                if ready_time <= current_time:
+                    if ready_thumbnail_processor is None or thumbnail_processor.priority > ready_thumbnail_processor.priority:
+                        ready_thumbnail_processor = thumbnail_processor
+                else:
+                    next_ready_time = min(next_ready_time, ready_time) if next_ready_time is not None else ready_time
+            if ready_thumbnail_processor:
+                return ready_thumbnail_processor, self.__pending.pop(ready_thumbnail_processor)[1]
+            self.__condition.wait(next_ready_time - current_time if next_ready_time is not None else None)
+        return None, None
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                thumbnail_processor, ui = self.__next_thumbnail_processor()
+                if not thumbnail_processor:
+                    self.__worker_count -= 1
+                    return
+                self.__running.add(thumbnail_processor)
+            try:
+                thumbnail_processor.recompute_data(ui)
+            except Exception:
+                pass  # exceptions are reported by the thumbnail processor
+            finally:
+                with self.__condition:
+                    self.__running.discard(thumbnail_processor)
+                    self.__condition.notify_all()
+
+
 class ThumbnailProcessor:
     """Processes thumbnails for a display in a thread."""
-    _executor = concurrent.futures.ThreadPoolExecutor()
+
+    # recomputes are delayed to gather changes and are limited to one per interval.
+    gather_interval = 0.05
+    minimum_recompute_interval = 0.5
 
     def __init__(self, display_item: DisplayItem.DisplayItem):
         self.__display_item = display_item
@@ -31,29 +117,30 @@ class ThumbnailProcessor:
         self.__cache = self.__display_item._display_cache
         self.__cache_property_name = "thumbnail_data"
         self.__cached_value_time = 0
-        self.__is_recomputing_lock = threading.RLock()
-        self.__is_recompute_pending = False
+        self.__cached_value = None
+        self.__thumbnail_data = None
         self.width = 256
         self.height = 256
+        self.priority = time.time()
         self.on_thumbnail_updated = None
-        self.__recompute_future = None
         self.__recompute_lock = threading.RLock()
-        self.__recompute_thread_cancel = threading.Event()
+        self.__closed = False
 
     def close(self):
         self.on_thumbnail_updated = None
-        recompute_future = self.__recompute_future  # avoid race by using local
-        if recompute_future:
-            self.__recompute_thread_cancel.set()
-            concurrent.futures.wait([recompute_future])
+        self.__cancel()
 
     def __about_to_close_display_item(self) -> None:
-        recompute_future = self.__recompute_future  # avoid race by using local
-        if recompute_future:
-            self.__recompute_thread_cancel.set()
-            concurrent.futures.wait([recompute_future])
+        self.__cancel()
         self.__display_item = None
 
+    def __cancel(self) -> None:
+        # remove any pending recompute and wait for a running recompute to finish.
+        self.__closed = True
+        ThumbnailScheduler().cancel(self)
+        with self.__recompute_lock:
+            pass
+
     # used internally and for testing
     @property
     def _is_cached_value_dirty(self):
@@ -64,40 +151,26 @@ class ThumbnailProcessor:
         """ Called from item to indicate its data or metadata has changed."""
         self.__cache.set_cached_value_dirty(self.__display_item, self.__cache_property_name)
 
-    def __get_cached_value(self) -> typing.Optional[numpy.ndarray]:
-        return self.__cache.get_cached_value(self.__display_item, self.__cache_property_name)
+    # thread safe
+    def mark_requested(self) -> None:
+        """Called when the thumbnail is requested, raising the priority of its recompute."""
+        self.priority = time.time()
 
-    def __recompute_task(self, ui: UserInterface.UserInterface) -> None:
-        while True:
-            try:
-                if self.__recompute_thread_cancel.wait(0.05):  # gather changes and helps tests run faster
-                    return
-                minimum_time = 0.5
-                current_time = time.time()
-                if current_time < self.__cached_value_time + minimum_time:
-                    if self.__recompute_thread_cancel.wait(self.__cached_value_time + minimum_time - current_time):
-                        return
-                self.__is_recompute_pending = False  # any pending calls up to this point will be realized in the recompute
-                self.recompute_data(ui)
-            finally:
-                with self.__is_recomputing_lock:
-                    # the only way the thread can end is if not pending within lock.
-                    # recompute_future can only be set within lock.
-                    if not self.__is_recompute_pending:
-                        self.__recompute_future = None
-                        break
+    def __get_cached_value(self) -> typing.Optional[numpy.ndarray]:
+        value = self.__cache.get_cached_value(self.__display_item, self.__cache_property_name)
+        # only decode the value when it changes.
+        cached_value = self.__cached_value
+        if value is not cached_value and not (isinstance(value, dict) and isinstance(cached_value, dict) and value["data"] == cached_value["data"]):
+            self.__thumbnail_data = decode_thumbnail_data(value)
+            self.__cached_value = value
+        return self.__thumbnail_data
 
     def recompute(self, ui: UserInterface.UserInterface) -> None:
         # recompute the thumbnail data on a thread.
-        # if already computing, ensure the thread recomputes again.
+        # if already computing, the scheduler ensures the thread recomputes again.
         # may be called on the main thread or a thread - must return quickly in both cases.
-        with self.__is_recomputing_lock:
-            # in case thread is already running, set pending.
-            # the only way the thread can end is if not pending within lock.
-            # recompute_future can only be set within lock.
-            self.__is_recompute_pending = True
-            if not self.__recompute_future:
-                self.__recompute_future = ThumbnailProcessor._executor.submit(self.__recompute_task, ui)
+        ready_time = max(time.time() + ThumbnailProcessor.gather_interval, self.__cached_value_time + ThumbnailProcessor.minimum_recompute_interval)
+        ThumbnailScheduler().schedule(self, ui, ready_time)
 
     def recompute_data(self, ui):
         """Compute the data associated with this processor.
@@ -107,6 +180,8 @@ class ThumbnailProcessor:
          and the cache will not be marked dirty.
         """
         with self.__recompute_lock:
+            if self.__closed:
+                return
             try:
                 calculated_data = self.__get_calculated_data(ui)
             except Exception as e:
@@ -116,7 +191,7 @@ class ThumbnailProcessor:
                 raise
             if calculated_data is None:
                 calculated_data = numpy.zeros((self.height, self.width), dtype=numpy.uint32)
-            self.__cache.set_cached_value(self.__display_item, self.__cache_property_name, calculated_data)
+            self.__cache.set_cached_value(self.__display_item, self.__cache_property_name, encode_thumbnail_data(calculated_data))
             self.__cached_value_time = time.time()
         if callable(self.on_thumbnail_updated):
             self.on_thumbnail_updated()
@@ -129,6 +204,8 @@ class ThumbnailProcessor:
         return self.__get_cached_value()
 
     def __get_calculated_data(self, ui):
+        # the display canvas item draws reduced size display data for large images, so the preview is rendered
+        # from downsampled data.
         drawing_context, shape = DisplayPanel.preview(DisplayPanel.DisplayPanelUISettings(ui), self.__display_item, 512, 512)
         thumbnail_drawing_context = DrawingContext.DrawingContext()
         thumbnail_drawing_context.scale(self.width / 512, self.height / 512)
@@ -190,7 +267,11 @@ class ThumbnailSource(ReferenceCounting.ReferenceCounted):
 
     @property
     def thumbnail_data(self):
-        return self.__thumbnail_processor.get_cached_data() if self.__thumbnail_processor else None
+        thumbnail_processor = self.__thumbnail_processor
+        if thumbnail_processor:
+            thumbnail_processor.mark_requested()
+            return thumbnail_processor.get_cached_data()
+        return None
 
     def recompute_data(self):
         self.__thumbnail_processor.recompute_data(self._ui)
@@ -6,7 +6,6 @@ import os
 import pickle
 import queue
 import sqlite3
-import sys
 import threading
 
 # third party libraries
@@ -39,6 +38,12 @@ class TracingCache:
         logging.debug("# %s", result)
         return result
 
+    def get_cached_values(self, targets, keys):
+        logging.debug("%s.get_cached_values(%s, %s)", id(self), [id(target) for target in targets], keys)
+        result = self.__storage_cache.get_cached_values(targets, keys)
+        logging.debug("# %s", result)
+        return result
+
     def remove_cached_value(self, target, key):
         logging.debug("%s.remove_cached_value(%s, %s)", id(self), target, key)
         self.__storage_cache.remove_cached_value(target, key)
@@ -127,6 +132,22 @@ class SuspendableCache:
             return self.__storage_cache.get_cached_value(target, key, default_value)
         return default_value
 
+    # grab the last cached values for the keys of each target. returns a list of dicts mapping key to value,
+    # one for each target. keys with no cached value are not included.
+    def get_cached_values(self, targets, keys):
+        cached_values_list = self.__storage_cache.get_cached_values(targets, keys) if self.__storage_cache else [dict() for _ in targets]
+        # overlay the temporary cache.
+        with self.__cache_mutex:
+            for target, cached_values in zip(targets, cached_values_list):
+                _, object_dict = self.__cache.get(id(target), (target, dict()))
+                _, object_list = self.__cache_remove.get(id(target), (target, list()))
+                for key in keys:
+                    if key in object_dict:
+                        cached_values[key] = object_dict[key]
+                    elif key in object_list:
+                        cached_values.pop(key, None)
+        return cached_values_list
+
     # removing values from the cache happens immediately under a transaction.
     # this is an area of improvement if it becomes a bottleneck.
     def remove_cached_value(self, target, key):
@@ -181,6 +202,7 @@ class ShadowCache:
         self.__cache = dict()
         self.__cache_remove = list()
         self.__cache_dirty = dict()
+        self.__cache_prefetched = dict()
         self.__cache_mutex = threading.RLock()
         self.__cache_delayed = False
 
@@ -214,9 +236,17 @@ class ShadowCache:
             for key in cache_remove:
                 self.storage_cache.remove_cached_value(target, key)
 
+    # store values read in bulk from the other cache (see get_cached_values) so that the first read does not
+    # need to go to the other cache. the values are dropped when they are read, changed, or removed.
+    def prefetch_cached_values(self, cached_values):
+        with self.__cache_mutex:
+            self.__cache_prefetched.update(cached_values)
+
     # update the value in the cache. usually updating a value in the cache
     # means it will no longer be dirty.
     def set_cached_value(self, target, key, value, dirty=False):
+        with self.__cache_mutex:
+            self.__cache_prefetched.pop(key, None)
         # if transaction count is 0, cache directly
         if self.storage_cache and not self.__cache_delayed:
             self.storage_cache.set_cached_value(target, key, value, dirty)
@@ -234,6 +264,8 @@ class ShadowCache:
         with self.__cache_mutex:
             if key in self.__cache:
                 return self.__cache.get(key)
+            if key in self.__cache_prefetched:
+                return self.__cache_prefetched.pop(key)
         # not there, go to cache db
         if self.storage_cache:
             return self.storage_cache.get_cached_value(target, key, default_value)
@@ -247,6 +279,7 @@ class ShadowCache:
             self.storage_cache.remove_cached_value(target, key)
         # if its in the temporary cache, remove it
         with self.__cache_mutex:
+            self.__cache_prefetched.pop(key, None)
             if key in self.__cache:
                 del self.__cache[key]
             if key in self.__cache_dirty:
@@ -323,6 +356,13 @@ class DictStorageCache:
         cache = self.__cache.setdefault(target.uuid, dict())
         return cache.get(key, default_value)
 
+    def get_cached_values(self, targets, keys):
+        cached_values_list = list()
+        for target in targets:
+            cache = self.__cache.get(target.uuid, dict())
+            cached_values_list.append({key: cache[key] for key in keys if key in cache})
+        return cached_values_list
+
     def remove_cached_value(self, target, key):
         cache = self.__cache.setdefault(target.uuid, dict())
         cache_dirty = self.__cache_dirty.setdefault(target.uuid, dict())
@@ -341,10 +381,17 @@ class DictStorageCache:
 
 
 class DbStorageCache:
+    """Cache values in a sqlite database.
+
+    All database access happens on a single worker thread. Writes are queued and do not block the caller (write
+    behind); consecutive queued writes are coalesced into a single transaction of up to max_batch_size writes.
+    Reads wait for any queued writes to complete.
+    """
     count = 0  # useful for detecting leaks in tests
 
-    def __init__(self, cache_filename):
+    def __init__(self, cache_filename, *, max_batch_size: int = 256):
         DbStorageCache.count += 1
+        self.__max_batch_size = max(max_batch_size, 1)
         self.__queue = queue.Queue()
         self.__queue_lock = threading.RLock()
         self.__started_event = threading.Event()
@@ -373,18 +420,34 @@ class DbStorageCache:
         self.conn.execute("PRAGMA synchronous = OFF")
         self.__create()
         self.__started_event.set()
+        pending_action = None
         while True:
-            action = self.__queue.get()
+            action = pending_action if pending_action else self.__queue.get()
+            pending_action = None
             item, result, event, action_name = action
             # logging.debug("item %s  result %s  event %s  action %s", item, result, event, action_name)
+            if item and result is None:
+                # a write. gather any following queued writes and perform them in one transaction.
+                batch = [action]
+                while len(batch) < self.__max_batch_size:
+                    try:
+                        next_action = self.__queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if next_action[0] and next_action[1] is None:
+                        batch.append(next_action)
+                    else:
+                        pending_action = next_action
+                        break
+                self.__execute_batch(batch)
+                for _ in batch:
+                    self.__queue.task_done()
+                continue
             if item:
                 try:
                     # logging.debug("EXECUTE %s", action_name)
                     # start = time.time()
-                    if result is not None:
-                        result.append(item())
-                    else:
-                        item()
+                    result.append(item())
                     # elapsed = time.time() - start
                     # logging.debug("ELAPSED %s", elapsed)
                 except Exception as e:
@@ -402,12 +465,39 @@ class DbStorageCache:
         self.conn.close()
         self.conn = None
 
+    def __execute_batch(self, batch):
+        try:
+            with self.conn:
+                for item, result, event, action_name in batch:
+                    try:
+                        item()
+                    except Exception as e:
+                        import traceback
+                        logging.debug("DB Error: %s (%s)", e, action_name)
+                        traceback.print_exc()
+        except Exception as e:
+            import traceback
+            logging.debug("DB Error: %s", e)
+            traceback.print_exc()
+            traceback.print_stack()
+        finally:
+            for item, result, event, action_name in batch:
+                if event:
+                    event.set()
+
     def __create(self):
         with self.conn:
-            self.execute("CREATE TABLE IF NOT EXISTS cache(uuid STRING, key STRING, value BLOB, dirty INTEGER, PRIMARY KEY(uuid, key))")
+            # the original 'cache' table declared its text columns as STRING, which sqlite treats as numeric affinity.
+            # values are stored in 'cache_values' with text affinity; copy the values from the original table when
+            # creating it. the original table is left in place for older versions opening the same cache.
+            table_names = {row[0] for row in self.execute("SELECT name FROM sqlite_master WHERE type='table'", ())}
+            if "cache_values" not in table_names:
+                self.execute("CREATE TABLE cache_values(uuid TEXT, key TEXT, value BLOB, dirty INTEGER, PRIMARY KEY(uuid, key))")
+                if "cache" in table_names:
+                    self.execute("INSERT OR IGNORE INTO cache_values (uuid, key, value, dirty) SELECT CAST(uuid AS TEXT), CAST(key AS TEXT), value, dirty FROM cache")
 
     def execute(self, stmt, args=None, log=False):
-        if args:
+        if args is not None:
             result = self.conn.execute(stmt, args)
             if log:
                 logging.debug("%s [%s]", stmt, args)
@@ -418,47 +508,56 @@ class DbStorageCache:
                 logging.debug("%s", stmt)
             return None
 
-    def __set_cached_value(self, target, key, value, dirty=False):
-        with self.conn:
-            self.execute("INSERT OR REPLACE INTO cache (uuid, key, value, dirty) VALUES (?, ?, ?, ?)",
-                         (str(target.uuid), key, sqlite3.Binary(pickle.dumps(value, 0)), 1 if dirty else 0))
+    def __set_cached_value(self, target_uuid_str, key, value_bytes, dirty=False):
+        self.execute("INSERT OR REPLACE INTO cache_values (uuid, key, value, dirty) VALUES (?, ?, ?, ?)",
+                     (target_uuid_str, key, sqlite3.Binary(value_bytes), 1 if dirty else 0))
 
-    def __get_cached_value(self, target, key, default_value=None):
-        last_result = self.execute("SELECT value FROM cache WHERE uuid=? AND key=?", (str(target.uuid), key))
+    def __get_cached_value(self, target_uuid_str, key, default_value=None):
+        last_result = self.execute("SELECT value FROM cache_values WHERE uuid=? AND key=?", (target_uuid_str, key))
         value_row = last_result.fetchone()
         if value_row is not None:
-            if sys.version < '3':
-                result = pickle.loads(bytes(bytearray(value_row[0])))
-            else:
-                result = pickle.loads(value_row[0], encoding='latin1')
-            return result
+            return pickle.loads(value_row[0], encoding='latin1')
         else:
             return default_value
 
-    def __remove_cached_value(self, target, key):
-        with self.conn:
-            self.execute("DELETE FROM cache WHERE uuid=? AND key=?", (str(target.uuid), key))
+    def __get_cached_values(self, target_uuid_strs, keys):
+        cached_values_dict = {target_uuid_str: dict() for target_uuid_str in target_uuid_strs}
+        keys = list(keys)
+        # stay well below the sqlite limit on the number of query parameters.
+        chunk_size = max(1, 500 - len(keys))
+        for i in range(0, len(target_uuid_strs), chunk_size):
+            target_uuid_strs_chunk = target_uuid_strs[i:i + chunk_size]
+            stmt = "SELECT uuid, key, value FROM cache_values WHERE uuid IN ({}) AND key IN ({})".format(
+                ", ".join("?" * len(target_uuid_strs_chunk)), ", ".join("?" * len(keys)))
+            for target_uuid_str, key, value in self.execute(stmt, tuple(target_uuid_strs_chunk) + tuple(keys)):
+                try:
+                    cached_values_dict[target_uuid_str][key] = pickle.loads(value, encoding='latin1')
+                except Exception as e:
+                    logging.debug("DB Error: %s", e)
+        return [cached_values_dict[target_uuid_str] for target_uuid_str in target_uuid_strs]
 
-    def __is_cached_value_dirty(self, target, key):
-        last_result = self.execute("SELECT dirty FROM cache WHERE uuid=? AND key=?", (str(target.uuid), key))
+    def __remove_cached_value(self, target_uuid_str, key):
+        self.execute("DELETE FROM cache_values WHERE uuid=? AND key=?", (target_uuid_str, key))
+
+    def __is_cached_value_dirty(self, target_uuid_str, key):
+        last_result = self.execute("SELECT dirty FROM cache_values WHERE uuid=? AND key=?", (target_uuid_str, key))
         value_row = last_result.fetchone()
         if value_row is not None:
             return value_row[0] != 0
         else:
             return True
 
-    def __set_cached_value_dirty(self, target, key, dirty=True):
-        with self.conn:
-            self.execute("UPDATE cache SET dirty=? WHERE uuid=? AND key=?", (1 if dirty else 0, str(target.uuid), key))
+    def __set_cached_value_dirty(self, target_uuid_str, key, dirty=True):
+        self.execute("UPDATE cache_values SET dirty=? WHERE uuid=? AND key=?", (1 if dirty else 0, target_uuid_str, key))
 
     def set_cached_value(self, target, key, value, dirty=False):
         assert target is not None
-        event = threading.Event()
+        # pickle on the calling thread so that later changes to value do not affect the cached value.
+        value_bytes = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
         with self.__queue_lock:
             _queue = self.__queue
         if _queue:
-            _queue.put((functools.partial(self.__set_cached_value, target, key, value, dirty), None, event, "set_cached_value"))
-        # event.wait()
+            _queue.put((functools.partial(self.__set_cached_value, str(target.uuid), key, value_bytes, dirty), None, None, "set_cached_value"))
 
     def get_cached_value(self, target, key, default_value=None):
         assert target is not None
@@ -467,18 +566,31 @@ class DbStorageCache:
         with self.__queue_lock:
             _queue = self.__queue
         if _queue:
-            _queue.put((functools.partial(self.__get_cached_value, target, key, default_value), result, event, "get_cached_value"))
+            _queue.put((functools.partial(self.__get_cached_value, str(target.uuid), key, default_value), result, event, "get_cached_value"))
             event.wait()
         return result[0] if len(result) > 0 else None
 
+    def get_cached_values(self, targets, keys):
+        """Return the cached values for the keys of each target in a single query.
+
+        Returns a list of dicts mapping key to value, one for each target. Keys with no cached value are not included.
+        """
+        event = threading.Event()
+        result = list()
+        with self.__queue_lock:
+            _queue = self.__queue
+        if _queue:
+            target_uuid_strs = [str(target.uuid) for target in targets]
+            _queue.put((functools.partial(self.__get_cached_values, target_uuid_strs, keys), result, event, "get_cached_values"))
+            event.wait()
+        return result[0] if len(result) > 0 else [dict() for _ in targets]
+
     def remove_cached_value(self, target, key):
         assert target is not None
-        event = threading.Event()
         with self.__queue_lock:
             _queue = self.__queue
         if _queue:
-            _queue.put((functools.partial(self.__remove_cached_value, target, key), None, event, "remove_cached_value"))
-        # event.wait()
+            _queue.put((functools.partial(self.__remove_cached_value, str(target.uuid), key), None, None, "remove_cached_value"))
 
     def is_cached_value_dirty(self, target, key):
         assert target is not None
@@ -487,15 +599,13 @@ class DbStorageCache:
         with self.__queue_lock:
             _queue = self.__queue
         if _queue:
-            _queue.put((functools.partial(self.__is_cached_value_dirty, target, key), result, event, "is_cached_value_dirty"))
+            _queue.put((functools.partial(self.__is_cached_value_dirty, str(target.uuid), key), result, event, "is_cached_value_dirty"))
             event.wait()
         return result[0]
 
     def set_cached_value_dirty(self, target, key, dirty=True):
         assert target is not None
-        event = threading.Event()
         with self.__queue_lock:
             _queue = self.__queue
         if _queue:
-            _queue.put((functools.partial(self.__set_cached_value_dirty, target, key, dirty), None, event, "set_cached_value_dirty"))
-        # event.wait()
+            _queue.put((functools.partial(self.__set_cached_value_dirty, str(target.uuid), key, dirty), None, None, "set_cached_value_dirty"))
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 # standard libraries
 import abc
+import collections
 import copy
 import datetime
 import functools
@@ -120,6 +121,131 @@ class SessionManager(abc.ABC):
         pass
 
 
+class DataMemoryManager(metaclass=Utility.Singleton):
+    """Track resident data item data and keep recently released data loaded within a memory budget.
+
+    Data items report when their data is first referenced and when the last reference is released. Normally
+    unloadable data is unloaded as soon as the last reference is released. When a memory budget (in bytes) is
+    set, the manager instead holds a reference to the released data and unloads the least recently used
+    released data once the total resident size exceeds the budget. Referenced data is counted but never
+    unloaded by the manager. A budget of zero (the default) disables retention. The application sets the
+    budget from the "data_memory_budget" application data setting.
+
+    Data items are tracked by weak reference and their entries are dropped when they are closed or collected.
+    """
+
+    def __init__(self):
+        self.__lock = threading.RLock()
+        # maps data item weak reference to [data_and_metadata, nbytes, is_held]; ordered from least to most
+        # recently used. a weak reference compares equal to any other weak reference to the same live data item.
+        # data_and_metadata is only kept for held entries since it refers back to its data item.
+        self.__entries: typing.OrderedDict[weakref.ReferenceType, typing.List] = collections.OrderedDict()
+        self.__memory_budget = 0
+        self.__resident_bytes = 0
+        self.__eviction_count = 0
+
+    @property
+    def memory_budget(self) -> int:
+        return self.__memory_budget
+
+    @memory_budget.setter
+    def memory_budget(self, value: int) -> None:
+        with self.__lock:
+            self.__memory_budget = max(0, int(value or 0))
+            evicted = self.__evict()
+        self.__release(evicted)
+
+    @property
+    def resident_bytes(self) -> int:
+        """Return the total size of the data referenced by data items or retained by the manager."""
+        return self.__resident_bytes
+
+    @property
+    def retained_bytes(self) -> int:
+        """Return the size of the data retained by the manager that is not otherwise referenced."""
+        with self.__lock:
+            return sum(entry[1] for entry in self.__entries.values() if entry[2])
+
+    @property
+    def eviction_count(self) -> int:
+        return self.__eviction_count
+
+    def reset_statistics(self) -> None:
+        self.__eviction_count = 0
+
+    def data_acquired(self, data_item: DataItem, data_and_metadata: DataAndMetadata.DataAndMetadata) -> None:
+        # called when the data reference count of the data item goes from zero to one. the data item now holds
+        # the data, so any reference held by the manager is released.
+        with self.__lock:
+            entry = self.__entries.pop(weakref.ref(data_item), None)
+            if entry:
+                self.__resident_bytes -= entry[1]
+            released = [entry[0]] if entry and entry[2] else list()
+            nbytes = self.__get_nbytes(data_and_metadata)
+            self.__entries[weakref.ref(data_item, self.__data_item_collected)] = [None, nbytes, False]
+            self.__resident_bytes += nbytes
+            released.extend(self.__evict())
+        self.__release(released)
+
+    def data_released(self, data_item: DataItem, data_and_metadata: DataAndMetadata.DataAndMetadata) -> None:
+        # called when the data reference count of the data item is about to go from one to zero. if retaining,
+        # the manager takes a reference to the data before the data item releases its own.
+        with self.__lock:
+            entry = self.__entries.pop(weakref.ref(data_item), None)
+            if entry:
+                self.__resident_bytes -= entry[1]
+            released = [entry[0]] if entry and entry[2] else list()
+            if self.__memory_budget > 0 and data_and_metadata.unloadable:
+                data_and_metadata.increment_data_ref_count()
+                nbytes = self.__get_nbytes(data_and_metadata)
+                self.__entries[weakref.ref(data_item, self.__data_item_collected)] = [data_and_metadata, nbytes, True]
+                self.__resident_bytes += nbytes
+                released.extend(self.__evict())
+        self.__release(released)
+
+    def discard(self, data_item: DataItem) -> None:
+        # called when the data item is closed or its data is replaced.
+        with self.__lock:
+            entry = self.__entries.pop(weakref.ref(data_item), None)
+            if entry:
+                self.__resident_bytes -= entry[1]
+            released = [entry[0]] if entry and entry[2] else list()
+        self.__release(released)
+
+    def __data_item_collected(self, data_item_ref: weakref.ReferenceType) -> None:
+        # called when a data item that was never closed is garbage collected.
+        with self.__lock:
+            entry = self.__entries.pop(data_item_ref, None)
+            if entry:
+                self.__resident_bytes -= entry[1]
+            released = [entry[0]] if entry and entry[2] else list()
+        self.__release(released)
+
+    def __get_nbytes(self, data_and_metadata: DataAndMetadata.DataAndMetadata) -> int:
+        data_shape_and_dtype = data_and_metadata.data_shape_and_dtype
+        if data_shape_and_dtype and data_shape_and_dtype[0] is not None and data_shape_and_dtype[1] is not None:
+            return int(numpy.prod(data_shape_and_dtype[0], dtype=numpy.int64)) * numpy.dtype(data_shape_and_dtype[1]).itemsize
+        return 0
+
+    def __evict(self) -> typing.List[DataAndMetadata.DataAndMetadata]:
+        # remove held entries, least recently used first, until within budget. must be called with lock held.
+        # the caller releases the returned data outside of the lock.
+        evicted = list()
+        for data_item_ref, entry in list(self.__entries.items()):
+            if self.__resident_bytes <= self.__memory_budget:
+                break
+            if entry[2]:
+                self.__entries.pop(data_item_ref)
+                self.__resident_bytes -= entry[1]
+                self.__eviction_count += 1
+                evicted.append(entry[0])
+        return evicted
+
+    def __release(self, released: typing.Sequence[DataAndMetadata.DataAndMetadata]) -> None:
+        for data_and_metadata in released:
+            data_and_metadata.decrement_data_ref_count()
+
+
 # dates are _local_ time and must use this specific ISO 8601 format. 2013-11-17T08:43:21.389391
 # time zones are offsets (east of UTC) in the following format "+HHMM" or "-HHMM"
 # daylight savings times are time offset (east of UTC) in format "+MM" or "-MM"
@@ -242,6 +368,9 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
         self.__pending_xdata_lock = threading.RLock()
         self.__pending_xdata = None
         self.__pending_queue = list()
+        self.__data_changes_lock = threading.RLock()
+        self.__data_generation = 0
+        self.__data_changes = collections.deque(maxlen=16)  # (generation, dst slices or None when all data changed)
         self.__content_changed = False
         self.__suspendable_storage_cache = None
         self.__display_data_channel_refs = set()  # display data channels referencing this data item
@@ -295,6 +424,7 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
     def close(self) -> None:
         self.__source_proxy.close()
         self.__source_proxy = None
+        DataMemoryManager().discard(self)
         self.__data_and_metadata = None
         super().close()
 
@@ -512,7 +642,10 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
                 self.__data_and_metadata = DataAndMetadata.DataAndMetadata(self.__load_data, data_shape_and_dtype, intensity_calibration, dimensional_calibrations, metadata, timestamp,
                                                                            data_descriptor=data_descriptor, timezone=self.timezone, timezone_offset=self.timezone_offset)
                 with self.__data_ref_count_mutex:
+                    DataMemoryManager().discard(self)
                     self.__data_and_metadata._add_data_ref_count(self.__data_ref_count)
+                    if self.__data_ref_count > 0:
+                        DataMemoryManager().data_acquired(self, self.__data_and_metadata)
                 self.__data_and_metadata.unloadable = self.persistent_object_context is not None
             else:
                 metadata = self._get_persistent_property_value("metadata")
@@ -754,6 +887,8 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
             self.__data_ref_count += 1
             if self.__data_and_metadata:
                 self.__data_and_metadata.increment_data_ref_count()
+                if initial_count == 0:
+                    DataMemoryManager().data_acquired(self, self.__data_and_metadata)
         return initial_count+1
 
     def decrement_data_ref_count(self):
@@ -762,6 +897,8 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
             self.__data_ref_count -= 1
             final_count = self.__data_ref_count
             if self.__data_and_metadata:
+                if final_count == 0:
+                    DataMemoryManager().data_released(self, self.__data_and_metadata)
                 self.__data_and_metadata.decrement_data_ref_count()
         return final_count
 
@@ -1001,9 +1138,13 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
         with self.__data_ref_count_mutex:
             if self.__data_and_metadata:
                 self.__data_and_metadata._subtract_data_ref_count(self.__data_ref_count)
+            DataMemoryManager().discard(self)
             self.__data_and_metadata = data_and_metadata
             if self.__data_and_metadata:
                 self.__data_and_metadata._add_data_ref_count(self.__data_ref_count)
+                if self.__data_ref_count > 0:
+                    DataMemoryManager().data_acquired(self, self.__data_and_metadata)
+        self.__record_data_change(None)
         if self.__data_and_metadata:
             self._set_persistent_property_value("data_shape", self.__data_and_metadata.data_shape)
             self._set_persistent_property_value("data_dtype", DtypeToStringConverter().convert(self.__data_and_metadata.data_dtype))
@@ -1066,6 +1207,11 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
         self.increment_data_ref_count()
         try:
             if self.persistent_object_context:
+                # record the data descriptor first so that storage can choose a layout suited to it.
+                if data_descriptor:
+                    self._set_persistent_property_value("is_sequence", data_descriptor.is_sequence)
+                    self._set_persistent_property_value("collection_dimension_count", data_descriptor.collection_dimension_count)
+                    self._set_persistent_property_value("datum_dimension_count", data_descriptor.datum_dimension_count)
                 self.reserve_external_data("data", data_shape, data_dtype)
                 data = self.__load_data()
                 data_shape_and_dtype = data_shape, data_dtype
@@ -1114,12 +1260,41 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
                     assert self.__data_and_metadata.data_dtype == data_metadata.data_dtype
                     assert self.__data_and_metadata.data_dtype == data_and_metadata.data_dtype
                     self.__data_and_metadata.data[dst] = data_and_metadata.data[src]
+                    self.__record_data_change(dst)
                     if self.persistent_object_context and not self.is_write_delayed:
-                        self.write_external_data("data", self.__data_and_metadata.data)
+                        self.write_external_data_partial("data", self.__data_and_metadata.data, dst)
                         self.__data_and_metadata.unloadable = True
             finally:
                 self.decrement_data_ref_count()
 
+    def __record_data_change(self, dst: typing.Optional[typing.Sequence[slice]]) -> None:
+        with self.__data_changes_lock:
+            self.__data_generation += 1
+            self.__data_changes.append((self.__data_generation, tuple(dst) if dst is not None else None))
+
+    @property
+    def data_generation(self) -> int:
+        """Return a number which increases each time the data changes, either fully or partially."""
+        return self.__data_generation
+
+    def get_changed_data_slices(self, generation: int) -> typing.Optional[typing.List[typing.Tuple[slice, ...]]]:
+        """Return the list of destination slices changed since generation.
+
+        Returns None if all of the data may have changed or if the changes are no longer known.
+        """
+        with self.__data_changes_lock:
+            if generation == self.__data_generation:
+                return list()
+            if not self.__data_changes or self.__data_changes[0][0] > generation + 1:
+                return None
+            changed_data_slices = list()
+            for change_generation, dst in self.__data_changes:
+                if change_generation > generation:
+                    if dst is None:
+                        return None
+                    changed_data_slices.append(dst)
+            return changed_data_slices
+
     @property
     def data_shape(self):
         return self.__data_and_metadata.data_shape if self.__data_and_metadata else None
@@ -1239,6 +1414,173 @@ class DataItem(Observable.Observable, Persistence.PersistentObject):
         Metadata.delete_metadata_value(self, key)
 
 
+class DataItemTarget:
+    """A lightweight stand-in for a data item used as the target of a computation.
+
+    The computation may run on a thread, so it cannot modify the data item directly. The target captures the new
+    data and any changed properties; the changes are applied to the data item on the main thread using apply.
+
+    The data starts empty since the computation is expected to replace it. Other properties read through to the
+    new data, if any, or to the data item until they are changed. The changes are applied in the order they were
+    made, so setting the data after the metadata replaces the metadata just as it would on the data item.
+    """
+
+    # these properties are replaced when the data is set.
+    xdata_property_names = ("metadata", "intensity_calibration", "dimensional_calibrations")
+
+    def __init__(self, data_item: DataItem):
+        self.__data_item = data_item
+        self.__xdata: typing.Optional[DataAndMetadata.DataAndMetadata] = None
+        self.__properties: typing.Dict[str, typing.Any] = dict()
+        # the captured changes in order; each is a property name and value or None and the new xdata.
+        self.__changes: typing.List[typing.Tuple[typing.Optional[str], typing.Any]] = list()
+
+    @property
+    def uuid(self) -> uuid.UUID:
+        return self.__data_item.uuid
+
+    @property
+    def created(self) -> datetime.datetime:
+        return self.__data_item.created
+
+    @property
+    def modified(self) -> datetime.datetime:
+        return self.__data_item.modified
+
+    @property
+    def container(self):
+        return None
+
+    @property
+    def _document_model(self):
+        return None
+
+    def __get_property(self, name: str) -> typing.Any:
+        if name in self.__properties:
+            return copy.deepcopy(self.__properties[name])
+        if self.__xdata and name in DataItemTarget.xdata_property_names:
+            # these properties come from the new data once it has been set.
+            return copy.deepcopy(getattr(self.__xdata, name))
+        return getattr(self.__data_item, name)
+
+    def __set_property(self, name: str, value: typing.Any) -> None:
+        value = copy.deepcopy(value)
+        self.__properties[name] = value
+        # an earlier change to the same property is superseded.
+        self.__changes = [change for change in self.__changes if change[0] != name]
+        self.__changes.append((name, value))
+
+    @property
+    def title(self) -> str:
+        return self.__get_property("title")
+
+    @title.setter
+    def title(self, value: str) -> None:
+        self.__set_property("title", value)
+
+    @property
+    def caption(self) -> str:
+        return self.__get_property("caption")
+
+    @caption.setter
+    def caption(self, value: str) -> None:
+        self.__set_property("caption", value)
+
+    @property
+    def description(self) -> str:
+        return self.__get_property("description")
+
+    @description.setter
+    def description(self, value: str) -> None:
+        self.__set_property("description", value)
+
+    @property
+    def metadata(self) -> dict:
+        return self.__get_property("metadata")
+
+    @metadata.setter
+    def metadata(self, value: dict) -> None:
+        self.__set_property("metadata", value)
+
+    @property
+    def session_metadata(self) -> dict:
+        return self.__get_property("session_metadata")
+
+    @session_metadata.setter
+    def session_metadata(self, value: dict) -> None:
+        self.__set_property("session_metadata", value)
+
+    @property
+    def intensity_calibration(self) -> Calibration.Calibration:
+        return self.__get_property("intensity_calibration")
+
+    @intensity_calibration.setter
+    def intensity_calibration(self, value: Calibration.Calibration) -> None:
+        self.__set_property("intensity_calibration", value)
+
+    def set_intensity_calibration(self, intensity_calibration: Calibration.Calibration) -> None:
+        self.intensity_calibration = intensity_calibration
+
+    @property
+    def dimensional_calibrations(self) -> typing.List[Calibration.Calibration]:
+        return self.__get_property("dimensional_calibrations")
+
+    @dimensional_calibrations.setter
+    def dimensional_calibrations(self, value: typing.Sequence[Calibration.Calibration]) -> None:
+        self.__set_property("dimensional_calibrations", list(value))
+
+    def set_dimensional_calibrations(self, dimensional_calibrations: typing.Sequence[Calibration.Calibration]) -> None:
+        self.dimensional_calibrations = dimensional_calibrations
+
+    @property
+    def xdata(self) -> typing.Optional[DataAndMetadata.DataAndMetadata]:
+        return self.__xdata
+
+    @property
+    def data_and_metadata(self) -> typing.Optional[DataAndMetadata.DataAndMetadata]:
+        return self.__xdata
+
+    @property
+    def data(self) -> typing.Optional[numpy.ndarray]:
+        return self.__xdata.data if self.__xdata else None
+
+    def set_data(self, data: numpy.ndarray, data_modified: datetime.datetime=None) -> None:
+        timezone = Utility.get_local_timezone()
+        timezone_offset = Utility.TimezoneMinutesToStringConverter().convert(Utility.local_utcoffset_minutes())
+        self.set_xdata(DataAndMetadata.new_data_and_metadata(data, data_modified, timezone=timezone, timezone_offset=timezone_offset))
+
+    def set_xdata(self, xdata: DataAndMetadata.DataAndMetadata, data_modified: datetime.datetime=None) -> None:
+        self.__xdata = xdata
+        # earlier data and changes to properties that come from the data are superseded.
+        for name in DataItemTarget.xdata_property_names:
+            self.__properties.pop(name, None)
+        self.__changes = [change for change in self.__changes if change[0] is not None and change[0] not in DataItemTarget.xdata_property_names]
+        self.__changes.append((None, xdata))
+
+    def set_data_and_metadata(self, data_and_metadata: DataAndMetadata.DataAndMetadata, data_modified: datetime.datetime=None) -> None:
+        self.set_xdata(data_and_metadata, data_modified)
+
+    def has_metadata_value(self, key: str) -> bool:
+        return Metadata.has_metadata_value(self, key)
+
+    def get_metadata_value(self, key: str) -> typing.Any:
+        return Metadata.get_metadata_value(self, key)
+
+    def set_metadata_value(self, key: str, value: typing.Any) -> None:
+        Metadata.set_metadata_value(self, key, value)
+
+    def delete_metadata_value(self, key: str) -> None:
+        Metadata.delete_metadata_value(self, key)
+
+    def apply(self, data_item: DataItem) -> None:
+        """Apply the captured changes to the data item in order. Must be called on the main thread."""
+        for name, value in self.__changes:
+            if name is None:
+                data_item.set_xdata(value)
+            else:
+                setattr(data_item, name, value)
+
+
 def sort_by_date_key(data_item):
     """ A sort key to for the created field of a data item. The sort by uuid makes it determinate. """
     return data_item.title + str(data_item.uuid) if data_item.is_live else str(), data_item.date_for_sorting, str(data_item.uuid)
@@ -228,6 +228,8 @@ class CalibrationStyleFractionalCenter(CalibrationStyle):
 def adjustment_factory(adjustment_d: typing.Mapping):
     if adjustment_d.get("type", None) == "gamma":
         class AdjustGamma:
+            is_pointwise = True
+
             def __init__(self, gamma: float):
                 self.__gamma = gamma
 
@@ -237,6 +239,8 @@ def adjustment_factory(adjustment_d: typing.Mapping):
         return AdjustGamma(adjustment_d.get("gamma", 1.0))
     elif adjustment_d.get("type", None) == "log":
         class AdjustLog:
+            is_pointwise = True
+
             def transform(self, data: numpy.array, display_limits: typing.Tuple[float, float]) -> numpy.array:
                 range = display_limits[1] - display_limits[0]
                 c = 1.0 / (numpy.log2(1 + range))
@@ -245,6 +249,8 @@ def adjustment_factory(adjustment_d: typing.Mapping):
         return AdjustLog()
     elif adjustment_d.get("type", None) == "equalized":
         class AdjustEqualized:
+            is_pointwise = False  # depends on the histogram of all of the data
+
             def transform(self, data: numpy.array, display_limits: typing.Tuple[float, float]) -> numpy.array:
                 data = numpy.clip(data, 0.0, 1.0)
                 histogram, bins = numpy.histogram(data.flatten(), 256, density=True)
@@ -258,10 +264,119 @@ def adjustment_factory(adjustment_d: typing.Mapping):
         return None
 
 
+class DataStatistics:
+    """Statistics of scalar display data, calculated on first use and then kept.
+
+    The data range, auto display limits, and histograms all use the same statistics so that the data is only scanned
+    once for each set of display data. The min and max are calculated together in a single pass over the data.
+
+    The min and max are always exact. Optionally, the percentiles and histograms of data with more than
+    sample_threshold elements are calculated from a strided sample of the data, making them approximate. Sampling is
+    off by default; setting sample_threshold on the class or on an instance before its first use turns it on.
+    """
+
+    sample_threshold: typing.Optional[int] = None
+
+    # the min and max are calculated in blocks of this many elements so that each block is read from memory once.
+    block_size = 256 * 1024
+
+    def __init__(self, data: numpy.ndarray):
+        self.__lock = threading.RLock()
+        self.__data = data
+        self.__sample = None
+        self.__factor = 1.0
+        self.__data_range = None
+        self.__nan_data_range = None
+        self.__histograms = dict()
+
+    def __get_sample(self) -> numpy.ndarray:
+        # return a view of the data, strided if sampling is on and the data is large. must be called with lock held.
+        if self.__sample is None:
+            data = self.__data
+            sample_threshold = self.sample_threshold
+            if sample_threshold and data.size > sample_threshold and data.ndim > 0:
+                stride = int(math.ceil((data.size / sample_threshold) ** (1.0 / data.ndim)))
+                self.__sample = data[(slice(None, None, stride),) * data.ndim]
+                self.__factor = data.size / max(self.__sample.size, 1)
+            else:
+                self.__sample = data
+        return self.__sample
+
+    @property
+    def is_sampled(self) -> bool:
+        with self.__lock:
+            self.__get_sample()
+            return self.__factor != 1.0
+
+    @property
+    def data_range(self) -> typing.Tuple[typing.Any, typing.Any]:
+        """Return the min and max of the data. The values are nan if the data contains nan."""
+        with self.__lock:
+            if self.__data_range is None:
+                data = self.__data
+                block_size = self.block_size
+                if data.flags.c_contiguous and data.size > block_size:
+                    flat_data = data.reshape(-1)
+                    block_mins = list()
+                    block_maxs = list()
+                    for i in range(0, flat_data.size, block_size):
+                        block = flat_data[i:i + block_size]
+                        block_mins.append(numpy.amin(block))
+                        block_maxs.append(numpy.amax(block))
+                    self.__data_range = numpy.amin(numpy.array(block_mins)), numpy.amax(numpy.array(block_maxs))
+                else:
+                    self.__data_range = numpy.amin(data), numpy.amax(data)
+            return self.__data_range
+
+    @property
+    def nan_data_range(self) -> typing.Tuple[typing.Any, typing.Any]:
+        """Return the min and max of the data, ignoring nan."""
+        with self.__lock:
+            if self.__nan_data_range is None:
+                data_range = self.data_range
+                if numpy.issubdtype(self.__data.dtype, numpy.floating) and (numpy.isnan(data_range[0]) or numpy.isnan(data_range[1])):
+                    self.__nan_data_range = numpy.nanmin(self.__data), numpy.nanmax(self.__data)
+                else:
+                    self.__nan_data_range = data_range
+            return self.__nan_data_range
+
+    def get_percentiles(self, percentiles: typing.Sequence[float]) -> typing.List:
+        """Return the values at the percentiles (0 to 100) of the data, ignoring nan."""
+        with self.__lock:
+            return list(numpy.nanpercentile(self.__get_sample(), percentiles))
+
+    def get_histogram(self, bins: int, value_range: typing.Tuple[float, float]) -> numpy.ndarray:
+        """Return the histogram counts of the data, scaled to the full data size if sampled."""
+        with self.__lock:
+            key = bins, tuple(value_range)
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                sample = self.__get_sample()
+                histogram = numpy.histogram(sample, range=value_range, bins=bins)[0]
+                if self.__factor != 1.0:
+                    histogram = self.__factor * histogram
+                self.__histograms[key] = histogram
+            return histogram
+
+
 class DisplayValues:
-    """Display data used to render the display."""
+    """Display data used to render the display.
 
-    def __init__(self, data_and_metadata, sequence_index, collection_index, slice_center, slice_width, display_limits, complex_display_type, color_map_data, brightness, contrast, adjustments):
+    For 2d scalar data, the display rgba is calculated in tiles of rows, normalizing, adjusting, and applying the
+    color map to each tile in turn to avoid full size temporary arrays. If the previous display values were
+    calculated from the same data with the same display parameters and only part of the data has changed since, only
+    the tiles covering the changed slices are recalculated.
+
+    For 2d scalar data, reduced size levels of the display data are also available for displays showing the data
+    smaller than its full size. The levels are calculated on demand and kept until the data changes.
+    """
+
+    tile_element_count = 1 << 18
+
+    # the display data is reduced by half in each dimension for each level, down to this minimum size.
+    minimum_level_size = 64
+
+    def __init__(self, data_and_metadata, sequence_index, collection_index, slice_center, slice_width, display_limits, complex_display_type, color_map_data, brightness, contrast, adjustments, *, data_generation: int = 0, previous_display_values: typing.Optional["DisplayValues"] = None, changed_data_slices: typing.Optional[typing.Sequence[typing.Sequence[slice]]] = None, cached_data_range: typing.Optional[typing.Tuple[typing.Any, typing.Any]] = None):
         self.__lock = threading.RLock()
         self.__data_and_metadata = data_and_metadata
         self.__sequence_index = sequence_index
@@ -280,6 +395,8 @@ class DisplayValues:
         self.__display_data_and_metadata = None
         self.__data_range_dirty = True
         self.__data_range = None
+        # a data range calculated for the same display data earlier, for instance by a previous session.
+        self.__cached_data_range = cached_data_range
         self.__data_sample_dirty = True
         self.__data_sample = None
         self.__display_range_dirty = True
@@ -287,8 +404,24 @@ class DisplayValues:
         self.__display_rgba_dirty = True
         self.__display_rgba = None
         self.__display_rgba_timestamp = data_and_metadata.timestamp if data_and_metadata else None
+        self.__data_generation = data_generation
+        # only keep the previous display values if its display rgba can be reused.
+        self.__previous_display_values = previous_display_values if previous_display_values and previous_display_values.__display_rgba is not None and changed_data_slices is not None else None
+        self.__changed_data_slices = changed_data_slices
+        self.__data_statistics_dirty = True
+        self.__data_statistics = None
+        self.__display_data_levels = list()
+        # share the statistics and display data levels with the previous display values if the display data has not changed.
+        if previous_display_values and previous_display_values.__data_and_metadata is data_and_metadata and data_and_metadata and changed_data_slices == list():
+            if previous_display_values.__display_rgba_timestamp == self.__display_rgba_timestamp and previous_display_values.__get_display_data_key() == self.__get_display_data_key():
+                previous_data_statistics = previous_display_values.__data_statistics
+                if previous_data_statistics is not None:
+                    self.__data_statistics_dirty = False
+                    self.__data_statistics = previous_data_statistics
+                self.__display_data_levels = list(previous_display_values.__display_data_levels)
         self.__finalized = False
         self.on_finalize = None
+        self.on_data_range_calculated = None
 
     def finalize(self):
         with self.__lock:
@@ -300,6 +433,23 @@ class DisplayValues:
     def color_map_data(self):
         return self.__color_map_data
 
+    @property
+    def data_generation(self) -> int:
+        return self.__data_generation
+
+    def __get_display_data_key(self) -> typing.Tuple:
+        # the parameters used to calculate the display data from the data.
+        return self.__sequence_index, self.__collection_index, self.__slice_center, self.__slice_width, self.__complex_display_type
+
+    @property
+    def display_data_key(self) -> typing.Tuple:
+        """Return a key which is equal for display values with equal display data.
+
+        The key is the data generation and the parameters used to calculate the display data from the data, so it can
+        be compared without comparing or even calculating the display data.
+        """
+        return (self.__data_generation, self.__data_and_metadata is not None) + self.__get_display_data_key()
+
     @property
     def data_and_metadata(self) -> DataAndMetadata.DataAndMetadata:
         return self.__data_and_metadata
@@ -344,10 +494,12 @@ class DisplayValues:
                     data_dtype = self.__data_and_metadata.data_dtype
                     if Image.is_shape_and_dtype_rgb_type(data_shape, data_dtype):
                         self.__data_range = (0, 255)
-                    elif Image.is_shape_and_dtype_complex_type(data_shape, data_dtype):
-                        self.__data_range = (numpy.amin(display_data), numpy.amax(display_data))
+                    elif self.__cached_data_range is not None:
+                        self.__data_range = tuple(self.__cached_data_range)
                     else:
-                        self.__data_range = (numpy.amin(display_data), numpy.amax(display_data))
+                        self.__data_range = self.data_statistics.data_range
+                        if callable(self.on_data_range_calculated):
+                            self.on_data_range_calculated(self.__data_range)
                 else:
                     self.__data_range = None
                 if self.__data_range is not None:
@@ -359,6 +511,20 @@ class DisplayValues:
                         self.__data_range = (self.__data_range[0], int(self.__data_range[1]))
             return self.__data_range
 
+    @property
+    def data_statistics(self) -> typing.Optional[DataStatistics]:
+        """Return the statistics of the scalar display data, or None for rgb or empty data."""
+        with self.__lock:
+            if self.__data_statistics_dirty:
+                self.__data_statistics_dirty = False
+                display_data_and_metadata = self.display_data_and_metadata
+                display_data = display_data_and_metadata.data if display_data_and_metadata else None
+                if display_data is not None and display_data.size and self.__data_and_metadata and not Image.is_shape_and_dtype_rgb_type(self.__data_and_metadata.data_shape, self.__data_and_metadata.data_dtype):
+                    self.__data_statistics = DataStatistics(display_data)
+                else:
+                    self.__data_statistics = None
+            return self.__data_statistics
+
     @property
     def display_range(self):
         with self.__lock:
@@ -397,10 +563,74 @@ class DisplayValues:
                     if self.data_range is not None:  # workaround until validating and retrieving data stats is an atomic operation
                         # display_range is just display_limits but calculated if display_limits is None
                         display_range = self.transformed_display_range
-                        self.__display_rgba = Core.function_display_rgba(DataAndMetadata.promote_ndarray(display_data),
-                                                                         display_range, self.__color_map_data).data
+                        if self.__is_tiled_display_rgba:
+                            self.__display_rgba = self.__calculate_tiled_display_rgba(display_range)
+                        else:
+                            self.__display_rgba = Core.function_display_rgba(DataAndMetadata.promote_ndarray(display_data),
+                                                                             display_range, self.__color_map_data).data
+                # the previous display values are no longer needed.
+                self.__previous_display_values = None
             return self.__display_rgba
 
+    @property
+    def __is_tiled_display_rgba(self) -> bool:
+        # tiles are used for 2d scalar data where the display data is the data itself and all adjustments are pointwise.
+        data_and_metadata = self.__data_and_metadata
+        if data_and_metadata is None or data_and_metadata.is_sequence or data_and_metadata.is_collection or data_and_metadata.datum_dimension_count != 2:
+            return False
+        if Image.is_shape_and_dtype_rgb_type(data_and_metadata.data_shape, data_and_metadata.data_dtype):
+            return False
+        if Image.is_shape_and_dtype_complex_type(data_and_metadata.data_shape, data_and_metadata.data_dtype):
+            return False
+        for adjustment_d in self.__adjustments or list():
+            adjustment = adjustment_factory(adjustment_d)
+            if adjustment and not adjustment.is_pointwise:
+                return False
+        return True
+
+    def __get_reusable_display_rgba(self, display_range) -> typing.Optional[numpy.ndarray]:
+        # return a copy of the previous display rgba if it was calculated from the same data object with the same
+        # display parameters, in which case only the changed data slices need to be recalculated.
+        previous_display_values = self.__previous_display_values
+        if previous_display_values is None or previous_display_values.__data_and_metadata is not self.__data_and_metadata:
+            return None
+        previous_display_rgba = previous_display_values.__display_rgba
+        if previous_display_rgba is None or previous_display_rgba.shape != tuple(self.__data_and_metadata.data_shape):
+            return None
+        if previous_display_values.__adjustments != self.__adjustments or previous_display_values.__brightness != self.__brightness or previous_display_values.__contrast != self.__contrast:
+            return None
+        if previous_display_values.__color_map_data is not self.__color_map_data and not numpy.array_equal(previous_display_values.__color_map_data, self.__color_map_data):
+            return None
+        if previous_display_values.display_range != self.display_range or previous_display_values.transformed_display_range != display_range:
+            return None
+        return numpy.copy(previous_display_rgba)
+
+    def __calculate_tiled_display_rgba(self, display_range) -> numpy.ndarray:
+        display_data = self.display_data_and_metadata.data
+        height, width = display_data.shape
+        row_ranges = None
+        display_rgba = self.__get_reusable_display_rgba(display_range)
+        if display_rgba is not None:
+            row_ranges = list()
+            for changed_data_slice in self.__changed_data_slices:
+                row_slice = changed_data_slice[0] if len(changed_data_slice) > 0 else slice(None)
+                if not isinstance(row_slice, slice):
+                    row_ranges = None
+                    break
+                row_start, row_stop, row_step = row_slice.indices(height)
+                row_ranges.append((row_start, max(row_start, row_stop)))
+        if row_ranges is None:
+            display_rgba = numpy.empty((height, width), numpy.uint32)
+            row_ranges = [(0, height)]
+        tile_height = max(1, DisplayValues.tile_element_count // max(1, width))
+        for row_start, row_stop in row_ranges:
+            for tile_start in range(row_start, row_stop, tile_height):
+                tile_stop = min(tile_start + tile_height, row_stop)
+                tile_data = self.__transform_display_data(display_data[tile_start:tile_stop])
+                display_rgba[tile_start:tile_stop] = Core.function_display_rgba(DataAndMetadata.promote_ndarray(tile_data),
+                                                                                display_range, self.__color_map_data).data
+        return display_rgba
+
     @property
     def display_rgba_timestamp(self):
         return self.__display_rgba_timestamp
@@ -413,15 +643,23 @@ class DisplayValues:
         b = -display_limit_low
         return (m * (self.display_data_and_metadata + b)).data
 
-    @property
-    def transformed_display_data(self) -> typing.Optional[numpy.ndarray]:
+    def __transform_display_data(self, display_data: numpy.ndarray) -> numpy.ndarray:
+        # normalize the data to [0, 1] and apply the adjustments. display data may be all of the data or a tile.
         if self.__adjustments:
-            display_data = self.normalized_display_data
+            display_limit_low, display_limit_high = self.display_range
+            m = 1 / (display_limit_high - display_limit_low)
+            b = -display_limit_low
+            display_data = m * (display_data + b)
             for adjustment_d in self.__adjustments:
                 adjustment = adjustment_factory(adjustment_d)
                 if adjustment:
                     display_data = adjustment.transform(display_data, self.display_range)
-            return display_data
+        return display_data
+
+    @property
+    def transformed_display_data(self) -> typing.Optional[numpy.ndarray]:
+        if self.__adjustments:
+            return self.__transform_display_data(self.display_data_and_metadata.data)
         else:
             return self.display_data_and_metadata.data if self.display_data_and_metadata else None
 
@@ -440,6 +678,48 @@ class DisplayValues:
         # back calculate the display limits as they would be would be with brightness/contrast adjustments
         return (0 - m * b) / m, (1 - m * b) / m
 
+    @property
+    def level_count(self) -> int:
+        """Return the number of levels of reduced size display data available, including the full size level 0."""
+        if not self.__is_tiled_display_rgba:
+            return 1
+        height, width = self.__data_and_metadata.data_shape
+        level_count = 1
+        while min(height, width) >> level_count >= DisplayValues.minimum_level_size:
+            level_count += 1
+        return level_count
+
+    def __get_display_data_level(self, level: int) -> typing.Optional[numpy.ndarray]:
+        # levels are calculated from the next larger level by averaging 2x2 blocks and are kept until the data changes.
+        # an odd last row or column is repeated so that it forms its own blocks rather than being dropped.
+        with self.__lock:
+            if level == 0:
+                display_data_and_metadata = self.display_data_and_metadata
+                return display_data_and_metadata.data if display_data_and_metadata else None
+            display_data_levels = self.__display_data_levels
+            while len(display_data_levels) < level:
+                larger_display_data = self.__get_display_data_level(len(display_data_levels))
+                if larger_display_data is None:
+                    return None
+                height, width = (larger_display_data.shape[0] + 1) // 2, (larger_display_data.shape[1] + 1) // 2
+                if larger_display_data.shape != (height * 2, width * 2):
+                    pad_width = ((0, height * 2 - larger_display_data.shape[0]), (0, width * 2 - larger_display_data.shape[1]))
+                    larger_display_data = numpy.pad(larger_display_data, pad_width, mode="edge")
+                blocks = larger_display_data.reshape(height, 2, width, 2)
+                display_data_levels.append(numpy.mean(blocks, axis=(1, 3), dtype=numpy.float32))
+            return display_data_levels[level - 1]
+
+    def get_transformed_display_data_level(self, level: int) -> typing.Optional[numpy.ndarray]:
+        """Return the transformed display data reduced in size by 2**level in each dimension.
+
+        Levels beyond level_count - 1 are clamped. Levels above 0 are float32 so they are drawn by mapping the
+        transformed display range through the color map, the same as float32 display data at level 0.
+        """
+        level = max(0, min(level, self.level_count - 1))
+        if level == 0:
+            return self.transformed_display_data
+        return self.__transform_display_data(self.__get_display_data_level(level))
+
 
 class DisplayDataChannel(Observable.Observable, Persistence.PersistentObject):
     def __init__(self, data_item: DataItem.DataItem = None):
@@ -886,16 +1166,54 @@ class DisplayDataChannel(Observable.Observable, Persistence.PersistentObject):
         """
         if not immediate or not self.__is_master or not self.__last_display_values:
             if not self.__current_display_values and self.__data_item:
-                self.__current_display_values = DisplayValues(self.__data_item.xdata, self.sequence_index, self.collection_index, self.slice_center, self.slice_width, self.display_limits, self.complex_display_type, self.__color_map_data, self.brightness, self.contrast, self.adjustments)
+                data_generation = self.__data_item.data_generation
+                previous_display_values = self.__last_display_values
+                changed_data_slices = self.__data_item.get_changed_data_slices(previous_display_values.data_generation) if previous_display_values else None
+                xdata = self.__data_item.xdata
+                data_range_key = self.__get_data_range_key(xdata)
+                cached_data_range = self.__get_cached_data_range(data_range_key) if not previous_display_values else None
+                self.__current_display_values = DisplayValues(xdata, self.sequence_index, self.collection_index, self.slice_center, self.slice_width, self.display_limits, self.complex_display_type, self.__color_map_data, self.brightness, self.contrast, self.adjustments,
+                                                              data_generation=data_generation, previous_display_values=previous_display_values, changed_data_slices=changed_data_slices, cached_data_range=cached_data_range)
 
                 def finalize(display_values):
                     self.__last_display_values = display_values
                     self.display_values_changed_event.fire()
 
+                def data_range_calculated(data_range):
+                    self.__set_cached_data_range(data_range_key, data_range)
+
                 self.__current_display_values.on_finalize = finalize
+                self.__current_display_values.on_data_range_calculated = data_range_calculated
             return self.__current_display_values
         return self.__last_display_values
 
+    # the data ranges of the display data channels of a display item are stored in its display cache so that they
+    # can be read in bulk when the project is opened (see DocumentModel) instead of scanning the data of each item.
+    # the ranges are keyed by the data and the properties used to extract the display data.
+
+    def __get_data_range_key(self, xdata) -> typing.Optional[typing.List]:
+        if xdata is None or self.__data_item.is_live or not xdata.timestamp:
+            return None
+        return [str(xdata.timestamp), list(xdata.data_shape), str(xdata.data_dtype), self.sequence_index, self.collection_index, self.slice_center, self.slice_width, self.complex_display_type]
+
+    def __get_cached_data_range(self, data_range_key: typing.Optional[typing.List]) -> typing.Optional[typing.Tuple[typing.Any, typing.Any]]:
+        display_item = self.display_item
+        if data_range_key is not None and display_item:
+            data_ranges = display_item._display_cache.get_cached_value(display_item, "display_data_ranges")
+            data_range_entry = data_ranges.get(str(self.uuid)) if isinstance(data_ranges, dict) else None
+            if data_range_entry and data_range_entry.get("key") == data_range_key:
+                return tuple(data_range_entry["data_range"])
+        return None
+
+    def __set_cached_data_range(self, data_range_key: typing.Optional[typing.List], data_range: typing.Tuple[typing.Any, typing.Any]) -> None:
+        display_item = self.display_item
+        if data_range_key is not None and display_item and not display_item._closed:
+            display_cache = display_item._display_cache
+            data_ranges = display_cache.get_cached_value(display_item, "display_data_ranges")
+            data_ranges = dict(data_ranges) if isinstance(data_ranges, dict) else dict()
+            data_ranges[str(self.uuid)] = {"key": data_range_key, "data_range": [numpy.asarray(data_range[0]).item(), numpy.asarray(data_range[1]).item()]}
+            display_cache.set_cached_value(display_item, "display_data_ranges", data_ranges)
+
     def increment_display_ref_count(self, amount: int=1):
         """Increment display reference count to indicate this library item is currently displayed."""
         display_ref_count = self.__display_ref_count
@@ -926,14 +1244,19 @@ class DisplayDataChannel(Observable.Observable, Persistence.PersistentObject):
 
     def auto_display_limits(self):
         """Calculate best display limits and set them."""
-        display_data_and_metadata = self.get_calculated_display_values(True).display_data_and_metadata
+        display_values = self.get_calculated_display_values(True)
+        display_data_and_metadata = display_values.display_data_and_metadata
         data = display_data_and_metadata.data if display_data_and_metadata else None
         if data is not None:
             # The old algorithm was a problem during EELS where the signal data
             # is a small percentage of the overall data and was falling outside
             # the included range. This is the new simplified algorithm. Future
             # feature may allow user to select more complex algorithms.
-            mn, mx = numpy.nanmin(data), numpy.nanmax(data)
+            data_statistics = display_values.data_statistics
+            if data_statistics:
+                mn, mx = data_statistics.nan_data_range
+            else:
+                mn, mx = numpy.nanmin(data), numpy.nanmax(data)
             self.display_limits = mn, mx
 
 
@@ -993,6 +1316,7 @@ class DisplayItem(Observable.Observable, Persistence.PersistentObject):
         self.graphics_changed_event = Event.Event()
         self.display_values_changed_event = Event.Event()
         self.item_changed_event = Event.Event()
+        self.displayed_event = Event.Event()
 
         def graphic_selection_changed():
             # relay the message
@@ -1317,6 +1641,8 @@ class DisplayItem(Observable.Observable, Persistence.PersistentObject):
         self.__display_ref_count += amount
         for display_data_channel in self.display_data_channels:
             display_data_channel.increment_display_ref_count(amount)
+        if display_ref_count == 0 and self.__display_ref_count > 0:
+            self.displayed_event.fire()
 
     def decrement_display_ref_count(self, amount: int=1):
         """Decrement display reference count to indicate this library item is no longer displayed."""
@@ -36,7 +36,6 @@ from nion.swift.model import Symbolic
 from nion.utils import Event
 from nion.utils import Geometry
 from nion.utils import Observable
-from nion.utils import Recorder
 from nion.utils import ReferenceCounting
 from nion.utils import Registry
 from nion.utils import ThreadPool
@@ -64,6 +63,10 @@ class ComputationQueueItem:
     def __init__(self, *, computation=None):
         self.computation = computation
         self.valid = True
+        # the items downstream of the outputs and upstream of the inputs and outputs, including the inputs and
+        # outputs themselves. set when the item becomes active and used to find computations it blocks.
+        self.dependent_items = set()  # type: typing.Set
+        self.source_items = set()  # type: typing.Set
 
     def recompute(self) -> typing.Optional[typing.Tuple[Symbolic.Computation, typing.Callable[[], None]]]:
         # evaluate the computation in a thread safe manner
@@ -94,26 +97,21 @@ class ComputationQueueItem:
                         pending_data_item_merge = (computation, None)
                 else:
                     start_time = time.perf_counter()
-                    data_item_clone = data_item.clone()
-                    data_item_data_modified = data_item.data_modified or datetime.datetime.min
-                    data_item_clone_recorder = Recorder.Recorder(data_item_clone)
-                    api_data_item = api._new_api_object(data_item_clone)
+                    data_item_target = DataItem.DataItemTarget(data_item)
+                    api_data_item = api._new_api_object(data_item_target)
                     error_text = computation.evaluate_with_target(api, api_data_item)
                     eval_time = time.perf_counter() - start_time
                     throttle_time = max(DocumentModel.computation_min_period - (time.perf_counter() - computation.last_evaluate_data_time), 0)
                     time.sleep(max(throttle_time, min(eval_time * DocumentModel.computation_min_factor, 1.0)))
                     if self.valid:  # TODO: race condition for 'valid'
-                        def data_item_merge(data_item, data_item_clone, data_item_clone_recorder):
-                            # merge the result item clones back into the document. this method is guaranteed to run at
+                        def data_item_merge(data_item, data_item_target):
+                            # merge the captured target changes back into the document. this method is guaranteed to run at
                             # periodic and shouldn't do anything too time consuming.
-                            data_item_data_clone_modified = data_item_clone.data_modified or datetime.datetime.min
                             with data_item.data_item_changes(), data_item.data_source_changes():
-                                if data_item_data_clone_modified > data_item_data_modified:
-                                    data_item.set_xdata(api_data_item.data_and_metadata)
-                                data_item_clone_recorder.apply(data_item)
+                                data_item_target.apply(data_item)
                                 if computation.error_text != error_text:
                                     computation.error_text = error_text
-                        pending_data_item_merge = (computation, functools.partial(data_item_merge, data_item, data_item_clone, data_item_clone_recorder))
+                        pending_data_item_merge = (computation, functools.partial(data_item_merge, data_item, data_item_target))
             except Exception as e:
                 import traceback
                 traceback.print_exc()
@@ -557,6 +555,7 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
 
     computation_min_period = 0.0
     computation_min_factor = 0.0
+    computation_thread_count = 1
 
     def __init__(self, project: Project.Project, *, storage_cache = None):
         super().__init__()
@@ -600,12 +599,16 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         self.__dependency_tree_source_to_target_map = dict()
         self.__dependency_tree_target_to_source_map = dict()
         self.__computation_changed_listeners = dict()
+        self.__display_item_displayed_listeners = dict()
         self.__computation_output_changed_listeners = dict()
         self.__computation_changed_delay_list = None
         self.__data_item_references = dict()
         self.__computation_queue_lock = threading.RLock()
-        self.__computation_pending_queue = list()  # type: typing.List[ComputationQueueItem]
-        self.__computation_active_item = None  # type: typing.Optional[ComputationQueueItem]
+        self.__computation_pending_queue = collections.OrderedDict()  # type: typing.Dict[Symbolic.Computation, ComputationQueueItem]
+        # the pending computations with an output that was displayed when they were queued; these run first.
+        self.__computation_displayed_pending_queue = collections.OrderedDict()  # type: typing.Dict[Symbolic.Computation, ComputationQueueItem]
+        self.__computation_active_items = list()  # type: typing.List[ComputationQueueItem]
+        self.__computation_thread_count = 1
         self.__data_items = list()
         self.__display_items = list()
         self.__data_structures = list()
@@ -630,7 +633,7 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         self.__pending_data_item_updates = list()
 
         self.__pending_data_item_merge_lock = threading.RLock()
-        self.__pending_data_item_merge = None
+        self.__pending_data_item_merges = list()  # type: typing.List[typing.Tuple[ComputationQueueItem, typing.Tuple[Symbolic.Computation, typing.Optional[typing.Callable[[], None]]]]]
         self.__current_computation = None
 
         self.__call_soon_queue = list()
@@ -669,6 +672,14 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         for index, item in enumerate(self.__project.data_groups):
             self.__project_item_inserted("data_groups", item, index)
 
+    def __prefetch_display_caches(self, display_items: typing.Sequence[DisplayItem.DisplayItem]) -> None:
+        # read the cached display statistics of all display items in one storage cache query rather than one query per
+        # display item when its display values are first calculated.
+        if display_items:
+            cached_values_list = self.storage_cache.get_cached_values(display_items, ["display_data_ranges"])
+            for display_item, cached_values in zip(display_items, cached_values_list):
+                display_item._display_cache.prefetch_cached_values(cached_values)
+
     def __resolve_display_item_specifier(self, display_item_specifier_d: typing.Dict) -> typing.Optional[DisplayItem.DisplayItem]:
         display_item_specifier = Persistence.PersistentObjectSpecifier.read(display_item_specifier_d)
         return typing.cast(typing.Optional[DisplayItem.DisplayItem], self.resolve_item_specifier(display_item_specifier))
@@ -708,9 +719,10 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         # stop computations
         with self.__computation_queue_lock:
             self.__computation_pending_queue.clear()
-            if self.__computation_active_item:
-                self.__computation_active_item.valid = False
-                self.__computation_active_item = None
+            self.__computation_displayed_pending_queue.clear()
+            for computation_queue_item in self.__computation_active_items:
+                computation_queue_item.valid = False
+            self.__computation_active_items.clear()
 
         # r_vars
         MappedItemManager().unregister_document(self)
@@ -926,13 +938,11 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         self.__transaction_manager._remove_item(data_item)
         library_computation = self.get_data_item_computation(data_item)
         with self.__computation_queue_lock:
-            computation_pending_queue = self.__computation_pending_queue
-            self.__computation_pending_queue = list()
-            for computation_queue_item in computation_pending_queue:
-                if not computation_queue_item.computation is library_computation:
-                    self.__computation_pending_queue.append(computation_queue_item)
-            if self.__computation_active_item and library_computation is self.__computation_active_item.computation:
-                self.__computation_active_item.valid = False
+            self.__computation_pending_queue.pop(library_computation, None)
+            self.__computation_displayed_pending_queue.pop(library_computation, None)
+            for computation_queue_item in self.__computation_active_items:
+                if library_computation is computation_queue_item.computation:
+                    computation_queue_item.valid = False
         # remove data item from any selections
         self.data_item_will_be_removed_event.fire(data_item)
         # remove it from the persistent_storage
@@ -1030,6 +1040,7 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         assert display_item not in self.__display_items
         # data item bookkeeping
         display_item.set_storage_cache(self.storage_cache)
+        self.__display_item_displayed_listeners[display_item] = display_item.displayed_event.listen(functools.partial(self.__display_item_displayed, display_item))
         # insert in internal list
         before_index = len(self.__display_items)
         self.__display_items.append(display_item)
@@ -1043,11 +1054,14 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         index = self.__display_items.index(display_item)
         self.notify_remove_item("display_items", display_item, index)
         self.__display_items.remove(display_item)
+        display_item_displayed_listener = self.__display_item_displayed_listeners.pop(display_item, None)
+        if display_item_displayed_listener: display_item_displayed_listener.close()
 
     def __start_project_read(self) -> None:
         pass
 
     def __finish_project_read(self) -> None:
+        self.__prefetch_display_caches(list(self.__display_items))
         # clean the display items for each data channel
         for hardware_source in HardwareSource.HardwareSourceManager().hardware_sources:
             for data_channel in hardware_source.data_channels:
@@ -1330,15 +1344,20 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
 
     def __computation_needs_update(self, computation: Symbolic.Computation) -> None:
         # When the computation for a data item is set or mutated, this function will be called.
-        # This function looks through the existing pending computation queue, and if this data
-        # item is not already in the queue, it adds it and ensures the dispatch thread eventually
-        # executes the computation.
+        # This function checks the pending computation queue, which is keyed by computation, and if
+        # this computation is not already in the queue, it adds it and ensures the dispatch thread
+        # eventually executes the computation. A computation already in the queue is coalesced into
+        # the existing entry since the entry evaluates the current state of the computation when it runs.
+        # Whether the computation is displayed is determined here, once, rather than each time the
+        # dispatcher looks for the next computation; see __display_item_displayed for later changes.
+        is_displayed = self.__is_computation_displayed(computation)
         with self.__computation_queue_lock:
-            for computation_queue_item in self.__computation_pending_queue:
-                if computation and computation_queue_item.computation == computation:
-                    return
+            if computation in self.__computation_pending_queue:
+                return
             computation_queue_item = ComputationQueueItem(computation=computation)
-            self.__computation_pending_queue.append(computation_queue_item)
+            self.__computation_pending_queue[computation] = computation_queue_item
+            if is_displayed:
+                self.__computation_displayed_pending_queue[computation] = computation_queue_item
         self.dispatch_task(self.__recompute)
 
     def __establish_computation_dependencies(self, old_inputs: typing.Set, new_inputs: typing.Set, old_outputs: typing.Set, new_outputs: typing.Set) -> None:
@@ -1398,6 +1417,14 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
                 for dependent in self.get_dependent_items(item):
                     self.__get_deep_dependent_item_set(dependent, item_set)
 
+    def __get_deep_source_item_set(self, item, item_set) -> None:
+        """Return the set of items that this item directly or indirectly depends on, including the item itself."""
+        if not item in item_set:
+            item_set.add(item)
+            with self.__dependency_tree_lock:
+                for source in self.get_source_items(item):
+                    self.__get_deep_source_item_set(source, item_set)
+
     def get_source_data_items(self, data_item: DataItem.DataItem) -> typing.List[DataItem.DataItem]:
         with self.__dependency_tree_lock:
             return [data_item for data_item in self.__dependency_tree_target_to_source_map.get(weakref.ref(data_item), list()) if isinstance(data_item, DataItem.DataItem)]
@@ -1582,7 +1609,7 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
             if merge:
                 self.perform_data_item_merge()
                 with self.__computation_queue_lock:
-                    if not (self.__computation_pending_queue or self.__computation_active_item or self.__pending_data_item_merge):
+                    if not (self.__computation_pending_queue or self.__computation_active_items or self.__pending_data_item_merges):
                         break
             else:
                 break
@@ -1593,34 +1620,108 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
             self.perform_data_item_merge()
 
     def start_dispatcher(self):
-        self.__computation_thread_pool.start(1)
+        self.__computation_thread_count = max(DocumentModel.computation_thread_count, 1)
+        self.__computation_thread_pool.start(self.__computation_thread_count)
+
+    def __display_item_displayed(self, display_item: DisplayItem.DisplayItem) -> None:
+        # a display item became displayed; pending computations with an output on it now run first. computations
+        # are not moved back when their outputs are no longer displayed, they run first this one time.
+        with self.__computation_queue_lock:
+            for computation, computation_queue_item in self.__computation_pending_queue.items():
+                if computation not in self.__computation_displayed_pending_queue and self.__is_computation_displayed(computation):
+                    self.__computation_displayed_pending_queue[computation] = computation_queue_item
+
+    def __activate_computation_queue_item(self, computation_queue_item: ComputationQueueItem) -> None:
+        # move the item from the pending queues to the active items and record the items it blocks.
+        # must be called with the dependency tree lock and the computation queue lock held.
+        computation = computation_queue_item.computation
+        self.__computation_pending_queue.pop(computation)
+        self.__computation_displayed_pending_queue.pop(computation, None)
+        dependent_items = set()
+        for output in computation._outputs:
+            self.__get_deep_dependent_item_set(output, dependent_items)
+        source_items = set()
+        for item in computation._inputs | computation._outputs:
+            self.__get_deep_source_item_set(item, source_items)
+        computation_queue_item.dependent_items = dependent_items
+        computation_queue_item.source_items = source_items
+        self.__computation_active_items.append(computation_queue_item)
+
+    def __is_computation_blocked(self, computation: Symbolic.Computation) -> bool:
+        # a computation is blocked if it is already active or if it is upstream or downstream of an active computation.
+        # this ensures a computation never runs while one of its inputs is being recomputed. the upstream and
+        # downstream items of each active computation are gathered once when it becomes active.
+        items = computation._inputs | computation._outputs
+        for computation_queue_item in self.__computation_active_items:
+            if computation_queue_item.computation is computation:
+                return True
+            if not computation_queue_item.dependent_items.isdisjoint(items):
+                return True
+            if not computation_queue_item.source_items.isdisjoint(computation._outputs):
+                return True
+        return False
+
+    def __is_computation_displayed(self, computation: Symbolic.Computation) -> bool:
+        # return whether any output of the computation is currently displayed.
+        for output in list(computation._outputs):
+            if isinstance(output, DataItem.DataItem):
+                for display_data_channel in output.display_data_channels:
+                    if display_data_channel._display_ref_count > 0:
+                        return True
+            elif isinstance(output, Graphics.Graphic):
+                display_item = output.container
+                if isinstance(display_item, DisplayItem.DisplayItem) and display_item._display_ref_count > 0:
+                    return True
+        return False
+
+    def __next_computation_queue_item(self) -> typing.Optional[ComputationQueueItem]:
+        # return the first pending computation that is not blocked, preferring computations with displayed outputs.
+        # must be called with the computation queue lock held.
+        for computation, computation_queue_item in self.__computation_displayed_pending_queue.items():
+            if not self.__is_computation_blocked(computation):
+                return computation_queue_item
+        for computation, computation_queue_item in self.__computation_pending_queue.items():
+            if computation not in self.__computation_displayed_pending_queue and not self.__is_computation_blocked(computation):
+                return computation_queue_item
+        return None
 
     def __recompute(self):
+        # each running task takes the next pending computation that is not blocked by an active computation, as long
+        # as fewer than the dispatcher thread count are active. merges are performed on the main thread, after which
+        # the computation is no longer active.
         while True:
             computation_queue_item = None
-            with self.__computation_queue_lock:
-                if not self.__computation_active_item and self.__computation_pending_queue:
-                    computation_queue_item = self.__computation_pending_queue.pop(0)
-                    self.__computation_active_item = computation_queue_item
+            needs_dispatch = False
+            with self.__dependency_tree_lock, self.__computation_queue_lock:
+                if len(self.__computation_active_items) < self.__computation_thread_count:
+                    computation_queue_item = self.__next_computation_queue_item()
+                    if computation_queue_item:
+                        self.__activate_computation_queue_item(computation_queue_item)
+                    needs_dispatch = computation_queue_item is not None and len(self.__computation_active_items) < self.__computation_thread_count and len(self.__computation_pending_queue) > 0
+
+            if needs_dispatch:
+                # let another thread look for independent computations.
+                self.dispatch_task(self.__recompute)
 
             if computation_queue_item:
                 # an item was put into the active queue, so compute it, then merge
                 pending_data_item_merge = computation_queue_item.recompute()
                 if pending_data_item_merge is not None:
                     with self.__pending_data_item_merge_lock:
-                        self.__pending_data_item_merge = pending_data_item_merge
+                        self.__pending_data_item_merges.append((computation_queue_item, pending_data_item_merge))
                     self.__call_soon(self.perform_data_item_merge)
                 else:
                     with self.__computation_queue_lock:
-                        self.__computation_active_item = None
+                        if computation_queue_item in self.__computation_active_items:
+                            self.__computation_active_items.remove(computation_queue_item)
             else:
                 break
 
     def perform_data_item_merge(self):
         with self.__pending_data_item_merge_lock:
-            pending_data_item_merge = self.__pending_data_item_merge
-            self.__pending_data_item_merge = None
-        if pending_data_item_merge is not None:
+            pending_data_item_merges = self.__pending_data_item_merges
+            self.__pending_data_item_merges = list()
+        for computation_queue_item, pending_data_item_merge in pending_data_item_merges:
             computation, pending_data_item_merge_fn = pending_data_item_merge
             self.__current_computation = computation
             try:
@@ -1629,7 +1730,8 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
             finally:
                 self.__current_computation = None
                 with self.__computation_queue_lock:
-                    self.__computation_active_item = None
+                    if computation_queue_item in self.__computation_active_items:
+                        self.__computation_active_items.remove(computation_queue_item)
                 computation.is_initial_computation_complete.set()
         self.dispatch_task(self.__recompute)
 
@@ -2131,13 +2233,11 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
         assert computation in self.__computations
         # remove it from any computation queues
         with self.__computation_queue_lock:
-            computation_pending_queue = self.__computation_pending_queue
-            self.__computation_pending_queue = list()
-            for computation_queue_item in computation_pending_queue:
-                if not computation_queue_item.computation is computation:
-                    self.__computation_pending_queue.append(computation_queue_item)
-            if self.__computation_active_item and computation is self.__computation_active_item.computation:
-                self.__computation_active_item.valid = False
+            self.__computation_pending_queue.pop(computation, None)
+            self.__computation_displayed_pending_queue.pop(computation, None)
+            for computation_queue_item in self.__computation_active_items:
+                if computation is computation_queue_item.computation:
+                    computation_queue_item.valid = False
         computation_changed_listener = self.__computation_changed_listeners.pop(computation, None)
         if computation_changed_listener: computation_changed_listener.close()
         computation_output_changed_listener = self.__computation_output_changed_listeners.pop(computation, None)
@@ -1,4 +1,5 @@
 import abc
+import concurrent.futures
 import contextlib
 import copy
 import datetime
@@ -8,10 +9,13 @@ import numpy
 import os.path
 import pathlib
 import shutil
+import sqlite3
 import threading
+import time
 import typing
 import uuid
 
+from nion.data import DataAndMetadata
 from nion.swift.model import DataItem
 from nion.swift.model import HDF5Handler
 from nion.swift.model import Migration
@@ -62,24 +66,71 @@ class DataItemStorageAdapter:
         file_datetime = item.created_local
         self.__storage_handler.write_properties(Migration.transform_from_latest(copy.deepcopy(self.__properties)), file_datetime)
 
+    def __get_data_descriptor(self, data_shape: typing.Tuple[int, ...]) -> typing.Optional[DataAndMetadata.DataDescriptor]:
+        # the data descriptor properties are written before the data; ignore them if they do not match the shape.
+        is_sequence = self.__properties.get("is_sequence", False)
+        collection_dimension_count = self.__properties.get("collection_dimension_count")
+        datum_dimension_count = self.__properties.get("datum_dimension_count")
+        if collection_dimension_count is None or datum_dimension_count is None:
+            return None
+        if (1 if is_sequence else 0) + collection_dimension_count + datum_dimension_count != len(data_shape):
+            return None
+        return DataAndMetadata.DataDescriptor(is_sequence, collection_dimension_count, datum_dimension_count)
+
     def update_data(self, item: Persistence.PersistentObject, data: numpy.ndarray) -> None:
         file_datetime = item.created_local
         if data is not None:
-            self.__storage_handler.write_data(data, file_datetime)
+            self.__storage_handler.write_data(data, file_datetime, data_descriptor=self.__get_data_descriptor(data.shape))
+
+    def update_data_partial(self, item: Persistence.PersistentObject, data: numpy.ndarray, dst: typing.Sequence[slice]) -> None:
+        file_datetime = item.created_local
+        if data is not None:
+            self.__storage_handler.write_data_partial(data, dst, file_datetime)
 
     def reserve_data(self, item: Persistence.PersistentObject, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype) -> None:
         file_datetime = item.created_local
-        self.__storage_handler.reserve_data(data_shape, data_dtype, file_datetime)
+        self.__storage_handler.reserve_data(data_shape, data_dtype, file_datetime, data_descriptor=self.__get_data_descriptor(data_shape))
 
     def load_data(self, item: Persistence.PersistentObject) -> numpy.ndarray:
         return self.__storage_handler.read_data()
 
 
+def read_reader_info_list(project_storage_system: "ProjectStorageSystem", storage_handlers: typing.Sequence[StorageHandler.StorageHandler],
+                          max_workers: int) -> typing.List[typing.Optional[ReaderInfo]]:
+    """Read the properties of each storage handler and transform them to the latest version.
+
+    Files are read on up to max_workers threads since reading is usually bound by the latency of each file. The
+    returned list matches the order of storage_handlers; it contains None for a file which could not be read.
+    """
+
+    def read_reader_info(storage_handler: StorageHandler.StorageHandler) -> typing.Optional[ReaderInfo]:
+        try:
+            large_format = project_storage_system._is_storage_handler_large_format(storage_handler)
+            properties = Migration.transform_to_latest(storage_handler.read_properties())
+            return ReaderInfo(properties, [False], large_format, storage_handler, storage_handler.reference)
+        except Exception:
+            logging.debug("Error reading %s", storage_handler.reference)
+            import traceback
+            traceback.print_exc()
+            traceback.print_stack()
+            return None
+
+    if max_workers > 1 and len(storage_handlers) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(storage_handlers))) as executor:
+            return list(executor.map(read_reader_info, storage_handlers))
+    return [read_reader_info(storage_handler) for storage_handler in storage_handlers]
+
+
 def migrate_to_latest(source_project_storage_system: "ProjectStorageSystem",
-                      target_project_storage_system: "ProjectStorageSystem" = None) -> None:
+                      target_project_storage_system: "ProjectStorageSystem" = None, *,
+                      progress_fn: typing.Optional[typing.Callable[[int, int], None]] = None) -> None:
     """Migrate the library data in source to target, upgrading them in the process.
 
     If target is None, then migration is done in place.
+
+    Data items are read and copied on up to ProjectStorageSystem.migration_thread_count threads. The result does not
+    depend on the order in which the threads finish. If progress_fn is passed, it is called on the calling thread with
+    the number of data items processed and the total count for each migration stage as data items are copied.
     """
     library_properties = None
     data_item_uuids = set()
@@ -104,18 +155,12 @@ def migrate_to_latest(source_project_storage_system: "ProjectStorageSystem",
         # whether it has been changed during migration, whether it is a large format file, its storage handler,
         # and an identifier key. this loop skips files that cannot be read but prints an error message.
         preliminary_reader_info_list = list()
-        for storage_handler in storage_handlers:
-            try:
-                large_format = source_project_storage_system._is_storage_handler_large_format(storage_handler)
-                properties = Migration.transform_to_latest(storage_handler.read_properties())
-                reader_info = ReaderInfo(properties, [False], large_format, storage_handler, storage_handler.reference)
+        reader_infos = read_reader_info_list(source_project_storage_system, storage_handlers, ProjectStorageSystem.migration_thread_count)
+        for storage_handler, reader_info in zip(storage_handlers, reader_infos):
+            if reader_info:
                 preliminary_reader_info_list.append(reader_info)
-            except Exception:
+            else:
                 storage_handler.close()
-                logging.debug("Error reading %s", storage_handler.reference)
-                import traceback
-                traceback.print_exc()
-                traceback.print_stack()
 
         # now read the library properties which contains the data item deletions. data item deletions exist to
         # facilitate switching between library versions. if the user deletes an item in a newer library, that item
@@ -140,7 +185,10 @@ def migrate_to_latest(source_project_storage_system: "ProjectStorageSystem",
         # check whether it has a unique UUID that hasn't been deleted, and, if so, try to copy the data item to its
         # new location. if successful, mark the data item as having been added to the new library and add any
         # preliminary library updates to the library updates list to be applied later.
+        # items with the same UUID are candidates for a single copy; the first candidate copied successfully is used.
+        # the copies for different UUIDs are independent and run in parallel.
         count = len(preliminary_reader_info_list)
+        candidates_map: typing.Dict[uuid.UUID, typing.List[typing.Tuple[int, ReaderInfo]]] = dict()
         for index, reader_info in enumerate(preliminary_reader_info_list):
             properties = reader_info.properties
             try:
@@ -149,19 +197,46 @@ def migrate_to_latest(source_project_storage_system: "ProjectStorageSystem",
                     data_item_uuid = uuid.UUID(properties["uuid"])
                     if data_item_uuid not in data_item_uuids:
                         if not str(data_item_uuid) in deletions:
-                            new_reader_info = target_project_storage_system._migrate_data_item(reader_info, index, count)
-                            if new_reader_info:
-                                reader_info_list.append(new_reader_info)
-                                data_item_uuids.add(data_item_uuid)
-                                library_update = preliminary_library_updates.get(data_item_uuid)
-                                if library_update:
-                                    library_updates[data_item_uuid] = library_update
+                            candidates_map.setdefault(data_item_uuid, list()).append((index, reader_info))
             except Exception:
                 logging.debug(f"Error reading {reader_info.storage_handler.reference}")
                 import traceback
                 traceback.print_exc()
                 traceback.print_stack()
 
+        def migrate_data_item(candidates: typing.Sequence[typing.Tuple[int, ReaderInfo]]) -> typing.Optional[typing.Tuple[int, ReaderInfo]]:
+            for index, reader_info in candidates:
+                try:
+                    new_reader_info = target_project_storage_system._migrate_data_item(reader_info, index, count)
+                    if new_reader_info:
+                        return index, new_reader_info
+                except Exception:
+                    logging.debug(f"Error reading {reader_info.storage_handler.reference}")
+                    import traceback
+                    traceback.print_exc()
+                    traceback.print_stack()
+            return None
+
+        migrated_list = list()
+        candidates_list = list(candidates_map.items())
+        max_workers = min(ProjectStorageSystem.migration_thread_count, len(candidates_list))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            futures = {executor.submit(migrate_data_item, candidates): data_item_uuid for data_item_uuid, candidates in candidates_list}
+            for completed_count, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                migrated = future.result()
+                if migrated:
+                    migrated_list.append((migrated[0], futures[future], migrated[1]))
+                if callable(progress_fn):
+                    progress_fn(completed_count, len(candidates_list))
+
+        # add the copied items in the order they were found so that the result does not depend on thread timing.
+        for index, data_item_uuid, new_reader_info in sorted(migrated_list, key=lambda migrated: migrated[0]):
+            reader_info_list.append(new_reader_info)
+            data_item_uuids.add(data_item_uuid)
+            library_update = preliminary_library_updates.get(data_item_uuid)
+            if library_update:
+                library_updates[data_item_uuid] = library_update
+
         for storage_handler in storage_handlers:
             storage_handler.close()
 
@@ -205,6 +280,77 @@ def migrate_to_latest(source_project_storage_system: "ProjectStorageSystem",
     target_project_storage_system._migrate_library_properties(library_properties, reader_info_list)
 
 
+class PropertiesWriter:
+    """Write properties on a background thread, coalescing write requests.
+
+    Requests made while a write is pending are satisfied by that write. Writes start no sooner than minimum_interval
+    after the end of the previous write. The writer thread exits when no write is pending. Call flush to wait for a
+    pending write. Call close to flush; requests after closing are written immediately.
+    """
+
+    def __init__(self, write_fn: typing.Callable[[], None], minimum_interval: float):
+        self.__write_fn = write_fn
+        self.__minimum_interval = minimum_interval
+        self.__condition = threading.Condition()
+        self.__is_write_pending = False
+        self.__is_writing = False
+        self.__is_flushing = False
+        self.__last_write_time = 0.0
+        self.__thread = None  # type: typing.Optional[threading.Thread]
+        self.__closed = False
+
+    def close(self) -> None:
+        self.flush()
+        with self.__condition:
+            self.__closed = True
+
+    def request_write(self) -> None:
+        """Request a write. Thread safe and returns immediately."""
+        with self.__condition:
+            if self.__closed:
+                # writes after closing are done immediately.
+                self.__write_fn()
+                return
+            self.__is_write_pending = True
+            if not self.__thread:
+                self.__thread = threading.Thread(target=self.__run, name="properties-writer", daemon=True)
+                self.__thread.start()
+            self.__condition.notify_all()
+
+    def flush(self) -> None:
+        """Wait until no write is pending or in progress. A pending write is started immediately."""
+        with self.__condition:
+            self.__is_flushing = True
+            self.__condition.notify_all()
+            while self.__is_write_pending or self.__is_writing:
+                self.__condition.wait()
+            self.__is_flushing = False
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while self.__is_write_pending and not self.__is_flushing:
+                    wait_time = self.__last_write_time + self.__minimum_interval - time.perf_counter()
+                    if wait_time <= 0:
+                        break
+                    self.__condition.wait(wait_time)
+                if not self.__is_write_pending:
+                    self.__thread = None
+                    self.__condition.notify_all()
+                    return
+                self.__is_write_pending = False
+                self.__is_writing = True
+            try:
+                self.__write_fn()
+            except Exception:
+                logging.exception("Unable to write properties.")
+            finally:
+                with self.__condition:
+                    self.__is_writing = False
+                    self.__last_write_time = time.perf_counter()
+                    self.__condition.notify_all()
+
+
 class PersistentStorageSystem(Persistence.PersistentStorageInterface):
     """Abstract base class for persistent storage which implements the persistent storage interface.
 
@@ -242,6 +388,11 @@ class PersistentStorageSystem(Persistence.PersistentStorageInterface):
         """Return the internal properties. Callers should not modify and it is ok to not return a copy."""
         return self.__properties
 
+    @property
+    def _properties_lock(self) -> threading.RLock:
+        """Return the lock held while the internal properties are modified."""
+        return self.__properties_lock
+
     def __write_properties_if_not_delayed(self, item: typing.Optional[Persistence.PersistentObject]) -> None:
         if self.__write_delay_counts.get(item, 0) == 0:
             self._write_item_properties(item)
@@ -333,6 +484,9 @@ class PersistentStorageSystem(Persistence.PersistentStorageInterface):
     def write_external_data(self, item: Persistence.PersistentObject, name: str, value: numpy.ndarray) -> None:
         pass
 
+    def write_external_data_partial(self, item: Persistence.PersistentObject, name: str, value: numpy.ndarray, dst: typing.Sequence[slice]) -> None:
+        self.write_external_data(item, name, value)
+
     def reserve_external_data(self, item: Persistence.PersistentObject, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype) -> None:
         pass
 
@@ -426,6 +580,12 @@ class MemoryPersistentStorageSystem(PersistentStorageSystem):
 class ProjectStorageSystem(PersistentStorageSystem):
     """Persistent storage system to provide special handling of data items."""
 
+    # the maximum number of threads used to read data item properties when opening the project.
+    read_thread_count = 8
+
+    # the maximum number of threads used to read and copy data items when migrating.
+    migration_thread_count = 4
+
     def __init__(self):
         super().__init__()
         self.__storage_adapter_map = dict()
@@ -474,6 +634,12 @@ class ProjectStorageSystem(PersistentStorageSystem):
     def get_identifier(self) -> str:
         return self._get_identifier()
 
+    def _read_reader_info_list(self) -> typing.List[ReaderInfo]:
+        """Return the reader info for each readable data item in storage. Subclasses may cache the properties."""
+        storage_handlers = self._find_storage_handlers()
+        reader_info_list = read_reader_info_list(self, storage_handlers, ProjectStorageSystem.read_thread_count)
+        return [reader_info for reader_info in reader_info_list if reader_info]
+
     @property
     def _data_properties_map(self) -> typing.Dict:
         return self.__storage_adapter_map
@@ -494,20 +660,7 @@ class ProjectStorageSystem(PersistentStorageSystem):
 
         The dict may contain keys for data_items, display_items, data_structures, connections, and computations.
         """
-        storage_handlers = self._find_storage_handlers()
-
-        reader_info_list = list()
-        for storage_handler in storage_handlers:
-            try:
-                large_format = self._is_storage_handler_large_format(storage_handler)
-                properties = Migration.transform_to_latest(storage_handler.read_properties())
-                reader_info = ReaderInfo(properties, [False], large_format, storage_handler, storage_handler.reference)
-                reader_info_list.append(reader_info)
-            except Exception:
-                logging.debug("Error reading %s", storage_handler.reference)
-                import traceback
-                traceback.print_exc()
-                traceback.print_stack()
+        reader_info_list = self._read_reader_info_list()
 
         # to allow later writing back to storage, associate the data items with their storage adapters
         for reader_info in reader_info_list:
@@ -594,6 +747,13 @@ class ProjectStorageSystem(PersistentStorageSystem):
         else:
             super().write_external_data(item, name, value)
 
+    # override
+    def write_external_data_partial(self, item: Persistence.PersistentObject, name: str, value: numpy.ndarray, dst: typing.Sequence[slice]) -> None:
+        if isinstance(item, DataItem.DataItem) and name == "data":
+            self.__write_data_item_data_partial(item, value, dst)
+        else:
+            super().write_external_data_partial(item, name, value, dst)
+
     # override
     def reserve_external_data(self, item: Persistence.PersistentObject, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype) -> None:
         if isinstance(item, DataItem.DataItem) and name == "data":
@@ -636,15 +796,29 @@ class ProjectStorageSystem(PersistentStorageSystem):
     def __write_data_item_data(self, data_item: DataItem.DataItem, data) -> None:
         storage = self.__storage_adapter_map.get(data_item.uuid)
         if not self.is_write_delayed(data_item):
+            self._prepare_storage_handler_write(storage.storage_handler)
             storage.update_data(data_item, data)
 
+    def __write_data_item_data_partial(self, data_item: DataItem.DataItem, data, dst: typing.Sequence[slice]) -> None:
+        storage = self.__storage_adapter_map.get(data_item.uuid)
+        if not self.is_write_delayed(data_item):
+            self._prepare_storage_handler_write(storage.storage_handler)
+            storage.update_data_partial(data_item, data, dst)
+
     def __reserve_data_item_data(self, data_item: DataItem.DataItem, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype) -> None:
         storage = self.__storage_adapter_map.get(data_item.uuid)
+        self._prepare_storage_handler_write(storage.storage_handler)
         storage.reserve_data(data_item, data_shape, data_dtype)
 
     def __rewrite_data_item_properties(self, data_item: DataItem.DataItem) -> None:
         if not self.is_write_delayed(data_item):
-            self.__storage_adapter_map.get(data_item.uuid).rewrite_item(data_item)
+            storage = self.__storage_adapter_map.get(data_item.uuid)
+            self._prepare_storage_handler_write(storage.storage_handler)
+            storage.rewrite_item(data_item)
+
+    def _prepare_storage_handler_write(self, storage_handler: StorageHandler.StorageHandler) -> None:
+        # called before writing the properties or data of a storage handler; subclasses may extend it.
+        pass
 
     def __restore_item(self, data_item_uuid: uuid.UUID) -> typing.Optional[dict]:
         return self._restore_item(data_item_uuid)
@@ -654,10 +828,23 @@ class FileProjectStorageSystem(ProjectStorageSystem):
 
     _file_handlers = [NDataHandler.NDataHandler, HDF5Handler.HDF5Handler]
 
-    def __init__(self, project_path: pathlib.Path, project_data_path: pathlib.Path = None):
+    # the project file is rewritten at most once per interval; changes in between are coalesced.
+    write_interval = 0.5
+
+    def __init__(self, project_path: pathlib.Path, project_data_path: typing.Optional[pathlib.Path] = None):
         super().__init__()
         self.__project_path = project_path
         self.__project_data_path = project_data_path
+        self.__write_lock = threading.RLock()
+        self.__properties_writer = PropertiesWriter(self._write_properties_snapshot, FileProjectStorageSystem.write_interval)
+        # the file names with entries in the data properties manifest; the entry is removed before the file is written.
+        self.__manifest_lock = threading.RLock()
+        self.__manifest: typing.Optional[DataPropertiesManifest] = None
+        self.__manifest_file_names: typing.Set[str] = set()
+
+    def close(self) -> None:
+        self.__properties_writer.close()
+        super().close()
 
     def load_properties(self) -> None:
         super().load_properties()
@@ -681,24 +868,39 @@ class FileProjectStorageSystem(ProjectStorageSystem):
         return properties
 
     def _write_properties(self) -> None:
-        self.__write_properties_inner(self.get_storage_properties())
+        # the properties are written on a background thread from a snapshot taken just before writing.
+        self.__properties_writer.request_write()
+
+    def flush(self) -> None:
+        """Wait for pending writes of the project properties to complete."""
+        self.__properties_writer.flush()
+
+    def _write_properties_snapshot(self) -> None:
+        # clean_dict makes a copy; hold the properties lock so that the copy is consistent.
+        with self._properties_lock:
+            properties = Utility.clean_dict(self.get_storage_properties())
+        self._write_clean_properties(properties)
 
     def __write_properties_inner(self, properties: typing.Dict) -> None:
+        self._write_clean_properties(Utility.clean_dict(properties))
+
+    def _write_clean_properties(self, properties: typing.Dict) -> None:
+        # every full write of the project file goes through here; subclasses may extend it.
         if self.__project_path:
-            # atomically overwrite
-            temp_filepath = self.__project_path.with_suffix(".temp")
-            with temp_filepath.open("w") as fp:
-                properties = Utility.clean_dict(properties)
-                project_data_paths = list()
-                for project_data_path in [self.__project_data_path] if self.__project_data_path else []:
-                    if project_data_path.parent == self.__project_path.parent:
-                        project_data_path = project_data_path.relative_to(project_data_path.parent)
-                    project_data_paths.append(project_data_path)
-                project_uuid = uuid.uuid4()
-                properties.setdefault("uuid", str(project_uuid))
-                properties["project_data_folders"] = [str(project_data_path) for project_data_path in project_data_paths]
-                json.dump(properties, fp)
-            os.replace(temp_filepath, self.__project_path)
+            # atomically overwrite. the lock prevents concurrent writers from sharing the temporary file.
+            with self.__write_lock:
+                temp_filepath = self.__project_path.with_suffix(".temp")
+                with temp_filepath.open("w") as fp:
+                    project_data_paths = list()
+                    for project_data_path in [self.__project_data_path] if self.__project_data_path else []:
+                        if project_data_path.parent == self.__project_path.parent:
+                            project_data_path = project_data_path.relative_to(project_data_path.parent)
+                        project_data_paths.append(project_data_path)
+                    project_uuid = uuid.uuid4()
+                    properties.setdefault("uuid", str(project_uuid))
+                    properties["project_data_folders"] = [str(project_data_path) for project_data_path in project_data_paths]
+                    json.dump(properties, fp)
+                os.replace(temp_filepath, self.__project_path)
 
     def _get_identifier(self) -> str:
         return str(self.__project_path)
@@ -805,6 +1007,7 @@ class FileProjectStorageSystem(ProjectStorageSystem):
                 # file modified dates are stored as local timestamps
                 earliest_datetime = datetime.datetime.fromtimestamp(0).isoformat()
                 file_datetime = DataItem.DatetimeToStringConverter().convert_back(data_item_properties.get("created", earliest_datetime))
+                self._prepare_storage_handler_write(reader_info.storage_handler)
                 reader_info.storage_handler.write_properties(reader_info.properties, file_datetime)
 
     @staticmethod
@@ -863,26 +1066,368 @@ class FileProjectStorageSystem(ProjectStorageSystem):
                 return file_handler
         return None
 
-    def __find_storage_handlers(self, directory: typing.Optional[pathlib.Path], *, skip_trash: bool = True) -> typing.Sequence[StorageHandler.StorageHandler]:
-        storage_handlers = list()
+    def __find_file_paths(self, directory: typing.Optional[pathlib.Path], *, skip_trash: bool = True) -> typing.Set[str]:
+        absolute_file_paths = set()
         if directory and directory.exists():
-            absolute_file_paths = set()
             for file_path in directory.rglob("*"):
                 if not skip_trash or file_path.parent.name != "trash":
                     if not file_path.name.startswith("."):
                         absolute_file_paths.add(str(file_path))
-            for file_handler in self._file_handlers:
-                for data_file in filter(file_handler.is_matching, absolute_file_paths):
-                    try:
-                        storage_handler = file_handler(data_file)
-                        assert storage_handler.is_valid
-                        storage_handlers.append(storage_handler)
-                    except Exception as e:
-                        logging.error("Exception reading file: %s", data_file)
-                        logging.error(str(e))
-                        raise
+        return absolute_file_paths
+
+    def __make_storage_handler_for_file(self, file_handler: typing.Callable[[str], StorageHandler.StorageHandler],
+                                        data_file: str) -> StorageHandler.StorageHandler:
+        try:
+            storage_handler = file_handler(data_file)
+            assert storage_handler.is_valid
+            return storage_handler
+        except Exception as e:
+            logging.error("Exception reading file: %s", data_file)
+            logging.error(str(e))
+            raise
+
+    def __find_storage_handlers(self, directory: typing.Optional[pathlib.Path], *, skip_trash: bool = True) -> typing.Sequence[StorageHandler.StorageHandler]:
+        storage_handlers = list()
+        absolute_file_paths = self.__find_file_paths(directory, skip_trash=skip_trash)
+        for file_handler in self._file_handlers:
+            for data_file in filter(file_handler.is_matching, absolute_file_paths):
+                storage_handlers.append(self.__make_storage_handler_for_file(file_handler, data_file))
         return storage_handlers
 
+    def _read_reader_info_list(self) -> typing.List[ReaderInfo]:
+        # use the manifest for files unchanged since they were last read; read the others in parallel.
+        project_data_path = self.__project_data_path
+        if not project_data_path or not project_data_path.exists():
+            return super()._read_reader_info_list()
+        manifest = DataPropertiesManifest(project_data_path / DataPropertiesManifest.file_name)
+        manifest_entries = manifest.read_entries()
+        file_handler_map = {file_handler.__name__: file_handler for file_handler in self._file_handlers}
+        reader_info_list = list()
+        unread_storage_handlers = list()
+        unread_file_keys = list()
+        absolute_file_paths = self.__find_file_paths(project_data_path)
+        file_names = dict()
+        for data_file in sorted(absolute_file_paths):
+            file_name = pathlib.Path(data_file).relative_to(project_data_path).as_posix()
+            file_names[data_file] = file_name
+            file_key = DataPropertiesManifest.get_file_key(data_file)
+            manifest_entry = manifest_entries.get(file_name)
+            if file_key and manifest_entry and manifest_entry[0] == file_key and manifest_entry[1] in file_handler_map:
+                storage_handler = self.__make_storage_handler_for_file(file_handler_map[manifest_entry[1]], data_file)
+                large_format = self._is_storage_handler_large_format(storage_handler)
+                properties = json.loads(manifest_entry[2])
+                reader_info_list.append(ReaderInfo(properties, [False], large_format, storage_handler, storage_handler.reference))
+            else:
+                file_handler = self.__get_file_handler_for_file(data_file)
+                if file_handler:
+                    unread_storage_handlers.append(self.__make_storage_handler_for_file(file_handler, data_file))
+                    unread_file_keys.append(file_key)
+        new_manifest_entries = dict()
+        unread_reader_info_list = read_reader_info_list(self, unread_storage_handlers, ProjectStorageSystem.read_thread_count)
+        for reader_info, file_key in zip(unread_reader_info_list, unread_file_keys):
+            if reader_info:
+                reader_info_list.append(reader_info)
+                if file_key and DataPropertiesManifest.is_file_key_cacheable(file_key):
+                    try:
+                        properties_json = json.dumps(reader_info.properties)
+                    except (TypeError, ValueError):
+                        continue
+                    file_name = file_names[reader_info.storage_handler.reference]
+                    new_manifest_entries[file_name] = file_key, type(reader_info.storage_handler).__name__, properties_json
+        removed_file_names = set(manifest_entries.keys()) - set(file_names.values())
+        if new_manifest_entries or removed_file_names:
+            manifest.write_entries(new_manifest_entries, removed_file_names)
+        with self.__manifest_lock:
+            self.__manifest = manifest
+            self.__manifest_file_names = (set(manifest_entries.keys()) | set(new_manifest_entries.keys())) - removed_file_names
+        return reader_info_list
+
+    def _prepare_storage_handler_write(self, storage_handler: StorageHandler.StorageHandler) -> None:
+        # the app sets the modified time of data files and usually rewrites properties without changing the file size,
+        # so the manifest cannot detect the write from the file. remove the entry before the first write instead.
+        with self.__manifest_lock:
+            manifest = self.__manifest
+            project_data_path = self.__project_data_path
+            if manifest and project_data_path and self.__manifest_file_names:
+                try:
+                    file_name = pathlib.Path(storage_handler.reference).relative_to(project_data_path).as_posix()
+                except ValueError:
+                    return
+                if file_name in self.__manifest_file_names:
+                    manifest.write_entries(dict(), {file_name})
+                    self.__manifest_file_names.discard(file_name)
+
+
+class DataPropertiesManifest:
+    """Cache the properties of the data files in a project data folder, keyed by file name, size, and modified time.
+
+    Opening a project reads the properties of every data file, which is slow for large projects or network folders.
+    The manifest stores the properties after transforming them to the latest version, so an unchanged file does not
+    need to be opened at all. The manifest is cleared when the data item writer version changes.
+
+    Data files are written with their modified time set to the data item creation time, and properties are usually
+    rewritten in place without changing the file size, so the key does not change when the app writes a file. The
+    project storage system removes the entry of a file before writing it instead. The key detects files replaced or
+    modified outside of the app.
+
+    The manifest is a sqlite database in the data folder. Errors accessing it are logged and the manifest is ignored.
+    """
+
+    file_name = ".DataProperties.manifest"
+
+    # files modified more recently than this may be modified again without changing the modified time.
+    racy_interval = 2.0
+
+    def __init__(self, manifest_path: pathlib.Path):
+        self.__manifest_path = manifest_path
+
+    @staticmethod
+    def get_file_key(file_path: str) -> typing.Optional[typing.Tuple[int, int]]:
+        try:
+            stat_result = os.stat(file_path)
+            return stat_result.st_size, stat_result.st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def is_file_key_cacheable(file_key: typing.Tuple[int, int]) -> bool:
+        return file_key[1] < (time.time() - DataPropertiesManifest.racy_interval) * 1E9
+
+    def __connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.__manifest_path))
+        conn.execute("CREATE TABLE IF NOT EXISTS manifest("
+                     "file_name TEXT PRIMARY KEY, size INTEGER, modified INTEGER, handler TEXT, properties TEXT)")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != DataItem.DataItem.writer_version:
+            with conn:
+                conn.execute("DELETE FROM manifest")
+                conn.execute(f"PRAGMA user_version = {int(DataItem.DataItem.writer_version)}")
+        return conn
+
+    def read_entries(self) -> typing.Dict[str, typing.Tuple[typing.Tuple[int, int], str, str]]:
+        """Return a dict mapping file name to the file key, handler name, and properties json."""
+        try:
+            with contextlib.closing(self.__connect()) as conn:
+                rows = conn.execute("SELECT file_name, size, modified, handler, properties FROM manifest").fetchall()
+                return {file_name: ((size, modified), handler, properties) for file_name, size, modified, handler, properties in rows}
+        except sqlite3.Error as e:
+            logging.debug("Unable to read data properties manifest %s: %s", self.__manifest_path, e)
+            return dict()
+
+    def write_entries(self, entries: typing.Mapping[str, typing.Tuple[typing.Tuple[int, int], str, str]],
+                      removed_file_names: typing.AbstractSet[str]) -> None:
+        """Add or replace entries in the manifest and remove entries for files which no longer exist."""
+        try:
+            with contextlib.closing(self.__connect()) as conn:
+                with conn:
+                    conn.executemany("DELETE FROM manifest WHERE file_name = ?", [(file_name,) for file_name in removed_file_names])
+                    rows = [(file_name, *file_key, handler, properties) for file_name, (file_key, handler, properties) in entries.items()]
+                    conn.executemany("INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            logging.debug("Unable to write data properties manifest %s: %s", self.__manifest_path, e)
+
+
+class JournaledFileProjectStorageSystem(FileProjectStorageSystem):
+    """File based project storage which appends changes to a journal instead of rewriting the project file.
+
+    Each write appends one line to the journal with the properties of the top level items changed since the previous
+    write, the changed root properties, and the item order of root relationships with inserted or removed items. Data
+    items are stored in their own files and are not journaled. The cost of a write is proportional to the size of the
+    changed items rather than to the size of the project.
+
+    The first line of the journal is a header recording the size and modification time of the project file the
+    entries apply to. Reading replays the journal onto the project file; a journal whose header does not match the
+    project file, for instance because the project file was replaced or migrated, is discarded. The journal is
+    compacted into the project file when it reaches compact_entry_count lines and when closing. An incomplete last
+    line is ignored.
+    """
+
+    compact_entry_count = 1000
+
+    def __init__(self, project_path: pathlib.Path, project_data_path: typing.Optional[pathlib.Path] = None):
+        super().__init__(project_path, project_data_path)
+        self.__journal_path = JournaledFileProjectStorageSystem.get_journal_path(project_path)
+        self.__journal_lock = threading.RLock()
+        self.__journal_entry_count = 0
+        self.__dirty_root_keys = set()  # type: typing.Set[str]
+        self.__dirty_items = dict()  # type: typing.Dict[typing.Tuple[str, str], typing.Tuple[Persistence.PersistentObject, bool]]
+        self.__dirty_relationship_orders = set()  # type: typing.Set[str]
+
+    def close(self) -> None:
+        with self.__journal_lock:
+            if self.__journal_entry_count > 0:
+                self.__compact()
+        super().close()
+
+    @staticmethod
+    def get_journal_path(project_path: pathlib.Path) -> pathlib.Path:
+        return project_path.with_suffix(".nsjournal")
+
+    @staticmethod
+    def get_journal_header(project_path: pathlib.Path) -> typing.Dict:
+        """Return the journal header identifying the current version of the project file."""
+        try:
+            stat = project_path.stat()
+        except FileNotFoundError:
+            return {"type": "header", "project_size": None, "project_mtime_ns": None}
+        return {"type": "header", "project_size": stat.st_size, "project_mtime_ns": stat.st_mtime_ns}
+
+    def _read_properties(self) -> typing.Dict:
+        properties = super()._read_properties()
+        with self.__journal_lock:
+            self.__journal_entry_count = 0
+            if self.__journal_path.exists():
+                is_stale = False
+                with self.__journal_path.open("r") as fp:
+                    header_line = fp.readline()
+                    if header_line:
+                        try:
+                            header = json.loads(header_line)
+                        except ValueError:
+                            header = None
+                        is_stale = header != JournaledFileProjectStorageSystem.get_journal_header(self.project_path)
+                    if not is_stale:
+                        for line in fp:
+                            try:
+                                entries = json.loads(line)
+                            except ValueError:
+                                break  # an incomplete line can only be the last one
+                            for entry in entries:
+                                apply_journal_entry(properties, entry)
+                            self.__journal_entry_count += 1
+                if is_stale:
+                    # the entries were written against a different project file; replaying them could corrupt it.
+                    logging.getLogger("loader").warning(f"Discarding journal {self.__journal_path} which does not match its project file.")
+                    with self.__journal_path.open("w"):
+                        pass
+        return properties
+
+    def __mark_dirty(self, item: Persistence.PersistentObject, name: typing.Optional[str]) -> None:
+        # mark the top level item containing item as changed; or the property name if item is the root.
+        with self.__journal_lock:
+            self.__dirty_root_keys.add("modified")
+            persistent_object_parent = item.persistent_object_parent
+            if not persistent_object_parent:
+                if name:
+                    self.__dirty_root_keys.add(name)
+                else:
+                    self.__dirty_root_keys.update(self.get_storage_properties().keys())
+                return
+            while persistent_object_parent.parent and persistent_object_parent.parent.persistent_object_parent:
+                item = persistent_object_parent.parent
+                persistent_object_parent = item.persistent_object_parent
+            if persistent_object_parent.relationship_name:
+                self.__mark_item_dirty(persistent_object_parent.relationship_name, item, False)
+            elif persistent_object_parent.item_name:
+                self.__dirty_root_keys.add(persistent_object_parent.item_name)
+
+    def __mark_item_dirty(self, relationship_name: str, item: Persistence.PersistentObject, is_removed: bool) -> None:
+        # data items are written to their own files.
+        if not isinstance(item, DataItem.DataItem):
+            self.__dirty_items[(relationship_name, str(item.uuid))] = (item, is_removed)
+
+    def __mark_relationship_dirty(self, parent: Persistence.PersistentObject, name: str, item: Persistence.PersistentObject, is_removed: bool) -> None:
+        if parent.persistent_object_parent:
+            self.__mark_dirty(parent, name)
+        elif not isinstance(item, DataItem.DataItem):
+            with self.__journal_lock:
+                self.__dirty_root_keys.add("modified")
+                self.__mark_item_dirty(name, item, is_removed)
+                self.__dirty_relationship_orders.add(name)
+
+    def insert_item(self, parent: Persistence.PersistentObject, name: str, before_index: int, item: Persistence.PersistentObject) -> None:
+        self.__mark_relationship_dirty(parent, name, item, False)
+        super().insert_item(parent, name, before_index, item)
+
+    def remove_item(self, parent: Persistence.PersistentObject, name: str, index: int, item: Persistence.PersistentObject) -> None:
+        # the properties are written before the item is detached, so the removal must be marked explicitly.
+        self.__mark_relationship_dirty(parent, name, item, True)
+        super().remove_item(parent, name, index, item)
+
+    def set_item(self, parent: Persistence.PersistentObject, name: str, item: Persistence.PersistentObject) -> None:
+        self.__mark_dirty(parent, name)
+        super().set_item(parent, name, item)
+
+    def set_property(self, object: Persistence.PersistentObject, name: str, value: typing.Any) -> None:
+        self.__mark_dirty(object, name)
+        super().set_property(object, name, value)
+
+    def clear_property(self, object: Persistence.PersistentObject, name: str) -> None:
+        self.__mark_dirty(object, name)
+        super().clear_property(object, name)
+
+    def rewrite_item(self, item: Persistence.PersistentObject) -> None:
+        self.__mark_dirty(item, None)
+        super().rewrite_item(item)
+
+    def _write_properties(self) -> None:
+        # append the changes synchronously; the write is small, and the journal order must match the change order.
+        with self.__journal_lock:
+            entries = list()
+            with self._properties_lock:
+                properties = self.get_storage_properties()
+                for name in sorted(self.__dirty_root_keys):
+                    if name in properties:
+                        entries.append({"type": "property", "name": name, "value": Utility.clean_item(properties[name])})
+                    else:
+                        entries.append({"type": "clear", "name": name})
+                for (relationship_name, item_uuid_str), (item, is_removed) in self.__dirty_items.items():
+                    if not is_removed and item.persistent_dict is not None:
+                        item_properties = Utility.clean_dict(item.persistent_dict)
+                        entries.append({"type": "item", "relationship": relationship_name, "uuid": item_uuid_str, "properties": item_properties})
+                    else:
+                        entries.append({"type": "remove", "relationship": relationship_name, "uuid": item_uuid_str})
+                for relationship_name in sorted(self.__dirty_relationship_orders):
+                    item_uuids = [item_d.get("uuid") for item_d in properties.get(relationship_name, list())]
+                    entries.append({"type": "order", "relationship": relationship_name, "uuids": item_uuids})
+            self.__dirty_root_keys.clear()
+            self.__dirty_items.clear()
+            self.__dirty_relationship_orders.clear()
+            if entries:
+                with self.__journal_path.open("a") as fp:
+                    if fp.tell() == 0:
+                        fp.write(json.dumps(JournaledFileProjectStorageSystem.get_journal_header(self.project_path)) + "\n")
+                    fp.write(json.dumps(entries) + "\n")
+                self.__journal_entry_count += 1
+                if self.__journal_entry_count >= JournaledFileProjectStorageSystem.compact_entry_count:
+                    self.__compact()
+
+    def _write_clean_properties(self, properties: typing.Dict) -> None:
+        # any full write of the project file, including compaction and migration, starts a new journal whose header
+        # matches the new project file. write the project file before truncating the journal so that a failure in
+        # between leaves a journal which is discarded as stale when reading the new project file.
+        with self.__journal_lock:
+            super()._write_clean_properties(properties)
+            with self.__journal_path.open("w") as fp:
+                fp.write(json.dumps(JournaledFileProjectStorageSystem.get_journal_header(self.project_path)) + "\n")
+            self.__journal_entry_count = 0
+
+    def __compact(self) -> None:
+        # called with the journal lock held.
+        self._write_properties_snapshot()
+
+
+def apply_journal_entry(properties: typing.Dict, entry: typing.Mapping) -> None:
+    """Apply a journal entry written by JournaledFileProjectStorageSystem to the project properties."""
+    entry_type = entry["type"]
+    if entry_type == "property":
+        properties[entry["name"]] = entry["value"]
+    elif entry_type == "clear":
+        properties.pop(entry["name"], None)
+    elif entry_type in ("item", "remove"):
+        item_list = properties.setdefault(entry["relationship"], list())
+        index = next((i for i, item_d in enumerate(item_list) if item_d.get("uuid") == entry["uuid"]), None)
+        if entry_type == "remove":
+            if index is not None:
+                del item_list[index]
+        elif index is not None:
+            item_list[index] = entry["properties"]
+        else:
+            item_list.append(entry["properties"])
+    elif entry_type == "order":
+        item_list = properties.setdefault(entry["relationship"], list())
+        item_map = {item_d.get("uuid"): item_d for item_d in item_list}
+        item_list[:] = [item_map[item_uuid] for item_uuid in entry["uuids"] if item_uuid in item_map]
+
 
 class MemoryStorageHandler(StorageHandler.StorageHandler):
 
@@ -927,10 +1472,17 @@ class MemoryStorageHandler(StorageHandler.StorageHandler):
     def write_properties(self, properties: typing.Dict, file_datetime: datetime.datetime) -> None:
         self.__data_properties_map[self.__uuid] = Utility.clean_dict(properties)
 
-    def write_data(self, data: numpy.ndarray, file_datetime: datetime.datetime) -> None:
+    def write_data(self, data: numpy.ndarray, file_datetime: datetime.datetime, *, data_descriptor=None) -> None:
         self.__data_map[self.__uuid] = data.copy()
 
-    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime: datetime.datetime) -> None:
+    def write_data_partial(self, data: numpy.ndarray, dst: typing.Sequence[slice], file_datetime: datetime.datetime) -> None:
+        existing_data = self.__data_map.get(self.__uuid)
+        if existing_data is not None and existing_data.shape == data.shape and existing_data.dtype == data.dtype:
+            existing_data[tuple(dst)] = data[tuple(dst)]
+        else:
+            self.write_data(data, file_datetime)
+
+    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime: datetime.datetime, *, data_descriptor=None) -> None:
         self.__data_map[self.__uuid] = numpy.zeros(data_shape, data_dtype)
 
     def prepare_move(self) -> None:
@@ -949,6 +1501,8 @@ class MemoryProjectStorageSystem(ProjectStorageSystem):
         self.__data_properties_map = data_properties_map if data_properties_map is not None else dict()
         self.__data_map = data_map if data_map is not None else dict()
         self.__trash_map = trash_map if trash_map is not None else dict()
+        # data items are migrated on multiple threads.
+        self.__migrate_lock = threading.RLock()
         self._test_data_read_event = data_read_event or Event.Event()
 
     def _read_properties(self) -> typing.Dict:
@@ -1005,7 +1559,9 @@ class MemoryProjectStorageSystem(ProjectStorageSystem):
         properties = reader_info.properties
         properties = Utility.clean_dict(copy.deepcopy(properties) if properties else dict())
         if reader_info.changed_ref[0]:
-            self.__data_properties_map[storage_handler.reference] = Migration.transform_from_latest(copy.deepcopy(properties))
+            data_item_properties = Migration.transform_from_latest(copy.deepcopy(properties))
+            with self.__migrate_lock:
+                self.__data_properties_map[storage_handler.reference] = data_item_properties
         return reader_info
 
     def _migrate_library_properties(self, library_properties: typing.Dict, reader_info_list: typing.List[ReaderInfo]) -> None:
@@ -1040,7 +1596,13 @@ class MemoryProjectStorageSystem(ProjectStorageSystem):
         return self._find_storage_handlers()
 
 
+# when True, index projects journal their changes. a project with an existing journal is always journaled.
+journal_project_properties = False
+
+
 def make_index_project_storage_system(project_path: pathlib.Path) -> typing.Optional[ProjectStorageSystem]:
+    if journal_project_properties or JournaledFileProjectStorageSystem.get_journal_path(project_path).exists():
+        return JournaledFileProjectStorageSystem(project_path)
     return FileProjectStorageSystem(project_path)
 
 
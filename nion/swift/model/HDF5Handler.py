@@ -2,12 +2,14 @@
     A module for handle .h5 files for Swift.
 """
 
+import collections
 import io
 import json
 import os
 import pathlib
 import threading
 import typing
+import weakref
 
 import h5py
 import numpy
@@ -28,11 +30,11 @@ def make_directory_if_needed(directory_path):
         os.makedirs(directory_path)
 
 
-def get_write_chunk_shape_for_data(data_shape, data_dtype):
+def get_write_chunk_shape_for_data(data_shape, data_dtype, target_chunk_size=580*1024):
     """
     Calculate an appropriate write chunk shape for a given data shape and dtype.
 
-    The target chunk size is 580 kB which seems to be a sweet spot according to benchmarks.
+    The default target chunk size is 580 kB which seems to be a sweet spot according to benchmarks.
     The algorithm assumes that the data is c-contiguous in memory.
 
     If the total number of chunks that the calculated chunk shape would lead to is less than 100 (i.e. the file will
@@ -40,7 +42,7 @@ def get_write_chunk_shape_for_data(data_shape, data_dtype):
     """
     data_dtype = numpy.dtype(data_dtype)
 
-    target_chunk_size = 580*1024/data_dtype.itemsize
+    target_chunk_size = target_chunk_size/data_dtype.itemsize
     chunk_size = 1
     counter = len(data_shape)
     chunk_shape = [1] * len(data_shape)
@@ -66,30 +68,199 @@ def get_write_chunk_shape_for_data(data_shape, data_dtype):
 
 
 
+class DatasetPolicy:
+    """Choose the chunk shape and compression of a dataset.
+
+    The default policy uses get_write_chunk_shape_for_data and no compression. Compression requires chunking and is
+    only applied to chunked datasets. The compression options are passed to h5py; for instance, compression "gzip"
+    with compression_opts 1, or compression "lzf" with shuffle True.
+    """
+
+    def __init__(self, *, target_chunk_size: int = 580 * 1024, compression: typing.Optional[str] = None,
+                 compression_opts: typing.Any = None, shuffle: bool = False):
+        self.target_chunk_size = target_chunk_size
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.shuffle = shuffle
+
+    def get_chunk_shape(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, data_descriptor) -> typing.Optional[typing.Tuple[int, ...]]:
+        return get_write_chunk_shape_for_data(data_shape, data_dtype, self.target_chunk_size)
+
+    def get_dataset_options(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, data_descriptor) -> typing.Dict[str, typing.Any]:
+        """Return the keyword arguments for creating the dataset."""
+        chunks = self.get_chunk_shape(data_shape, data_dtype, data_descriptor)
+        options = {"chunks": chunks}  # type: typing.Dict[str, typing.Any]
+        if chunks and self.compression:
+            options["compression"] = self.compression
+            if self.compression_opts is not None:
+                options["compression_opts"] = self.compression_opts
+            options["shuffle"] = self.shuffle
+        return options
+
+
+class FrameDatasetPolicy(DatasetPolicy):
+    """Chunk sequence and collection data by whole frames, where a frame is the datum of one navigation index.
+
+    Small frames are grouped along the trailing navigation axes up to the target chunk size, so reading a frame or a
+    run of consecutive frames reads only the chunks containing them. Frames larger than max_chunk_size are split along
+    their first datum axis. Data without navigation or datum dimensions uses the default policy.
+    """
+
+    def __init__(self, *, max_chunk_size: int = 8 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.max_chunk_size = max_chunk_size
+
+    def get_chunk_shape(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, data_descriptor) -> typing.Optional[typing.Tuple[int, ...]]:
+        datum_dimension_count = data_descriptor.datum_dimension_count if data_descriptor else 0
+        navigation_dimension_count = len(data_shape) - datum_dimension_count
+        if datum_dimension_count == 0 or navigation_dimension_count <= 0 or 0 in data_shape:
+            return super().get_chunk_shape(data_shape, data_dtype, data_descriptor)
+        datum_shape = list(data_shape[navigation_dimension_count:])
+        frame_size = int(numpy.prod(datum_shape)) * numpy.dtype(data_dtype).itemsize
+        navigation_chunk_shape = [1] * navigation_dimension_count
+        if frame_size > self.max_chunk_size:
+            row_size = frame_size // datum_shape[0]
+            datum_shape[0] = max(1, min(datum_shape[0], self.max_chunk_size // row_size))
+        else:
+            frame_count = max(1, self.target_chunk_size // frame_size)
+            for index in reversed(range(navigation_dimension_count)):
+                navigation_chunk_shape[index] = min(data_shape[index], frame_count)
+                frame_count //= navigation_chunk_shape[index]
+                if navigation_chunk_shape[index] < data_shape[index] or frame_count <= 1:
+                    break
+        return tuple(navigation_chunk_shape + datum_shape)
+
+
+default_dataset_policy = DatasetPolicy()
+
+frame_dataset_policy = FrameDatasetPolicy()
+
+
+def get_dataset_policy(data_descriptor) -> DatasetPolicy:
+    """Return the dataset policy for data with the data descriptor, which may be None if unknown."""
+    if data_descriptor and data_descriptor.datum_dimension_count > 0:
+        if data_descriptor.is_sequence or data_descriptor.collection_dimension_count > 0:
+            return frame_dataset_policy
+    return default_dataset_policy
+
+
+class FilePool:
+    """Limit the number of open files by closing the least recently used files.
+
+    Handlers register with the pool when they open their file and are touched each time the file is accessed. When
+    more than max_open_count files are open, the least recently used handlers are asked to close their file. A handler
+    refuses if it is in use on another thread or if the data it returned from read_data is still referenced, so the
+    limit may be exceeded temporarily. A handler reopens its file transparently on the next access.
+
+    The counters (hits, misses, reopens, and evictions) are for tuning max_open_count.
+    """
+
+    def __init__(self, max_open_count: int = 128):
+        self.max_open_count = max_open_count
+        self.hit_count = 0
+        self.miss_count = 0
+        self.reopen_count = 0
+        self.evict_count = 0
+        self.__lock = threading.RLock()
+        self.__handlers = collections.OrderedDict()  # type: typing.OrderedDict[HDF5Handler, None]
+
+    @property
+    def open_count(self) -> int:
+        return len(self.__handlers)
+
+    def reset_counters(self) -> None:
+        with self.__lock:
+            self.hit_count = 0
+            self.miss_count = 0
+            self.reopen_count = 0
+            self.evict_count = 0
+
+    def touch(self, handler: "HDF5Handler") -> None:
+        with self.__lock:
+            self.hit_count += 1
+            self.__handlers.move_to_end(handler)
+
+    def add(self, handler: "HDF5Handler", is_reopen: bool) -> None:
+        with self.__lock:
+            self.miss_count += 1
+            if is_reopen:
+                self.reopen_count += 1
+            self.__handlers[handler] = None
+            self.__handlers.move_to_end(handler)
+            if len(self.__handlers) > self.max_open_count:
+                for lru_handler in list(self.__handlers.keys()):
+                    if len(self.__handlers) <= self.max_open_count:
+                        break
+                    if lru_handler is not handler and lru_handler._evict():
+                        self.evict_count += 1
+                        self.__handlers.pop(lru_handler, None)
+
+    def remove(self, handler: "HDF5Handler") -> None:
+        with self.__lock:
+            self.__handlers.pop(handler, None)
+
+
 class HDF5Handler(StorageHandler.StorageHandler):
     count = 0  # useful for detecting leaks in tests
 
+    # the pool shared by all handlers. replace or configure it to change the maximum number of open files.
+    file_pool = FilePool()
+
+    # the function choosing the dataset policy from the data descriptor when a dataset is created.
+    dataset_policy_fn = staticmethod(get_dataset_policy)
+
     def __init__(self, file_path):
         self.__file_path = str(file_path)
         self.__lock = threading.RLock()
         self.__fp = None
         self.__dataset = None
+        self.__is_evicted = False
+        self.__data_descriptor = None
         self._write_count = 0
         HDF5Handler.count += 1
 
     def close(self):
         HDF5Handler.count -= 1
-        if self.__fp:
-            self.__dataset = None
-            self.__fp.close()
-            self.__fp = None
+        self.__close_file()
 
     # called before the file is moved; close but don't count.
     def prepare_move(self) -> None:
-        if self.__fp:
-            self.__dataset = None
-            self.__fp.close()
-            self.__fp = None
+        self.__close_file()
+
+    def __close_file(self) -> None:
+        with self.__lock:
+            if self.__fp:
+                self.__dataset = None
+                self.__fp.close()
+                self.__fp = None
+                HDF5Handler.file_pool.remove(self)
+
+    def _evict(self) -> bool:
+        """Close the file to reduce the number of open files, if possible. Called by the file pool.
+
+        Return whether the file was closed. The file is not closed if the handler is in use on another thread or the
+        dataset returned from read_data is still in use.
+        """
+        if not self.__lock.acquire(blocking=False):
+            return False
+        try:
+            if self.__dataset is not None:
+                try:
+                    dataset_ref = weakref.ref(self.__dataset)
+                except TypeError:
+                    return False
+                self.__dataset = None
+                dataset = dataset_ref()
+                if dataset is not None:
+                    self.__dataset = dataset
+                    return False
+            if self.__fp:
+                self.__fp.close()
+                self.__fp = None
+                self.__is_evicted = True
+            return True
+        finally:
+            self.__lock.release()
 
     @property
     def reference(self):
@@ -121,6 +292,10 @@ class HDF5Handler(StorageHandler.StorageHandler):
         if not self.__fp:
             make_directory_if_needed(os.path.dirname(self.__file_path))
             self.__fp = h5py.File(self.__file_path, "a")
+            HDF5Handler.file_pool.add(self, self.__is_evicted)
+            self.__is_evicted = False
+        else:
+            HDF5Handler.file_pool.touch(self)
 
     def __write_properties_to_dataset(self, properties):
         with self.__lock:
@@ -148,9 +323,14 @@ class HDF5Handler(StorageHandler.StorageHandler):
                 else:
                     self.__dataset = self.__fp.create_dataset("data", data=numpy.empty((0,)))
 
-    def write_data(self, data, file_datetime):
+    def __get_dataset_options(self, data_shape, data_dtype) -> typing.Dict[str, typing.Any]:
+        return HDF5Handler.dataset_policy_fn(self.__data_descriptor).get_dataset_options(data_shape, data_dtype, self.__data_descriptor)
+
+    def write_data(self, data, file_datetime, *, data_descriptor=None):
         with self.__lock:
             assert data is not None
+            if data_descriptor is not None:
+                self.__data_descriptor = data_descriptor
             self.__ensure_open()
             json_properties = None
             # handle three cases:
@@ -159,29 +339,46 @@ class HDF5Handler(StorageHandler.StorageHandler):
             #   3 - 'data' exists and is the same size (overwrite)
             if not "data" in self.__fp:
                 # case 1
-                chunks = get_write_chunk_shape_for_data(data.shape, data.dtype)
-                self.__dataset = self.__fp.require_dataset("data", shape=data.shape, dtype=data.dtype, chunks=chunks)
+                dataset_options = self.__get_dataset_options(data.shape, data.dtype)
+                self.__dataset = self.__fp.require_dataset("data", shape=data.shape, dtype=data.dtype, **dataset_options)
             else:
                 if self.__dataset is None:
                     self.__dataset = self.__fp["data"]
                 if self.__dataset.shape != data.shape or self.__dataset.dtype != data.dtype:
                     # case 2
                     json_properties = self.__dataset.attrs.get("properties", "")
-                    self.__dataset = None
-                    self.__fp.close()
-                    self.__fp = None
+                    self.__close_file()
                     os.remove(self.__file_path)
                     self.__ensure_open()
-                    chunks = get_write_chunk_shape_for_data(data.shape, data.dtype)
-                    self.__dataset = self.__fp.require_dataset("data", shape=data.shape, dtype=data.dtype, chunks=chunks)
+                    dataset_options = self.__get_dataset_options(data.shape, data.dtype)
+                    self.__dataset = self.__fp.require_dataset("data", shape=data.shape, dtype=data.dtype, **dataset_options)
             self.__copy_data(data)
             if json_properties is not None:
                 self.__dataset.attrs["properties"] = json_properties
             self.__fp.flush()
 
-    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime) -> None:
+    def write_data_partial(self, data, dst, file_datetime):
+        with self.__lock:
+            assert data is not None
+            self.__ensure_open()
+            if self.__dataset is None and "data" in self.__fp:
+                self.__dataset = self.__fp["data"]
+            if self.__dataset is None or self.__dataset.shape != data.shape or self.__dataset.dtype != data.dtype:
+                # the existing dataset cannot receive a region write; write everything.
+                self.write_data(data, file_datetime)
+            else:
+                # write only the hyperslab described by dst into the existing dataset.
+                if id(data) != id(self.__dataset):
+                    dst = tuple(dst)
+                    self.__dataset[dst] = data[dst]
+                    self._write_count += 1
+                self.__fp.flush()
+
+    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime, *, data_descriptor=None) -> None:
         # reserve data of the given shape and dtype, filled with zeros
         with self.__lock:
+            if data_descriptor is not None:
+                self.__data_descriptor = data_descriptor
             self.__ensure_open()
             json_properties = None
             # first read existing properties and then close existing data set and file.
@@ -189,14 +386,12 @@ class HDF5Handler(StorageHandler.StorageHandler):
                 if self.__dataset is None:
                     self.__dataset = self.__fp["data"]
                 json_properties = self.__dataset.attrs.get("properties", "")
-                self.__dataset = None
-                self.__fp.close()
-                self.__fp = None
+                self.__close_file()
                 os.remove(self.__file_path)
                 self.__ensure_open()
             # reserve the data
-            chunks = get_write_chunk_shape_for_data(data_shape, data_dtype)
-            self.__dataset = self.__fp.require_dataset("data", shape=data_shape, dtype=data_dtype, fillvalue=0, chunks=chunks)
+            dataset_options = self.__get_dataset_options(data_shape, data_dtype)
+            self.__dataset = self.__fp.require_dataset("data", shape=data_shape, dtype=data_dtype, fillvalue=0, **dataset_options)
             if json_properties is not None:
                 self.__dataset.attrs["properties"] = json_properties
             self.__fp.flush()
@@ -208,30 +403,24 @@ class HDF5Handler(StorageHandler.StorageHandler):
 
     def write_properties(self, properties, file_datetime):
         with self.__lock:
-            self.__ensure_open()
             self.__ensure_dataset()
             self.__write_properties_to_dataset(properties)
             self.__fp.flush()
 
     def read_properties(self):
         with self.__lock:
-            self.__ensure_open()
             self.__ensure_dataset()
             json_properties = self.__dataset.attrs.get("properties", "")
             return json.loads(json_properties)
 
     def read_data(self):
         with self.__lock:
-            self.__ensure_open()
             self.__ensure_dataset()
             if self.__dataset.shape == (0, ):
                 return None
             return self.__dataset
 
     def remove(self):
-        if self.__fp:
-            self.__dataset = None
-            self.__fp.close()
-            self.__fp = None
+        self.__close_file()
         if os.path.isfile(self.__file_path):
             os.remove(self.__file_path)
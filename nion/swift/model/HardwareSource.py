@@ -11,6 +11,7 @@ This module also defines individual functions that can be used to collect data f
 """
 
 # system imports
+import collections
 import configparser
 import contextlib
 import copy
@@ -512,7 +513,10 @@ class DataChannel:
         channel_index = self.index
         channel_id = self.channel_id
         channel_name = self.name
-        metadata = copy.deepcopy(data_and_metadata.metadata)
+        # new_data_and_metadata below makes the only deep copy of the metadata. copy the hardware_source dict, which
+        # is modified here, so that the metadata of the source is unchanged.
+        metadata = dict(data_and_metadata.metadata)
+        metadata["hardware_source"] = dict(metadata.get("hardware_source", dict()))
         hardware_source_metadata = dict()
         hardware_source_metadata["hardware_source_id"] = hardware_source_id
         hardware_source_metadata["channel_index"] = channel_index
@@ -525,7 +529,7 @@ class DataChannel:
             hardware_source_metadata["channel_name"] = channel_name
         if view_id:
             hardware_source_metadata["view_id"] = view_id
-        metadata.setdefault("hardware_source", dict()).update(hardware_source_metadata)
+        metadata["hardware_source"].update(hardware_source_metadata)
 
         data = data_and_metadata.data
         data_shape = data_shape or data.shape
@@ -1150,6 +1154,18 @@ class DataChannelBuffer:
     a full frame of data, then stores it if it matches criteria (for instance every
     n seconds). Clients can retrieve earliest or latest data.
 
+    Frames are stored in a ring of preallocated slots, one array per channel per slot, so
+    storing a frame is a copy into existing memory rather than a new allocation. When the
+    buffer is full, the oldest frame is evicted and counted as an overrun.
+
+    The grab methods return borrowed, read only frames by default. A borrowed frame remains
+    valid until its slot is reused, which happens after buffer_size further frames. Pass
+    copy=True to take ownership of an independent copy of the frame.
+
+    Clients which always take ownership of the frames can pass reuse_slots=False. Each frame is
+    then stored in a new array which is handed to the client when grabbed, so it is only copied
+    once and never overwritten.
+
     Possible uses: record every frame, record every nth frame, record frame periodically,
       frame averaging, spectrum imaging.
     """
@@ -1159,12 +1175,18 @@ class DataChannelBuffer:
         started = 1
         paused = 2
 
-    def __init__(self, data_channels: typing.List[DataChannel], buffer_size=16):
+    def __init__(self, data_channels: typing.List[DataChannel], buffer_size=16, *, reuse_slots: bool = True):
         self.__state_lock = threading.RLock()
         self.__state = DataChannelBuffer.State.idle
-        self.__buffer_size = buffer_size
+        self.__buffer_size = max(1, buffer_size)
+        self.__reuse_slots = reuse_slots
         self.__buffer_lock = threading.RLock()
-        self.__buffer = list()
+        self.__buffer = collections.deque()
+        self.__slots = [dict() for _ in range(self.__buffer_size)]
+        self.__slot_index = 0
+        self.__frame_count = 0
+        self.__drop_count = 0
+        self.__overrun_count = 0
         self.__done_events = list()
         self.__active_channel_ids = set()
         self.__latest = dict()
@@ -1192,6 +1214,50 @@ class DataChannelBuffer:
         self.__data_channel_updated_listeners = None
         self.__data_channel_start_listeners = None
         self.__data_channel_stop_listeners = None
+        with self.__buffer_lock:
+            self.__buffer.clear()
+            self.__slots = [dict() for _ in range(self.__buffer_size)]
+
+    @property
+    def frame_count(self) -> int:
+        """Return the number of frames stored in the buffer since it was created."""
+        return self.__frame_count
+
+    @property
+    def drop_count(self) -> int:
+        """Return the number of stored frames discarded unread by grab_latest or grab_next."""
+        return self.__drop_count
+
+    @property
+    def overrun_count(self) -> int:
+        """Return the number of frames evicted unread because the buffer was full."""
+        return self.__overrun_count
+
+    def __store_in_slot(self, slot: typing.Dict, channel_id, data_and_metadata: DataAndMetadata.DataAndMetadata) -> DataAndMetadata.DataAndMetadata:
+        data = data_and_metadata.data
+        if not self.__reuse_slots:
+            # the frame is handed to the client; make it independent of the data channel, metadata included.
+            return DataAndMetadata.new_data_and_metadata(numpy.copy(data),
+                                                         intensity_calibration=data_and_metadata.intensity_calibration,
+                                                         dimensional_calibrations=data_and_metadata.dimensional_calibrations,
+                                                         metadata=data_and_metadata.metadata,
+                                                         timestamp=data_and_metadata.timestamp,
+                                                         data_descriptor=data_and_metadata.data_descriptor)
+        slot_data = slot.get(channel_id)
+        if slot_data is None or slot_data.shape != data.shape or slot_data.dtype != data.dtype:
+            slot_data = numpy.empty(data.shape, data.dtype)
+            slot[channel_id] = slot_data
+        numpy.copyto(slot_data, data)
+        borrowed_data = slot_data.view()
+        borrowed_data.flags.writeable = False
+        borrowed_data_and_metadata = DataAndMetadata.new_data_and_metadata(borrowed_data,
+                                                                           intensity_calibration=data_and_metadata.intensity_calibration,
+                                                                           dimensional_calibrations=data_and_metadata.dimensional_calibrations,
+                                                                           timestamp=data_and_metadata.timestamp,
+                                                                           data_descriptor=data_and_metadata.data_descriptor)
+        # share the metadata, which data channels make for each frame, rather than deep copying it again.
+        borrowed_data_and_metadata.data_metadata.metadata = data_and_metadata.metadata
+        return borrowed_data_and_metadata
 
     def __data_channel_updated(self, data_channel: DataChannel, data_and_metadata: DataAndMetadata.DataAndMetadata) -> None:
         if self.__state == DataChannelBuffer.State.started:
@@ -1199,14 +1265,20 @@ class DataChannelBuffer:
                 with self.__buffer_lock:
                     self.__latest[data_channel.channel_id] = data_and_metadata
                     if set(self.__latest.keys()).issuperset(self.__active_channel_ids):
+                        # the slot about to be reused holds the oldest frame when the buffer is full; evict it first.
+                        if len(self.__buffer) == self.__buffer_size:
+                            self.__buffer.popleft()
+                            self.__overrun_count += 1
+                        slot = self.__slots[self.__slot_index]
+                        self.__slot_index = (self.__slot_index + 1) % self.__buffer_size
                         data_and_metadata_list = list()
                         for data_channel in self.__data_channels:
-                            if data_channel.channel_id in self.__latest:
-                                data_and_metadata_list.append(copy.deepcopy(self.__latest[data_channel.channel_id]))
+                            channel_id = data_channel.channel_id
+                            if channel_id in self.__latest:
+                                data_and_metadata_list.append(self.__store_in_slot(slot, channel_id, self.__latest[channel_id]))
                         self.__buffer.append(data_and_metadata_list)
+                        self.__frame_count += 1
                         self.__latest = dict()
-                        if len(self.__buffer) > self.__buffer_size:
-                            self.__buffer.pop(0)
                         for done_event in self.__done_events:
                             done_event.set()
                         self.__done_events = list()
@@ -1217,46 +1289,59 @@ class DataChannelBuffer:
     def __data_channel_stop(self, data_channel: DataChannel) -> None:
         self.__active_channel_ids.remove(data_channel.channel_id)
 
-    def grab_latest(self, timeout: float=None) -> typing.List[DataAndMetadata.DataAndMetadata]:
-        """Grab the most recent data from the buffer, blocking until one is available. Clear earlier data."""
+    def __wait_for_frame(self, timeout: float) -> None:
+        # must be called with the buffer lock held.
+        if len(self.__buffer) == 0:
+            done_event = threading.Event()
+            self.__done_events.append(done_event)
+            self.__buffer_lock.release()
+            done = done_event.wait(timeout)
+            self.__buffer_lock.acquire()
+            if not done:
+                raise Exception("Could not grab latest.")
+
+    def __make_result(self, data_and_metadata_list: typing.List[DataAndMetadata.DataAndMetadata], copy_data: bool) -> typing.List[DataAndMetadata.DataAndMetadata]:
+        # frames which are not stored in reused slots are already owned by the client.
+        if copy_data and self.__reuse_slots:
+            return [copy.deepcopy(data_and_metadata) for data_and_metadata in data_and_metadata_list]
+        return list(data_and_metadata_list)
+
+    def grab_latest(self, timeout: float=None, *, copy: bool=False) -> typing.List[DataAndMetadata.DataAndMetadata]:
+        """Grab the most recent data from the buffer, blocking until one is available. Clear earlier data.
+
+        Returns borrowed frames unless copy is True."""
         timeout = timeout if timeout is not None else 10.0
         with self.__buffer_lock:
-            if len(self.__buffer) == 0:
-                done_event = threading.Event()
-                self.__done_events.append(done_event)
-                self.__buffer_lock.release()
-                done = done_event.wait(timeout)
-                self.__buffer_lock.acquire()
-                if not done:
-                    raise Exception("Could not grab latest.")
-            result = self.__buffer[-1]
-            self.__buffer = list()
-            return result
-
-    def grab_earliest(self, timeout: float=None) -> typing.List[DataAndMetadata.DataAndMetadata]:
-        """Grab the earliest data from the buffer, blocking until one is available."""
+            self.__wait_for_frame(timeout)
+            result = self.__buffer.pop()
+            self.__drop_count += len(self.__buffer)
+            self.__buffer.clear()
+            return self.__make_result(result, copy)
+
+    def grab_earliest(self, timeout: float=None, *, copy: bool=False) -> typing.List[DataAndMetadata.DataAndMetadata]:
+        """Grab the earliest data from the buffer, blocking until one is available.
+
+        Returns borrowed frames unless copy is True."""
         timeout = timeout if timeout is not None else 10.0
         with self.__buffer_lock:
-            if len(self.__buffer) == 0:
-                done_event = threading.Event()
-                self.__done_events.append(done_event)
-                self.__buffer_lock.release()
-                done = done_event.wait(timeout)
-                self.__buffer_lock.acquire()
-                if not done:
-                    raise Exception("Could not grab latest.")
-            return self.__buffer.pop(0)
-
-    def grab_next(self, timeout: float=None) -> typing.List[DataAndMetadata.DataAndMetadata]:
-        """Grab the next data to finish from the buffer, blocking until one is available."""
+            self.__wait_for_frame(timeout)
+            return self.__make_result(self.__buffer.popleft(), copy)
+
+    def grab_next(self, timeout: float=None, *, copy: bool=False) -> typing.List[DataAndMetadata.DataAndMetadata]:
+        """Grab the next data to finish from the buffer, blocking until one is available.
+
+        Returns borrowed frames unless copy is True."""
         with self.__buffer_lock:
-            self.__buffer = list()
-        return self.grab_latest(timeout)
+            self.__drop_count += len(self.__buffer)
+            self.__buffer.clear()
+        return self.grab_latest(timeout, copy=copy)
+
+    def grab_following(self, timeout: float=None, *, copy: bool=False) -> typing.List[DataAndMetadata.DataAndMetadata]:
+        """Grab the next data to start from the buffer, blocking until one is available.
 
-    def grab_following(self, timeout: float=None) -> typing.List[DataAndMetadata.DataAndMetadata]:
-        """Grab the next data to start from the buffer, blocking until one is available."""
-        self.grab_next(timeout)
-        return self.grab_next(timeout)
+        Returns borrowed frames unless copy is True."""
+        self.grab_next(timeout, copy=False)
+        return self.grab_next(timeout, copy=copy)
 
     def start(self) -> None:
         """Start recording.
@@ -16,6 +16,7 @@ import struct
 import threading
 import time
 import typing
+import weakref
 
 # local libraries
 from nion.swift.model import StorageHandler
@@ -131,7 +132,51 @@ def write_end_of_directory(fp, dir_size, dir_offset, count):
     fp.write(struct.pack('H', 0))           # comment len
 
 
-def write_zip_fp(fp, data, properties, dir_data_list=None):
+def encode_json(properties):
+    """
+        Encode the properties as json bytes suitable for storing in the zip file
+
+        :param properties: the properties to encode
+        :return: the encoded json bytes, without padding
+    """
+    json_str = str()
+    try:
+        class JSONEncoder(json.JSONEncoder):
+            def default(self, obj):
+                if isinstance(obj, Geometry.IntPoint) or isinstance(obj, Geometry.IntSize) or isinstance(obj, Geometry.IntRect) or isinstance(obj, Geometry.FloatPoint) or isinstance(obj, Geometry.FloatSize) or isinstance(obj, Geometry.FloatRect):
+                    return tuple(obj)
+                else:
+                    return json.JSONEncoder.default(self, obj)
+        json_io = io.StringIO()
+        json.dump(properties, json_io, cls=JSONEncoder)
+        json_str = json_io.getvalue()
+    except Exception as e:
+        # catch exceptions to avoid corrupt zip files
+        import traceback
+        logging.error("Exception writing zip file %s" + str(e))
+        traceback.print_exc()
+        traceback.print_stack()
+    return bytes(json_str, 'ISO-8859-1')
+
+
+def pad_json(json_bytes, json_len=None):
+    """
+        Pad the json bytes with trailing spaces, which json readers ignore
+
+        :param json_bytes: the json bytes to pad
+        :param json_len: the padded length; if None, the length includes slack for future growth
+        :return: the padded json bytes
+
+        The slack allows later property changes to be written in place without moving or
+        rewriting anything else in the zip file.
+    """
+    if json_len is None:
+        json_len = len(json_bytes) + max(len(json_bytes) // 4, 1024)
+    assert json_len >= len(json_bytes)
+    return json_bytes + b" " * (json_len - len(json_bytes))
+
+
+def write_zip_fp(fp, data, properties, dir_data_list=None, *, json_bytes=None):
     """
         Write custom zip file of data and properties to fp
 
@@ -139,6 +184,7 @@ def write_zip_fp(fp, data, properties, dir_data_list=None):
         :param data: the data to write to the file; may be None
         :param properties: the properties to write to the file; may be None
         :param dir_data_list: optional list of directory header information structures
+        :param json_bytes: optional already encoded (and padded) json bytes to write instead of properties
 
         If dir_data_list is specified, data should be None and properties should
         be specified. Then the existing data structure will be left alone and only
@@ -147,10 +193,12 @@ def write_zip_fp(fp, data, properties, dir_data_list=None):
         Otherwise, if both data and properties are specified, both are written
         out in full.
 
+        The properties json is padded with slack; see pad_json.
+
         The properties param must not change during this method. Callers should
         take care to ensure this does not happen.
     """
-    assert data is not None or properties is not None
+    assert data is not None or properties is not None or json_bytes is not None
     # dir_data_list has the format: local file record offset, name, data length, crc32
     dir_data_list = list() if dir_data_list is None else dir_data_list
     dt = datetime.datetime.now()
@@ -168,26 +216,10 @@ def write_zip_fp(fp, data, properties, dir_data_list=None):
             return data_crc32
         data_len, crc32 = write_local_file(fp, b"data.npy", write_data, dt)
         dir_data_list.append((offset_data, b"data.npy", data_len, crc32))
-    if properties is not None:
-        json_str = str()
-        try:
-            class JSONEncoder(json.JSONEncoder):
-                def default(self, obj):
-                    if isinstance(obj, Geometry.IntPoint) or isinstance(obj, Geometry.IntSize) or isinstance(obj, Geometry.IntRect) or isinstance(obj, Geometry.FloatPoint) or isinstance(obj, Geometry.FloatSize) or isinstance(obj, Geometry.FloatRect):
-                        return tuple(obj)
-                    else:
-                        return json.JSONEncoder.default(self, obj)
-            json_io = io.StringIO()
-            json.dump(properties, json_io, cls=JSONEncoder)
-            json_str = json_io.getvalue()
-        except Exception as e:
-            # catch exceptions to avoid corrupt zip files
-            import traceback
-            logging.error("Exception writing zip file %s" + str(e))
-            traceback.print_exc()
-            traceback.print_stack()
+    if json_bytes is None and properties is not None:
+        json_bytes = pad_json(encode_json(properties))
+    if json_bytes is not None:
         def write_json(fp):
-            json_bytes = bytes(json_str, 'ISO-8859-1')
             fp.write(json_bytes)
             return binascii.crc32(json_bytes) & 0xFFFFFFFF
         offset_json = fp.tell()
@@ -201,13 +233,14 @@ def write_zip_fp(fp, data, properties, dir_data_list=None):
     fp.truncate()
 
 
-def write_zip(file_path, data, properties):
+def write_zip(file_path, data, properties, *, json_bytes=None):
     """
         Write custom zip file to the file path
 
         :param file_path: the file to which to write the zip file
         :param data: the data to write to the file; may be None
         :param properties: the properties to write to the file; may be None
+        :param json_bytes: optional already encoded json bytes to write instead of properties
 
         The properties param must not change during this method. Callers should
         take care to ensure this does not happen.
@@ -215,7 +248,7 @@ def write_zip(file_path, data, properties):
         See write_zip_fp.
     """
     with open(file_path, "w+b") as fp:
-        write_zip_fp(fp, data, properties)
+        write_zip_fp(fp, data, properties, json_bytes=json_bytes)
 
 
 def parse_zip(fp):
@@ -299,6 +332,60 @@ def read_data(fp, local_files, dir_files, name_bytes):
     return None
 
 
+def memmap_data(fp, local_files, dir_files, name_bytes):
+    """
+        Memory map a numpy data array from the zip file
+
+        :param fp: a file pointer opened in binary mode
+        :param local_files: the local files structure
+        :param dir_files: the directory headers
+        :param name: the name of the data file to map
+        :return: a copy-on-write numpy memmap of the data array, if it can be mapped; otherwise None
+
+        The data file must be stored uncompressed and must be the first file in the zip file so that
+        rewriting the properties leaves the mapped region intact. Writes to the returned array are
+        not written back to the file.
+
+        The local_files and dir_files should be passed from
+        the results of parse_zip.
+    """
+    if name_bytes in dir_files and dir_files[name_bytes][1] == 0:
+        fp.seek(local_files[dir_files[name_bytes][1]][1])
+        version = numpy.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(fp)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(fp)
+        else:
+            return None
+        if dtype.hasobject or numpy.prod(shape) == 0:
+            return None
+        offset = fp.tell()
+        return numpy.memmap(fp, dtype=dtype, mode="c", offset=offset, shape=shape, order="F" if fortran_order else "C")
+    return None
+
+
+def read_json_bytes(fp, local_files, dir_files, name_bytes):
+    """
+        Read the raw json bytes, including any padding, from the zip file
+
+        :param fp: a file pointer
+        :param local_files: the local files structure
+        :param dir_files: the directory headers
+        :param name: the name of the json file to read
+        :return: the json bytes, if found
+
+        The local_files and dir_files should be passed from
+        the results of parse_zip.
+    """
+    if name_bytes in dir_files:
+        json_pos = local_files[dir_files[name_bytes][1]][1]
+        json_len = local_files[dir_files[name_bytes][1]][2]
+        fp.seek(json_pos)
+        return fp.read(json_len)
+    return None
+
+
 def read_json(fp, local_files, dir_files, name_bytes):
     """
         Read json properties from the zip file
@@ -315,15 +402,44 @@ def read_json(fp, local_files, dir_files, name_bytes):
         The local_files and dir_files should be passed from
         the results of parse_zip.
     """
-    if name_bytes in dir_files:
-        json_pos = local_files[dir_files[name_bytes][1]][1]
-        json_len = local_files[dir_files[name_bytes][1]][2]
-        fp.seek(json_pos)
-        json_properties = fp.read(json_len)
+    json_properties = read_json_bytes(fp, local_files, dir_files, name_bytes)
+    if json_properties is not None:
         return json.loads(json_properties.decode("utf-8"))
     return None
 
 
+def rewrite_json_in_place(fp, local_files, dir_files, json_bytes):
+    """
+        Rewrite the metadata.json in place if the json bytes fit within its existing length
+
+        :param fp: a file pointer opened for reading and writing
+        :param local_files: the local files structure
+        :param dir_files: the directory headers
+        :param json_bytes: the unpadded json bytes to write
+        :return: whether the json was written
+
+        The json is padded to the existing length so the zip structure does not change; only the
+        crc32 in the local file header and in the directory header are patched.
+
+        The local_files and dir_files should be passed from
+        the results of parse_zip.
+    """
+    if b"metadata.json" in dir_files:
+        dir_pos, local_file_pos = dir_files[b"metadata.json"]
+        json_pos, json_len = local_files[local_file_pos][1:3]
+        if len(json_bytes) <= json_len:
+            json_bytes = pad_json(json_bytes, json_len)
+            json_crc32 = binascii.crc32(json_bytes) & 0xFFFFFFFF
+            fp.seek(json_pos)
+            fp.write(json_bytes)
+            fp.seek(local_file_pos + 14)
+            fp.write(struct.pack('I', json_crc32))  # crc32 in local file header
+            fp.seek(dir_pos + 16)
+            fp.write(struct.pack('I', json_crc32))  # crc32 in directory header
+            return True
+    return False
+
+
 def rewrite_zip(file_path, properties):
     """
         Rewrite the json properties in the zip file
@@ -335,11 +451,18 @@ def rewrite_zip(file_path, properties):
         file intact without rewriting it. However, if the data file is not the
         first item in the zip file, this method will rewrite it.
 
+        If the properties fit within the existing (padded) metadata.json, they
+        are written in place and only the crc32 in the local file header and
+        directory header are updated.
+
         The properties param must not change during this method. Callers should
         take care to ensure this does not happen.
     """
     with open(file_path, "r+b") as fp:
         local_files, dir_files, eocd = parse_zip(fp)
+        data_first_or_absent = b"data.npy" not in dir_files or dir_files[b"data.npy"][1] == 0
+        if data_first_or_absent and rewrite_json_in_place(fp, local_files, dir_files, encode_json(properties)):
+            return
         # check to make sure directory has two files, named data.npy and metadata.json, and that data.npy is first
         # TODO: check compression, etc.
         if len(dir_files) == 2 and b"data.npy" in dir_files and b"metadata.json" in dir_files and dir_files[b"data.npy"][1] == 0:
@@ -371,15 +494,30 @@ class NDataHandler(StorageHandler.StorageHandler):
         The handler is meant to be fully independent so that it can easily be plugged into
         earlier versions of Swift as it evolves.
 
+        The metadata.json is padded with trailing whitespace so that most property changes can be
+        written in place; see rewrite_zip.
+
+        If use_memory_map is set (on the class or on an instance), read_data returns a copy-on-write
+        memory map of the data instead of loading it into memory. While memory maps returned by read_data
+        are still in use, data is written to a temporary file which replaces the existing file so that the
+        outstanding memory maps remain valid; otherwise data is written in place. The application enables
+        memory maps with the ndata_memory_map setting in its application data.
+
+        Memory maps are not used on Windows, where a file cannot be replaced while it is mapped.
+
         :param file_path: The basic directory from which reference are based
 
         TODO: Move NDataHandler into a plug-in
     """
     count = 0  # useful for detecting leaks in tests
+    use_memory_map = False
+    is_memory_map_supported = os.name != "nt"
 
     def __init__(self, file_path):
         self.__file_path = str(file_path)
         self.__lock = threading.RLock()
+        self.__zip_directory = None
+        self.__memory_map_refs = list()  # type: typing.List[weakref.ReferenceType]
         NDataHandler.count += 1
 
     def close(self):
@@ -430,26 +568,64 @@ class NDataHandler(StorageHandler.StorageHandler):
     def get_extension(self) -> str:
         return ".ndata"
 
-    def write_data(self, data, file_datetime):
+    def __parse_zip(self, fp):
+        # cache the parsed directory; invalidated on writes and if the file changes size or modified time.
+        stat_result = os.fstat(fp.fileno())
+        zip_directory_key = stat_result.st_size, stat_result.st_mtime_ns
+        if self.__zip_directory is None or self.__zip_directory[0] != zip_directory_key:
+            self.__zip_directory = zip_directory_key, parse_zip(fp)
+        return self.__zip_directory[1]
+
+    def __has_memory_maps(self) -> bool:
+        self.__memory_map_refs = [memory_map_ref for memory_map_ref in self.__memory_map_refs if memory_map_ref() is not None]
+        return len(self.__memory_map_refs) > 0
+
+    def __read_json_bytes(self):
+        with open(self.__file_path, "rb") as fp:
+            local_files, dir_files, eocd = self.__parse_zip(fp)
+            return read_json_bytes(fp, local_files, dir_files, b"metadata.json")
+
+    def write_data(self, data, file_datetime, *, data_descriptor=None):
         """
             Write data to the ndata file specified by reference.
 
             :param data: the numpy array data to write
             :param file_datetime: the datetime for the file
+            :param data_descriptor: unused; ndata files have a single layout
         """
         with self.__lock:
             assert data is not None
             absolute_file_path = self.__file_path
             #logging.debug("WRITE data file %s for %s", absolute_file_path, key)
             make_directory_if_needed(os.path.dirname(absolute_file_path))
-            properties = self.read_properties() if os.path.exists(absolute_file_path) else dict()
-            write_zip(absolute_file_path, data, properties)
+            # carry the existing json over as-is; no need to parse and re-encode it.
+            json_bytes = self.__read_json_bytes() if os.path.exists(absolute_file_path) else pad_json(encode_json(dict()))
+            self.__zip_directory = None
+            if self.__has_memory_maps():
+                # outstanding memory maps must keep referring to the old file contents; write a new file.
+                temp_file_path = absolute_file_path + ".temp"
+                write_zip(temp_file_path, data, None, json_bytes=json_bytes)
+                os.replace(temp_file_path, absolute_file_path)
+            else:
+                write_zip(absolute_file_path, data, None, json_bytes=json_bytes)
             # convert to utc time.
             tz_minutes = Utility.local_utcoffset_minutes(file_datetime)
             timestamp = calendar.timegm(file_datetime.timetuple()) - tz_minutes * 60
             os.utime(absolute_file_path, (time.time(), timestamp))
 
-    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime) -> None:
+    def write_data_partial(self, data, dst, file_datetime):
+        """
+            Write the dst region of data to the ndata file specified by reference.
+
+            :param data: the full numpy array data, of which only the dst region has changed
+            :param dst: the slices describing the changed region
+            :param file_datetime: the datetime for the file
+
+            The data.npy entry is checksummed as a whole, so the full data is written.
+        """
+        self.write_data(data, file_datetime)
+
+    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime, *, data_descriptor=None) -> None:
         pass
 
     def write_properties(self, properties, file_datetime):
@@ -468,6 +644,7 @@ class NDataHandler(StorageHandler.StorageHandler):
             #logging.debug("WRITE properties %s for %s", absolute_file_path, key)
             make_directory_if_needed(os.path.dirname(absolute_file_path))
             exists = os.path.exists(absolute_file_path)
+            self.__zip_directory = None
             if exists:
                 rewrite_zip(absolute_file_path, Utility.clean_dict(properties))
             else:
@@ -487,7 +664,7 @@ class NDataHandler(StorageHandler.StorageHandler):
         with self.__lock:
             absolute_file_path = self.__file_path
             with open(absolute_file_path, "rb") as fp:
-                local_files, dir_files, eocd = parse_zip(fp)
+                local_files, dir_files, eocd = self.__parse_zip(fp)
                 properties = read_json(fp, local_files, dir_files, b"metadata.json")
             return properties
 
@@ -502,7 +679,12 @@ class NDataHandler(StorageHandler.StorageHandler):
             absolute_file_path = self.__file_path
             #logging.debug("READ data file %s", absolute_file_path)
             with open(absolute_file_path, "rb") as fp:
-                local_files, dir_files, eocd = parse_zip(fp)
+                local_files, dir_files, eocd = self.__parse_zip(fp)
+                if self.use_memory_map and self.is_memory_map_supported:
+                    data = memmap_data(fp, local_files, dir_files, b"data.npy")
+                    if data is not None:
+                        self.__memory_map_refs.append(weakref.ref(data))
+                        return data
                 return read_data(fp, local_files, dir_files, b"data.npy")
             return None
 
@@ -515,5 +697,6 @@ class NDataHandler(StorageHandler.StorageHandler):
         with self.__lock:
             absolute_file_path = self.__file_path
             #logging.debug("DELETE data file %s", absolute_file_path)
+            self.__zip_directory = None
             if os.path.isfile(absolute_file_path):
                 os.remove(absolute_file_path)
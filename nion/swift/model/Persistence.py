@@ -188,6 +188,9 @@ class PersistentStorageInterface(abc.ABC):
     @abc.abstractmethod
     def write_external_data(self, item, name: str, value) -> None: ...
 
+    @abc.abstractmethod
+    def write_external_data_partial(self, item, name: str, value, dst: typing.Sequence[slice]) -> None: ...
+
     @abc.abstractmethod
     def reserve_external_data(self, item, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype) -> None: ...
 
@@ -1021,6 +1024,10 @@ class PersistentObject:
         """ Call this to notify write external data value with name to an item in persistent storage. """
         self.persistent_storage.write_external_data(self, name, value)
 
+    def write_external_data_partial(self, name: str, value, dst: typing.Sequence[slice]) -> None:
+        """ Call this to notify write of the dst region of external data value with name to an item in persistent storage. """
+        self.persistent_storage.write_external_data_partial(self, name, value, dst)
+
     def reserve_external_data(self, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype) -> None:
         """ Call this to notify reserve external data value with name to an item in persistent storage. """
         self.persistent_storage.reserve_external_data(self, name, data_shape, data_dtype)
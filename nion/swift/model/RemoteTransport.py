@@ -0,0 +1,125 @@
+"""Transport shared by the remote API server (see Facade) and the nionlib client.
+
+This module has no dependencies on the rest of the application and no side effects on import so that the client can
+use it without importing the application, and the server without importing the client.
+"""
+
+# standard libraries
+import os
+import pickle
+import socket
+import struct
+import tempfile
+import typing
+
+# third party libraries
+import numpy
+
+# local libraries
+# None
+
+
+# numpy arrays at least this many bytes travel out of band in a shared file; only the file handle is sent over rpc.
+# set to None to send all data in band.
+shared_array_min_size = 1024 * 1024
+
+shared_array_prefix = "nion-array-"
+
+shared_extended_data_type_tag = "SharedExtendedData"
+
+# protocol 5 (python 3.8) pickles contiguous numpy arrays as out of band buffers, which are framed separately and
+# never copied into the pickle stream. earlier versions pickle the arrays in band.
+rpc_pickle_protocol = pickle.HIGHEST_PROTOCOL
+rpc_out_of_band = rpc_pickle_protocol >= 5
+
+
+def get_shared_array_directory() -> str:
+    # /dev/shm is memory backed, so on systems that have it the array never touches the disk.
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def is_shared_array(data) -> bool:
+    return shared_array_min_size is not None and isinstance(data, numpy.ndarray) and not data.dtype.hasobject and data.nbytes >= shared_array_min_size
+
+
+def share_array(data: numpy.ndarray) -> dict:
+    """Write the array to a shared file and return a handle for the receiver to load it.
+
+    The receiver removes the file when loading it. The sender must remove the file if the receiver does not load it;
+    see remove_shared_arrays."""
+    fd, path = tempfile.mkstemp(prefix=shared_array_prefix, suffix=".npy", dir=get_shared_array_directory())
+    try:
+        with os.fdopen(fd, "wb") as f:
+            numpy.save(f, data, allow_pickle=False)
+    except Exception:
+        os.remove(path)
+        raise
+    return {"path": path}
+
+
+def get_shared_array_path(handle: dict) -> str:
+    """Return the path of the shared file described by the handle.
+
+    The handle comes from the other end of the connection, so only files made by share_array are accepted."""
+    path = os.path.realpath(str(handle["path"]))
+    directory = os.path.realpath(get_shared_array_directory())
+    if os.path.dirname(path) != directory or not os.path.basename(path).startswith(shared_array_prefix):
+        raise pickle.UnpicklingError("Invalid shared array path: {}".format(handle["path"]))
+    return path
+
+
+def load_shared_array(handle: dict) -> numpy.ndarray:
+    """Load the array described by the handle and remove its shared file."""
+    path = get_shared_array_path(handle)
+    try:
+        return numpy.load(path, allow_pickle=False)
+    finally:
+        os.remove(path)
+
+
+def remove_shared_arrays(paths: typing.Sequence[str]) -> None:
+    """Remove shared files that were not loaded by the receiver, for instance because a call failed."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# a frame is a header (payload size, buffer count), the size of each buffer, the payload, then the buffers.
+frame_header_struct = struct.Struct("!QI")
+frame_buffer_size_struct = struct.Struct("!Q")
+
+
+def get_raw_buffer(buffer) -> memoryview:
+    # out of band pickle buffers may be fortran contiguous; raw returns their bytes in memory order.
+    return buffer.raw() if hasattr(buffer, "raw") else memoryview(buffer).cast("B")
+
+
+def send_frame(sock: socket.socket, payload: bytes, buffers: typing.Sequence = ()) -> None:
+    raw_buffers = [get_raw_buffer(buffer) for buffer in buffers]
+    header = frame_header_struct.pack(len(payload), len(raw_buffers))
+    header += b"".join(frame_buffer_size_struct.pack(raw_buffer.nbytes) for raw_buffer in raw_buffers)
+    sock.sendall(header + payload)
+    for raw_buffer in raw_buffers:
+        sock.sendall(raw_buffer)
+
+
+def receive_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    position = 0
+    while position < size:
+        count = sock.recv_into(view[position:])
+        if count == 0:
+            raise EOFError("Connection closed.")
+        position += count
+    return buffer
+
+
+def receive_frame(sock: socket.socket) -> typing.Tuple[bytes, typing.List[bytearray]]:
+    payload_size, buffer_count = frame_header_struct.unpack(receive_exactly(sock, frame_header_struct.size))
+    buffer_sizes_data = receive_exactly(sock, frame_buffer_size_struct.size * buffer_count)
+    buffer_sizes = [size for size, in frame_buffer_size_struct.iter_unpack(buffer_sizes_data)]
+    payload = bytes(receive_exactly(sock, payload_size))
+    return payload, [receive_exactly(sock, buffer_size) for buffer_size in buffer_sizes]
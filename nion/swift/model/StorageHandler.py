@@ -7,6 +7,7 @@ if typing.TYPE_CHECKING:
     import datetime
     import pathlib
     import numpy
+    from nion.data import DataAndMetadata
 
 
 class StorageHandler(abc.ABC):
@@ -43,11 +44,17 @@ class StorageHandler(abc.ABC):
     @abc.abstractmethod
     def write_properties(self, properties, file_datetime: datetime.datetime): ...
 
+    # data_descriptor describes the sequence, collection, and datum dimensions of the data, if known. handlers may use
+    # it to choose the storage layout.
     @abc.abstractmethod
-    def write_data(self, data, file_datetime: datetime.datetime): ...
+    def write_data(self, data, file_datetime: datetime.datetime, *, data_descriptor: typing.Optional[DataAndMetadata.DataDescriptor] = None): ...
 
     @abc.abstractmethod
-    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime: datetime.datetime) -> None: ...
+    def write_data_partial(self, data, dst: typing.Sequence[slice], file_datetime: datetime.datetime) -> None: ...
+
+    @abc.abstractmethod
+    def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.dtype, file_datetime: datetime.datetime, *,
+                     data_descriptor: typing.Optional[DataAndMetadata.DataDescriptor] = None) -> None: ...
 
     @abc.abstractmethod
     def prepare_move(self) -> None: ...
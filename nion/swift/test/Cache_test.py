@@ -1,5 +1,10 @@
 # standard libraries
+import contextlib
 import logging
+import pathlib
+import pickle
+import sqlite3
+import tempfile
 import unittest
 import uuid
 
@@ -55,6 +60,101 @@ class TestSuspendableCacheClass(unittest.TestCase):
         suspendable_cache.spill_cache()
         self.assertTrue(suspendable_cache.get_cached_value(suspendable_cache, "key", False))
 
+    def test_get_cached_values_overlays_values_set_while_suspended(self):
+        storage_cache = Cache.DictStorageCache()
+        suspendable_cache = Cache.SuspendableCache(storage_cache)
+        targets = [Target(), Target()]
+        suspendable_cache.set_cached_value(targets[0], "a", 1)
+        suspendable_cache.set_cached_value(targets[0], "b", 2)
+        suspendable_cache.set_cached_value(targets[1], "a", 3)
+        suspendable_cache.suspend_cache()
+        suspendable_cache.set_cached_value(targets[1], "b", 4)
+        suspendable_cache.remove_cached_value(targets[0], "b")
+        self.assertEqual([{"a": 1}, {"a": 3, "b": 4}], suspendable_cache.get_cached_values(targets, ["a", "b"]))
+        suspendable_cache.spill_cache()
+        self.assertEqual([{"a": 1}, {"a": 3, "b": 4}], storage_cache.get_cached_values(targets, ["a", "b"]))
+
+
+class Target:
+    def __init__(self):
+        self.uuid = uuid.uuid4()
+
+
+class TestShadowCacheClass(unittest.TestCase):
+
+    def test_prefetched_values_are_returned_once_until_changed(self):
+        storage_cache = Cache.DictStorageCache()
+        target = Target()
+        storage_cache.set_cached_value(target, "key", 1)
+        shadow_cache = Cache.ShadowCache()
+        shadow_cache.set_storage_cache(storage_cache, target)
+        shadow_cache.prefetch_cached_values(storage_cache.get_cached_values([target], ["key"])[0])
+        storage_cache.set_cached_value(target, "key", 2)  # bypass the shadow cache
+        self.assertEqual(1, shadow_cache.get_cached_value(target, "key"))
+        # the prefetched value is dropped after the first read
+        self.assertEqual(2, shadow_cache.get_cached_value(target, "key"))
+        shadow_cache.prefetch_cached_values({"key": 5})
+        shadow_cache.set_cached_value(target, "key", 3)
+        self.assertEqual(3, shadow_cache.get_cached_value(target, "key"))
+        shadow_cache.prefetch_cached_values({"key": 4})
+        shadow_cache.remove_cached_value(target, "key")
+        self.assertIsNone(shadow_cache.get_cached_value(target, "key"))
+
+
+class TestDbStorageCacheClass(unittest.TestCase):
+
+    def test_values_are_read_after_queued_writes(self):
+        storage_cache = Cache.DbStorageCache(":memory:", max_batch_size=8)
+        with contextlib.closing(storage_cache):
+            targets = [Target() for _ in range(20)]
+            for i, target in enumerate(targets):
+                storage_cache.set_cached_value(target, "key", i, dirty=(i % 2 == 0))
+            storage_cache.remove_cached_value(targets[3], "key")
+            storage_cache.set_cached_value_dirty(targets[4], "key", False)
+            self.assertEqual(5, storage_cache.get_cached_value(targets[5], "key"))
+            self.assertIsNone(storage_cache.get_cached_value(targets[3], "key"))
+            self.assertTrue(storage_cache.is_cached_value_dirty(targets[2], "key"))
+            self.assertFalse(storage_cache.is_cached_value_dirty(targets[4], "key"))
+            self.assertTrue(storage_cache.is_cached_value_dirty(targets[3], "key"))
+
+    def test_get_cached_values_returns_values_for_each_target(self):
+        storage_cache = Cache.DbStorageCache(":memory:")
+        with contextlib.closing(storage_cache):
+            targets = [Target() for _ in range(1200)]
+            for i, target in enumerate(targets):
+                storage_cache.set_cached_value(target, "a", i)
+                if i % 3 == 0:
+                    storage_cache.set_cached_value(target, "b", str(i))
+            storage_cache.set_cached_value(targets[0], "c", 0)
+            cached_values_list = storage_cache.get_cached_values(targets, ["a", "b"])
+            self.assertEqual(len(targets), len(cached_values_list))
+            for i, cached_values in enumerate(cached_values_list):
+                self.assertEqual({"a": i, "b": str(i)} if i % 3 == 0 else {"a": i}, cached_values)
+
+    def test_values_in_original_table_are_read(self):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            cache_path = pathlib.Path(temporary_directory) / "Cache.nscache"
+            target = Target()
+            conn = sqlite3.connect(str(cache_path))
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS cache(uuid STRING, key STRING, value BLOB, dirty INTEGER, PRIMARY KEY(uuid, key))")
+                conn.execute("INSERT OR REPLACE INTO cache (uuid, key, value, dirty) VALUES (?, ?, ?, ?)",
+                             (str(target.uuid), "key", sqlite3.Binary(pickle.dumps({"a": 1}, 0)), 0))
+            conn.close()
+            storage_cache = Cache.DbStorageCache(cache_path)
+            with contextlib.closing(storage_cache):
+                self.assertEqual({"a": 1}, storage_cache.get_cached_value(target, "key"))
+                self.assertFalse(storage_cache.is_cached_value_dirty(target, "key"))
+                storage_cache.set_cached_value(target, "key", {"a": 2})
+            # the original table is left for older versions and only copied when the new table is created
+            conn = sqlite3.connect(str(cache_path))
+            with contextlib.closing(conn):
+                self.assertEqual(1, conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0])
+            storage_cache = Cache.DbStorageCache(cache_path)
+            with contextlib.closing(storage_cache):
+                self.assertEqual({"a": 2}, storage_cache.get_cached_value(target, "key"))
+
+
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.DEBUG)
     unittest.main()
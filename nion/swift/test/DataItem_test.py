@@ -280,6 +280,75 @@ class TestDataItemClass(unittest.TestCase):
             self.assertTrue(data_item.data_and_metadata.unloadable)
             self.assertFalse(data_item.data_and_metadata.is_data_valid)
 
+    def test_memory_manager_retains_released_data_and_evicts_least_recently_used(self):
+        memory_manager = DataItem.DataMemoryManager()
+        memory_manager.reset_statistics()
+        memory_manager.memory_budget = 2 * 8 * 8 * 4
+        try:
+            with create_memory_profile_context() as profile_context:
+                document_model = profile_context.create_document_model()
+                data_items = [DataItem.DataItem(numpy.ones((8, 8), numpy.uint32)) for i in range(3)]
+                for data_item in data_items:
+                    document_model.append_data_item(data_item)
+                for data_item in data_items:
+                    with data_item.data_ref():
+                        pass
+                self.assertFalse(data_items[0].data_and_metadata.is_data_valid)
+                self.assertTrue(data_items[1].data_and_metadata.is_data_valid)
+                self.assertTrue(data_items[2].data_and_metadata.is_data_valid)
+                self.assertEqual(2 * 8 * 8 * 4, memory_manager.resident_bytes)
+                self.assertEqual(1, memory_manager.eviction_count)
+                # accessing an item makes it most recently used
+                with data_items[1].data_ref():
+                    pass
+                with data_items[0].data_ref():
+                    pass
+                self.assertTrue(data_items[0].data_and_metadata.is_data_valid)
+                self.assertTrue(data_items[1].data_and_metadata.is_data_valid)
+                self.assertFalse(data_items[2].data_and_metadata.is_data_valid)
+                self.assertEqual(2, memory_manager.eviction_count)
+                # disabling the budget unloads everything retained
+                memory_manager.memory_budget = 0
+                self.assertFalse(any(data_item.data_and_metadata.is_data_valid for data_item in data_items))
+                self.assertEqual(0, memory_manager.resident_bytes)
+        finally:
+            memory_manager.memory_budget = 0
+            memory_manager.reset_statistics()
+
+    def test_memory_manager_does_not_unload_referenced_data(self):
+        memory_manager = DataItem.DataMemoryManager()
+        memory_manager.memory_budget = 8 * 8 * 4
+        try:
+            with create_memory_profile_context() as profile_context:
+                document_model = profile_context.create_document_model()
+                data_item1 = DataItem.DataItem(numpy.ones((8, 8), numpy.uint32))
+                data_item2 = DataItem.DataItem(numpy.ones((8, 8), numpy.uint32))
+                document_model.append_data_item(data_item1)
+                document_model.append_data_item(data_item2)
+                with data_item1.data_ref():
+                    with data_item2.data_ref():
+                        self.assertEqual(2 * 8 * 8 * 4, memory_manager.resident_bytes)
+                    self.assertTrue(data_item1.data_and_metadata.is_data_valid)
+                    self.assertFalse(data_item2.data_and_metadata.is_data_valid)
+                    self.assertEqual(8 * 8 * 4, memory_manager.resident_bytes)
+                self.assertTrue(data_item1.data_and_metadata.is_data_valid)
+                self.assertEqual(numpy.uint32(1), data_item1.data[0, 0])
+        finally:
+            memory_manager.memory_budget = 0
+            memory_manager.reset_statistics()
+
+    def test_memory_manager_drops_data_items_that_are_collected_without_closing(self):
+        memory_manager = DataItem.DataMemoryManager()
+        resident_bytes = memory_manager.resident_bytes
+        data_item = DataItem.DataItem(numpy.ones((8, 8), numpy.uint32))
+        data_item.increment_data_ref_count()
+        self.assertEqual(resident_bytes + 8 * 8 * 4, memory_manager.resident_bytes)
+        data_item_ref = weakref.ref(data_item)
+        data_item = None
+        gc.collect()
+        self.assertIsNone(data_item_ref())
+        self.assertEqual(resident_bytes, memory_manager.resident_bytes)
+
     def test_clear_thumbnail_when_data_item_changed(self):
         with TestContext.create_memory_context() as test_context:
             document_model = test_context.create_document_model()
@@ -9,10 +9,12 @@ import numpy
 
 # local libraries
 from nion.data import Calibration
+from nion.data import Core
 from nion.data import DataAndMetadata
 from nion.swift import Application
 from nion.swift import Facade
 from nion.swift.model import DataItem
+from nion.swift.model import DisplayItem
 from nion.swift.model import Symbolic
 from nion.swift.model import Utility
 from nion.swift.test import TestContext
@@ -412,6 +414,160 @@ class TestDisplayClass(unittest.TestCase):
                     display_rgba = display_data_channel.get_calculated_display_values(True).display_rgba
                     self.assertTrue(display_rgba.dtype == numpy.uint32)
 
+    def test_tiled_display_rgba_matches_untiled_display_rgba(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.random.randn(32, 24))
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            for adjustments in (list(), [{"type": "gamma", "gamma": 0.5}], [{"type": "log"}], [{"type": "equalized"}]):
+                display_data_channel.adjustments = adjustments
+                tile_element_count = DisplayItem.DisplayValues.tile_element_count
+                DisplayItem.DisplayValues.tile_element_count = 5 * 24
+                try:
+                    display_values = display_data_channel.get_calculated_display_values()
+                    tiled_display_rgba = display_values.display_rgba
+                finally:
+                    DisplayItem.DisplayValues.tile_element_count = tile_element_count
+                display_rgba = Core.function_display_rgba(DataAndMetadata.promote_ndarray(display_values.transformed_display_data),
+                                                          display_values.transformed_display_range, display_values.color_map_data).data
+                self.assertTrue(numpy.array_equal(display_rgba, tiled_display_rgba))
+
+    def test_partial_data_update_only_recalculates_changed_rows_of_display_rgba(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.zeros((8, 8), numpy.float32))
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            display_data_channel.display_limits = (0, 1)
+            display_values = display_data_channel.get_calculated_display_values()
+            display_rgba = display_values.display_rgba
+            display_rgba[0, 0] = 1234  # mark the display to check the unchanged rows are reused
+            display_values.finalize()
+            ones = DataAndMetadata.new_data_and_metadata(numpy.ones((2, 8), numpy.float32))
+            data_item.set_data_and_metadata_partial(data_item.xdata.data_metadata, ones, (slice(0, 2), slice(0, 8)), (slice(4, 6), slice(0, 8)))
+            display_data_channel.update_display_data()
+            new_display_rgba = display_data_channel.get_calculated_display_values().display_rgba
+            self.assertEqual(1234, new_display_rgba[0, 0])
+            self.assertTrue(numpy.array_equal(new_display_rgba[4:6], numpy.full((2, 8), new_display_rgba[4, 0])))
+            self.assertNotEqual(new_display_rgba[4, 0], new_display_rgba[7, 0])
+            self.assertTrue(numpy.array_equal(new_display_rgba[1:4], display_rgba[1:4]))
+
+    def test_data_statistics_samples_large_data_only_when_enabled(self):
+        data = numpy.random.randn(8, 8)
+        data_statistics = DisplayItem.DataStatistics(data)
+        self.assertFalse(data_statistics.is_sampled)
+        self.assertEqual((numpy.amin(data), numpy.amax(data)), data_statistics.data_range)
+        sample_threshold = DisplayItem.DataStatistics.sample_threshold
+        DisplayItem.DataStatistics.sample_threshold = 16
+        try:
+            data_statistics = DisplayItem.DataStatistics(data)
+            self.assertTrue(data_statistics.is_sampled)
+            # the data range is exact even when sampling
+            self.assertEqual((numpy.amin(data), numpy.amax(data)), data_statistics.data_range)
+            self.assertAlmostEqual(64, numpy.sum(data_statistics.get_histogram(8, (-100.0, 100.0))))
+        finally:
+            DisplayItem.DataStatistics.sample_threshold = sample_threshold
+
+    def test_data_statistics_data_range_of_blocks_matches_data(self):
+        data = numpy.random.randn(64, 64).astype(numpy.float32)
+        data[17, 5] = 100.0
+        data[60, 63] = -100.0
+        data_statistics = DisplayItem.DataStatistics(data)
+        data_statistics.block_size = 100
+        self.assertEqual((numpy.float32(-100.0), numpy.float32(100.0)), data_statistics.data_range)
+        data[3, 3] = numpy.nan
+        data_statistics = DisplayItem.DataStatistics(data)
+        data_statistics.block_size = 100
+        self.assertTrue(numpy.isnan(data_statistics.data_range[0]) and numpy.isnan(data_statistics.data_range[1]))
+        self.assertEqual((numpy.float32(-100.0), numpy.float32(100.0)), data_statistics.nan_data_range)
+        # non contiguous data is scanned directly
+        data_statistics = DisplayItem.DataStatistics(data[::2, ::2])
+        data_statistics.block_size = 100
+        self.assertEqual((numpy.amin(data[::2, ::2]), numpy.amax(data[::2, ::2])), data_statistics.data_range)
+
+    def test_data_statistics_ignore_nan_for_auto_display_limits(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data = numpy.arange(16, dtype=numpy.float32).reshape(4, 4)
+            data[1, 1] = numpy.nan
+            data_item = DataItem.DataItem(data)
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            self.assertEqual((0.0, 0.0), display_data_channel.get_calculated_display_values(True).data_range)
+            display_data_channel.auto_display_limits()
+            self.assertEqual((0.0, 15.0), tuple(display_data_channel.display_limits))
+
+    def test_display_values_share_data_statistics_when_data_is_unchanged(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.random.randn(8, 8))
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            display_values = display_data_channel.get_calculated_display_values()
+            self.assertIsNotNone(display_values.display_rgba)
+            data_statistics = display_values.data_statistics
+            display_values.finalize()
+            display_data_channel.brightness = 0.5
+            self.assertIs(data_statistics, display_data_channel.get_calculated_display_values().data_statistics)
+            data_item.set_data(numpy.random.randn(8, 8))
+            self.assertIsNot(data_statistics, display_data_channel.get_calculated_display_values().data_statistics)
+
+    def test_display_values_levels_reduce_display_data_by_half_per_level(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data = numpy.random.randn(256, 512).astype(numpy.float32)
+            data_item = DataItem.DataItem(data)
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            display_values = display_data_channel.get_calculated_display_values()
+            self.assertEqual(3, display_values.level_count)
+            self.assertEqual((256, 512), display_values.get_transformed_display_data_level(0).shape)
+            self.assertEqual((128, 256), display_values.get_transformed_display_data_level(1).shape)
+            self.assertEqual((64, 128), display_values.get_transformed_display_data_level(2).shape)
+            self.assertEqual((64, 128), display_values.get_transformed_display_data_level(5).shape)
+            self.assertEqual(numpy.float32, display_values.get_transformed_display_data_level(2).dtype)
+            self.assertTrue(numpy.allclose(data.reshape(128, 2, 256, 2).mean(axis=(1, 3)), display_values.get_transformed_display_data_level(1)))
+            display_values.finalize()
+
+    def test_display_values_levels_include_odd_last_row_and_column(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data = numpy.zeros((129, 131), numpy.float32)
+            data[-1, :] = 4.0
+            data[:, -1] = 8.0
+            data_item = DataItem.DataItem(data)
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            display_values = display_data_channel.get_calculated_display_values()
+            display_data_level = display_values.get_transformed_display_data_level(1)
+            self.assertEqual((65, 66), display_data_level.shape)
+            self.assertEqual(4.0, display_data_level[-1, 0])
+            self.assertEqual(8.0, display_data_level[0, -1])
+            self.assertEqual(0.0, display_data_level[0, 0])
+            display_values.finalize()
+
+    def test_display_values_levels_are_recalculated_when_data_changes(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.zeros((128, 128), numpy.float32))
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            display_values = display_data_channel.get_calculated_display_values()
+            self.assertEqual(0.0, numpy.amax(display_values.get_transformed_display_data_level(1)))
+            display_values.finalize()
+            display_data_channel.brightness = 0.5
+            self.assertEqual(0.0, numpy.amax(display_data_channel.get_calculated_display_values().get_transformed_display_data_level(1)))
+            data_item.set_data(numpy.ones((128, 128), numpy.float32))
+            self.assertEqual(1.0, numpy.amin(display_data_channel.get_calculated_display_values().get_transformed_display_data_level(1)))
+
     def test_reset_display_limits_on_various_value_types_write_to_clean_json(self):
         with TestContext.create_memory_context() as test_context:
             document_model = test_context.create_document_model()
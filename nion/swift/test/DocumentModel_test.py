@@ -3,8 +3,10 @@ import contextlib
 import copy
 import gc
 import random
+import threading
 import time
 import unittest
+import unittest.mock
 import uuid
 import weakref
 
@@ -19,6 +21,7 @@ from nion.swift.model import DataGroup
 from nion.swift.model import DataItem
 from nion.swift.model import DataStructure
 from nion.swift.model import DisplayItem
+from nion.swift.model import DocumentModel
 from nion.swift.model import Graphics
 from nion.swift.model import Symbolic
 from nion.swift.test import TestContext
@@ -78,6 +81,40 @@ class TestDocumentModelClass(unittest.TestCase):
             self.assertEqual(data_group.counted_display_items[display_item1], 0)
             self.assertEqual(data_group.counted_display_items[display_item2], 1)
 
+    def test_loading_document_prefetches_cached_data_ranges_of_display_items(self):
+        with create_memory_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            with contextlib.closing(document_model):
+                for i in range(3):
+                    data = numpy.zeros((4, 4), numpy.uint32)
+                    data[1, 1] = i + 1
+                    document_model.append_data_item(DataItem.DataItem(data))
+                for display_item in document_model.display_items:
+                    display_item.display_data_channels[0].get_calculated_display_values(True).data_range
+                    self.assertIsNotNone(display_item._display_cache.get_cached_value(display_item, "display_data_ranges"))
+            document_model = profile_context.create_document_model(auto_close=False)
+            with contextlib.closing(document_model):
+                # values are served from the prefetch even after they disappear from the storage cache
+                profile_context.storage_cache.cache.clear()
+                for display_item in document_model.display_items:
+                    display_data_channel = display_item.display_data_channels[0]
+                    with unittest.mock.patch.object(DisplayItem.DataStatistics, "data_range", new_callable=unittest.mock.PropertyMock) as data_range:
+                        self.assertEqual((0, display_data_channel.data_item.data[1, 1]), display_data_channel.get_calculated_display_values(True).data_range)
+                        data_range.assert_not_called()
+
+    def test_cached_data_range_is_not_used_after_data_changes(self):
+        with create_memory_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            with contextlib.closing(document_model):
+                data_item = DataItem.DataItem(numpy.ones((4, 4), numpy.uint32))
+                document_model.append_data_item(data_item)
+                document_model.display_items[0].display_data_channels[0].get_calculated_display_values(True).data_range
+                data_item.set_data(numpy.full((4, 4), 3, numpy.uint32))
+            document_model = profile_context.create_document_model(auto_close=False)
+            with contextlib.closing(document_model):
+                display_data_channel = document_model.display_items[0].display_data_channels[0]
+                self.assertEqual((3, 3), display_data_channel.get_calculated_display_values(True).data_range)
+
     def test_loading_document_with_duplicated_data_items_ignores_earlier_ones(self):
         with create_memory_profile_context() as profile_context:
             document_model = profile_context.create_document_model(auto_close=False)
@@ -1418,6 +1455,139 @@ class TestDocumentModelClass(unittest.TestCase):
         def commit(self):
             self.computation.set_referenced_data("dst", self.__new_data)
 
+    class IncrementSlowly:
+        lock = threading.RLock()
+        active_count = 0
+        max_active_count = 0
+
+        def __init__(self, computation, **kwargs):
+            self.computation = computation
+
+        def execute(self, src_xdata):
+            cls = TestDocumentModelClass.IncrementSlowly
+            with cls.lock:
+                cls.active_count += 1
+                cls.max_active_count = max(cls.max_active_count, cls.active_count)
+            time.sleep(0.1)
+            self.__new_data = src_xdata.data + 1
+            with cls.lock:
+                cls.active_count -= 1
+
+        def commit(self):
+            self.computation.set_referenced_data("dst", self.__new_data)
+
+    def __run_dispatcher_until(self, document_model, fn) -> None:
+        # stand in for the main thread, performing merges until fn returns True.
+        start_time = time.perf_counter()
+        while not fn() and time.perf_counter() - start_time < 10.0:
+            document_model.perform_data_item_merge()
+            time.sleep(0.01)
+
+    def test_dispatcher_runs_independent_computations_concurrently(self):
+        Symbolic.register_computation_type("increment_slowly", self.IncrementSlowly)
+        TestDocumentModelClass.IncrementSlowly.max_active_count = 0
+        DocumentModel.DocumentModel.computation_thread_count = 2
+        try:
+            with TestContext.create_memory_context() as test_context:
+                document_model = test_context.create_document_model()
+                dst_data_items = list()
+                for i in range(2):
+                    data_item = DataItem.DataItem(numpy.zeros((2, 2), numpy.int))
+                    dst_data_item = DataItem.DataItem(numpy.zeros((2, 2), numpy.int))
+                    document_model.append_data_item(data_item)
+                    document_model.append_data_item(dst_data_item)
+                    computation = document_model.create_computation()
+                    computation.create_input_item("src_xdata", Symbolic.make_item(data_item, type="xdata"))
+                    computation.create_output_item("dst", Symbolic.make_item(dst_data_item))
+                    computation.processing_id = "increment_slowly"
+                    document_model.append_computation(computation)
+                    dst_data_items.append(dst_data_item)
+                document_model.start_dispatcher()
+                self.__run_dispatcher_until(document_model, lambda: all(numpy.array_equal(d.data, numpy.ones((2, 2))) for d in dst_data_items))
+                for dst_data_item in dst_data_items:
+                    self.assertTrue(numpy.array_equal(dst_data_item.data, numpy.ones((2, 2))))
+                self.assertEqual(2, TestDocumentModelClass.IncrementSlowly.max_active_count)
+        finally:
+            DocumentModel.DocumentModel.computation_thread_count = 1
+
+    def test_dispatcher_does_not_run_computation_while_its_input_is_recomputed(self):
+        Symbolic.register_computation_type("increment_slowly", self.IncrementSlowly)
+        TestDocumentModelClass.IncrementSlowly.max_active_count = 0
+        DocumentModel.DocumentModel.computation_thread_count = 2
+        try:
+            with TestContext.create_memory_context() as test_context:
+                document_model = test_context.create_document_model()
+                data_items = [DataItem.DataItem(numpy.zeros((2, 2), numpy.int)) for i in range(3)]
+                for data_item in data_items:
+                    document_model.append_data_item(data_item)
+                for src_data_item, dst_data_item in zip(data_items[:-1], data_items[1:]):
+                    computation = document_model.create_computation()
+                    computation.create_input_item("src_xdata", Symbolic.make_item(src_data_item, type="xdata"))
+                    computation.create_output_item("dst", Symbolic.make_item(dst_data_item))
+                    computation.processing_id = "increment_slowly"
+                    document_model.append_computation(computation)
+                document_model.start_dispatcher()
+                self.__run_dispatcher_until(document_model, lambda: numpy.array_equal(data_items[2].data, numpy.full((2, 2), 2)))
+                self.assertTrue(numpy.array_equal(data_items[1].data, numpy.ones((2, 2))))
+                self.assertTrue(numpy.array_equal(data_items[2].data, numpy.full((2, 2), 2)))
+                self.assertEqual(1, TestDocumentModelClass.IncrementSlowly.max_active_count)
+        finally:
+            DocumentModel.DocumentModel.computation_thread_count = 1
+
+    def test_dispatcher_runs_computation_with_displayed_output_first(self):
+        Symbolic.register_computation_type("pass_thru", self.PassThru)
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            dst_data_items = list()
+            for i in range(3):
+                data_item = DataItem.DataItem(numpy.ones((2, 2), numpy.int))
+                dst_data_item = DataItem.DataItem(numpy.zeros((2, 2), numpy.int))
+                document_model.append_data_item(data_item)
+                document_model.append_data_item(dst_data_item)
+                computation = document_model.create_computation()
+                computation.create_input_item("src_xdata", Symbolic.make_item(data_item, type="xdata"))
+                computation.create_output_item("dst", Symbolic.make_item(dst_data_item))
+                computation.processing_id = "pass_thru"
+                document_model.append_computation(computation)
+                dst_data_items.append(dst_data_item)
+            display_item = document_model.get_display_item_for_data_item(dst_data_items[2])
+            display_item.increment_display_ref_count()
+            try:
+                document_model.recompute_one()
+                self.assertTrue(numpy.array_equal(dst_data_items[2].data, numpy.ones((2, 2))))
+                self.assertTrue(numpy.array_equal(dst_data_items[0].data, numpy.zeros((2, 2))))
+                self.assertTrue(numpy.array_equal(dst_data_items[1].data, numpy.zeros((2, 2))))
+                document_model.recompute_all()
+                for dst_data_item in dst_data_items:
+                    self.assertTrue(numpy.array_equal(dst_data_item.data, numpy.ones((2, 2))))
+            finally:
+                display_item.decrement_display_ref_count()
+
+    def test_computation_needing_update_while_pending_is_evaluated_once(self):
+        Symbolic.register_computation_type("add2", self.Add2)
+        TestDocumentModelClass.add2_eval_count = 0
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item1 = DataItem.DataItem(numpy.full((2, 2), 1))
+            data_item2 = DataItem.DataItem(numpy.full((2, 2), 2))
+            data_item3 = DataItem.DataItem(numpy.full((2, 2), 0))
+            document_model.append_data_item(data_item1)
+            document_model.append_data_item(data_item2)
+            document_model.append_data_item(data_item3)
+            computation = document_model.create_computation()
+            computation.create_input_item("src1", Symbolic.make_item(data_item1))
+            computation.create_input_item("src2", Symbolic.make_item(data_item2))
+            computation.create_output_item("dst", Symbolic.make_item(data_item3))
+            computation.processing_id = "add2"
+            document_model.append_computation(computation)
+            document_model.recompute_all()
+            TestDocumentModelClass.add2_eval_count = 0
+            for i in range(5):
+                data_item1.set_data(numpy.full((2, 2), i))
+            document_model.recompute_all()
+            self.assertEqual(1, TestDocumentModelClass.add2_eval_count)
+            self.assertTrue(numpy.array_equal(data_item3.data, numpy.full((2, 2), 6)))
+
     def test_new_computation_with_missing_output_does_not_evaluate(self):
         Symbolic.register_computation_type("pass_thru", self.PassThru)
         with TestContext.create_memory_context() as test_context:
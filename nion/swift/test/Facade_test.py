@@ -1,5 +1,11 @@
 # standard libraries
 import contextlib
+import io
+import os
+import pickle
+import socket
+import socketserver
+import threading
 import unittest
 
 # third party libraries
@@ -13,9 +19,11 @@ from nion.swift import Facade
 from nion.swift.model import DocumentModel
 from nion.swift.model import DataItem
 from nion.swift.model import Graphics
+from nion.swift.model import RemoteTransport
 from nion.swift.test import TestContext
 from nion.ui import TestUI
 from nion.utils import Geometry
+from nionlib import Transport
 
 
 Facade.initialize()
@@ -292,6 +300,195 @@ class TestFacadeClass(unittest.TestCase):
             data[:, :] = numpy.random.randn(2, 2)
             self.assertFalse(numpy.array_equal(data, data_item.data))
 
+    def test_large_data_is_pickled_out_of_band_and_small_data_in_band(self):
+        data = numpy.random.randn(4, 512, 512).astype(numpy.float32)
+        intensity_calibration = Calibration.Calibration(1.0, 2.0, "e")
+        dimensional_calibrations = [Calibration.Calibration(), Calibration.Calibration(units="nm"), Calibration.Calibration(units="nm")]
+        data_descriptor = DataAndMetadata.DataDescriptor(True, 0, 2)
+        xdata = DataAndMetadata.new_data_and_metadata(data, intensity_calibration=intensity_calibration, dimensional_calibrations=dimensional_calibrations, metadata={"a": 1}, data_descriptor=data_descriptor)
+        shared_paths = list()
+        body, buffers = Facade.Pickler.dumps([xdata], shared_paths)
+        self.assertEqual(1, len(shared_paths))
+        self.assertTrue(os.path.exists(shared_paths[0]))
+        self.assertLess(len(body) + sum(memoryview(buffer).nbytes for buffer in buffers), data.nbytes // 100)
+        xdata_list = Facade.Unpickler(io.BytesIO(body), None, buffers).load()
+        self.assertFalse(os.path.exists(shared_paths[0]))
+        self.assertTrue(numpy.array_equal(data, xdata_list[0].data))
+        self.assertEqual(intensity_calibration, xdata_list[0].intensity_calibration)
+        self.assertEqual(dimensional_calibrations, xdata_list[0].dimensional_calibrations)
+        self.assertEqual(data_descriptor, xdata_list[0].data_descriptor)
+        self.assertEqual({"a": 1}, xdata_list[0].metadata)
+        self.assertEqual(xdata.timestamp, xdata_list[0].timestamp)
+        small_shared_paths = list()
+        Facade.Pickler.dumps(DataAndMetadata.new_data_and_metadata(numpy.zeros((4, 4))), small_shared_paths)
+        self.assertEqual(0, len(small_shared_paths))
+
+    def test_large_data_is_only_shared_in_files_when_sender_collects_shared_paths(self):
+        shared_array_directory = RemoteTransport.get_shared_array_directory()
+
+        def get_shared_file_names():
+            return {file_name for file_name in os.listdir(shared_array_directory) if file_name.startswith(RemoteTransport.shared_array_prefix)}
+
+        data = numpy.random.randn(4, 512, 512).astype(numpy.float32)
+        shared_file_names = get_shared_file_names()
+        # results returned by the server pass no shared paths; a client which never loads them must not leak files.
+        body, buffers = Facade.Pickler.dumps([DataAndMetadata.new_data_and_metadata(data)])
+        self.assertEqual(shared_file_names, get_shared_file_names())
+        xdata_list = Facade.Unpickler(io.BytesIO(body), None, buffers).load()
+        self.assertTrue(numpy.array_equal(data, xdata_list[0].data))
+
+    def test_loading_shared_array_rejects_files_not_made_by_share_array(self):
+        handle = RemoteTransport.share_array(numpy.zeros((4, 4)))
+        try:
+            directory = os.path.dirname(handle["path"])
+            for path in (os.path.join(directory, "other.npy"), os.path.join(directory, "..", os.path.basename(handle["path"]))):
+                with self.assertRaises(pickle.UnpicklingError):
+                    RemoteTransport.load_shared_array({"path": path})
+            self.assertTrue(os.path.exists(handle["path"]))
+            self.assertTrue(numpy.array_equal(numpy.zeros((4, 4)), RemoteTransport.load_shared_array(handle)))
+            self.assertFalse(os.path.exists(handle["path"]))
+        finally:
+            RemoteTransport.remove_shared_arrays([handle["path"]])
+
+    def __call_remote(self, server, api, function_name, request):
+        with socket.create_connection(server.server_address) as sock:
+            body, buffers = Facade.Pickler.dumps(request)
+            RemoteTransport.send_frame(sock, pickle.dumps((function_name, body)), buffers)
+            payload, result_buffers = RemoteTransport.receive_frame(sock)
+        status, result_body = pickle.loads(payload)
+        self.assertEqual("result", status)
+        return Facade.Unpickler(io.BytesIO(result_body), api, result_buffers).load()
+
+    def test_remote_server_runs_threadsafe_call_while_queued_call_waits_for_ui_thread(self):
+        with create_memory_profile_context() as profile_context:
+            document_controller = profile_context.create_document_controller_with_application()
+            api = Facade.get_api("~1.0", "~1.0")
+            server = Facade.RemoteServer(("localhost", 0), api)
+            server_thread = threading.Thread(target=server.serve_forever)
+            server_thread.daemon = True
+            server_thread.start()
+            try:
+                def call(function_name, request):
+                    return self.__call_remote(server, api, function_name, request)
+                queued_results = list()
+                queued_thread = threading.Thread(target=lambda: queued_results.append(call("call_method", (api, "create_calibration", (1.0, 2.0, "nm"), dict()))))
+                queued_thread.start()
+                # the queued call cannot finish until the ui thread runs; the thread safe call does not wait for it.
+                calibration = call("call_threadsafe_method", (api, "create_calibration", (3.0, 4.0, "s"), dict()))
+                self.assertEqual("s", calibration.units)
+                self.assertEqual(0, len(queued_results))
+                while queued_thread.is_alive():
+                    document_controller.periodic()
+                    queued_thread.join(0.01)
+                self.assertEqual("nm", queued_results[0].units)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_remote_batch_runs_operations_in_order_and_fetches_simple_properties(self):
+        with create_memory_profile_context() as profile_context:
+            document_controller = profile_context.create_document_controller_with_application()
+            api = Facade.get_api("~1.0", "~1.0")
+            data_items = [api.library.create_data_item_from_data(numpy.zeros((4, 4)), "title{}".format(i)) for i in range(3)]
+            server = Facade.RemoteServer(("localhost", 0), api)
+            server_thread = threading.Thread(target=server.serve_forever)
+            server_thread.daemon = True
+            server_thread.start()
+            try:
+                operations = [("get_property", data_item, "title", (), dict()) for data_item in data_items]
+                operations.append(("set_property", data_items[0], "title", ("new",), dict()))
+                operations.append(("call_method", data_items[1], "set_metadata_value", ("stem.high_tension", 100000), dict()))
+                operations.append(("get_properties", data_items[0], None, (None,), dict()))
+                operations.append(("get_properties", data_items[1], None, (["metadata"],), dict()))
+                results_ref = list()
+                batch_thread = threading.Thread(target=lambda: results_ref.append(self.__call_remote(server, api, "call_batch", operations)))
+                batch_thread.start()
+                # the whole batch runs in a single ui thread task.
+                while batch_thread.is_alive():
+                    document_controller.periodic()
+                    batch_thread.join(0.01)
+                results = results_ref[0]
+                self.assertEqual(["title0", "title1", "title2", None, None], results[0:5])
+                self.assertEqual("new", results[5]["title"])
+                self.assertIn("uuid", results[5])
+                self.assertIn("metadata", results[5])
+                self.assertNotIn("data", results[5])
+                self.assertNotIn("xdata", results[5])
+                self.assertEqual({"metadata"}, set(results[6].keys()))
+                self.assertEqual(100000, results[6]["metadata"]["instrument"]["high_tension"])
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_remote_batch_fetches_simple_properties_valid_for_each_graphic_type(self):
+        with create_memory_profile_context() as profile_context:
+            document_controller = profile_context.create_document_controller_with_application()
+            api = Facade.get_api("~1.0", "~1.0")
+            data_item = api.library.create_data_item_from_data(numpy.zeros((4, 4)))
+            rectangle_region = data_item.add_rectangle_region(0.5, 0.5, 0.25, 0.25)
+            point_region = data_item.add_point_region(0.25, 0.75)
+            line_region = data_item.add_line_region(0.1, 0.2, 0.3, 0.4)
+            server = Facade.RemoteServer(("localhost", 0), api)
+            server_thread = threading.Thread(target=server.serve_forever)
+            server_thread.daemon = True
+            server_thread.start()
+            try:
+                operations = [("get_properties", graphic, None, (None,), dict()) for graphic in (rectangle_region, point_region, line_region)]
+                results_ref = list()
+                batch_thread = threading.Thread(target=lambda: results_ref.append(self.__call_remote(server, api, "call_batch", operations)))
+                batch_thread.start()
+                while batch_thread.is_alive():
+                    document_controller.periodic()
+                    batch_thread.join(0.01)
+                rectangle_properties, point_properties, line_properties = results_ref[0]
+                self.assertEqual("rect-graphic", rectangle_properties["graphic_type"])
+                self.assertEqual(rectangle_region.bounds, rectangle_properties["bounds"])
+                self.assertNotIn("start", rectangle_properties)
+                self.assertEqual("point-graphic", point_properties["graphic_type"])
+                self.assertEqual(point_region.position, point_properties["position"])
+                self.assertNotIn("angle", point_properties)
+                self.assertEqual("line-graphic", line_properties["graphic_type"])
+                self.assertEqual(line_region.start, line_properties["start"])
+                self.assertEqual(line_region.end, line_properties["end"])
+                self.assertNotIn("bounds", line_properties)
+                # named properties must be valid for the object
+                with self.assertRaises(AttributeError):
+                    Facade.get_properties(line_region, ["bounds"])
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_server_proxy_does_not_retry_call_whose_response_is_lost(self):
+        request_count_ref = [0]
+
+        class RequestHandler(socketserver.BaseRequestHandler):
+            # respond to the first request on each connection, then close the connection after reading the next.
+            def handle(self):
+                RemoteTransport.receive_frame(self.request)
+                request_count_ref[0] += 1
+                RemoteTransport.send_frame(self.request, pickle.dumps(("result", pickle.dumps(None))))
+                RemoteTransport.receive_frame(self.request)
+                request_count_ref[0] += 1
+
+        server = socketserver.ThreadingTCPServer(("localhost", 0), RequestHandler)
+        server.daemon_threads = True
+        server_thread = threading.Thread(target=server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        proxy = Transport.ServerProxy(server.server_address)
+        try:
+            proxy.call("call_method", pickle.dumps(None))
+            self.assertEqual(1, proxy.idle_count)
+            # the request on the idle connection is delivered, so it must not be sent again on a new connection.
+            with self.assertRaises(EOFError):
+                proxy.call("call_method", pickle.dumps(None))
+            self.assertEqual(2, request_count_ref[0])
+            self.assertEqual(0, proxy.idle_count)
+        finally:
+            proxy.close()
+            server.shutdown()
+            server.server_close()
+
     def test_create_empty_data_item_and_set_data_copies_data(self):
         with create_memory_profile_context() as profile_context:
             document_controller = profile_context.create_document_controller_with_application()
@@ -10,10 +10,20 @@ import uuid
 import numpy
 
 # local libraries
+from nion.data import DataAndMetadata
 from nion.swift.model import HDF5Handler
 from nion.swift.model import Cache
 
 
+def count_chunks_read(data_shape, chunk_shape, selection) -> int:
+    # the number of chunks intersecting the selection, a tuple of (start, stop) for each axis.
+    chunk_shape = chunk_shape or data_shape  # contiguous data is read as one piece
+    count = 1
+    for (start, stop), chunk_length in zip(selection, chunk_shape):
+        count *= (stop - 1) // chunk_length - start // chunk_length + 1
+    return count
+
+
 class TestHDF5Handler(unittest.TestCase):
 
     def setUp(self):
@@ -91,3 +101,143 @@ class TestHDF5Handler(unittest.TestCase):
         finally:
             #logging.debug("rmtree %s", data_dir)
             shutil.rmtree(data_dir)
+
+    def test_hdf5_handler_partial_write_only_writes_region(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            h = HDF5Handler.HDF5Handler(os.path.join(data_dir, "abc.h5"))
+            with contextlib.closing(h):
+                data = numpy.zeros((8, 6), dtype=numpy.float32)
+                # partial write with no existing dataset writes everything
+                h.write_data_partial(data, (slice(0, 2), slice(None)), now)
+                self.assertEqual(h.read_data().shape, (8, 6))
+                # partial write into the existing dataset writes only the region
+                data[2:4, :] = 1
+                data[6:8, :] = 2  # not part of the region; should not be written
+                h.write_data_partial(data, (slice(2, 4), slice(None)), now)
+                d = numpy.array(h.read_data())
+                self.assertTrue(numpy.array_equal(d[2:4, :], numpy.ones((2, 6))))
+                self.assertTrue(numpy.allclose(d[6:8, :], 0))
+                # partial write with a different shape writes everything
+                data = numpy.ones((4, 4), dtype=numpy.float32)
+                h.write_data_partial(data, (slice(0, 1), slice(None)), now)
+                self.assertTrue(numpy.array_equal(numpy.array(h.read_data()), data))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_hdf5_handler_file_pool_closes_least_recently_used_files_and_reopens(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        file_pool = HDF5Handler.HDF5Handler.file_pool
+        HDF5Handler.HDF5Handler.file_pool = HDF5Handler.FilePool(max_open_count=2)
+        try:
+            handlers = [HDF5Handler.HDF5Handler(os.path.join(data_dir, f"abc{i}.h5")) for i in range(4)]
+            try:
+                for i, h in enumerate(handlers):
+                    h.write_data(numpy.full((4, 4), i, dtype=numpy.float32), now)
+                    h.write_properties({"index": i}, now)
+                self.assertEqual(2, HDF5Handler.HDF5Handler.file_pool.open_count)
+                self.assertEqual(2, HDF5Handler.HDF5Handler.file_pool.evict_count)
+                # evicted files reopen transparently
+                for i, h in enumerate(handlers):
+                    self.assertEqual({"index": i}, h.read_properties())
+                self.assertEqual(2, HDF5Handler.HDF5Handler.file_pool.open_count)
+                self.assertEqual(4, HDF5Handler.HDF5Handler.file_pool.reopen_count)
+                # a file is not closed while the data returned from it is in use
+                d = handlers[0].read_data()
+                for h in handlers[1:]:
+                    h.read_properties()
+                self.assertTrue(numpy.array_equal(numpy.zeros((4, 4)), d[:]))
+                HDF5Handler.HDF5Handler.file_pool.reset_counters()
+                handlers[0].read_properties()
+                self.assertEqual(0, HDF5Handler.HDF5Handler.file_pool.reopen_count)
+                # once the data is released, the file can be closed
+                d = None
+                handlers[1].read_properties()
+                handlers[2].read_properties()
+                handlers[0].read_properties()
+                self.assertEqual(1, HDF5Handler.HDF5Handler.file_pool.hit_count)
+                self.assertEqual(3, HDF5Handler.HDF5Handler.file_pool.reopen_count)
+            finally:
+                for h in handlers:
+                    h.close()
+            self.assertEqual(0, HDF5Handler.HDF5Handler.file_pool.open_count)
+        finally:
+            HDF5Handler.HDF5Handler.file_pool = file_pool
+            shutil.rmtree(data_dir)
+
+    def test_frame_dataset_policy_chunks_navigation_axes_by_whole_frames(self):
+        policy = HDF5Handler.FrameDatasetPolicy(target_chunk_size=580 * 1024, max_chunk_size=8 * 1024 * 1024)
+        collection_4d = DataAndMetadata.DataDescriptor(False, 2, 2)
+        spectrum_image = DataAndMetadata.DataDescriptor(False, 2, 1)
+        sequence = DataAndMetadata.DataDescriptor(True, 0, 2)
+        self.assertEqual((1, 1, 512, 512), policy.get_chunk_shape((32, 32, 512, 512), numpy.float32, collection_4d))
+        self.assertEqual((1, 9, 128, 128), policy.get_chunk_shape((32, 32, 128, 128), numpy.float32, collection_4d))
+        self.assertEqual((1, 145, 1024), policy.get_chunk_shape((256, 256, 1024), numpy.float32, spectrum_image))
+        self.assertEqual((2, 64, 1024), policy.get_chunk_shape((64, 64, 1024), numpy.float32, spectrum_image))
+        self.assertEqual((1, 512, 4096), policy.get_chunk_shape((10, 4096, 4096), numpy.float32, sequence))
+        # data without navigation dimensions uses the default chunking
+        self.assertEqual(HDF5Handler.get_write_chunk_shape_for_data((4096, 4096), numpy.float32),
+                         policy.get_chunk_shape((4096, 4096), numpy.float32, DataAndMetadata.DataDescriptor(False, 0, 2)))
+        self.assertIs(HDF5Handler.frame_dataset_policy, HDF5Handler.get_dataset_policy(collection_4d))
+        self.assertIs(HDF5Handler.default_dataset_policy, HDF5Handler.get_dataset_policy(DataAndMetadata.DataDescriptor(False, 0, 2)))
+        self.assertIs(HDF5Handler.default_dataset_policy, HDF5Handler.get_dataset_policy(None))
+
+    def test_dataset_policies_read_by_frame_and_read_by_spectrum(self):
+        # compare the chunks read for the two access patterns of 4d data; timing depends on the storage, so count the
+        # chunks instead, which is what determines the reads and decompression for chunked datasets.
+        data_shape = (16, 16, 512, 512)
+        data_descriptor = DataAndMetadata.DataDescriptor(False, 2, 2)
+        frame_selection = ((3, 4), (5, 6), (0, 512), (0, 512))
+        spectrum_selection = ((0, 16), (0, 16), (100, 101), (200, 201))
+        default_chunks = HDF5Handler.default_dataset_policy.get_chunk_shape(data_shape, numpy.float32, data_descriptor)
+        frame_chunks = HDF5Handler.frame_dataset_policy.get_chunk_shape(data_shape, numpy.float32, data_descriptor)
+        self.assertEqual(2, count_chunks_read(data_shape, default_chunks, frame_selection))
+        self.assertEqual(1, count_chunks_read(data_shape, frame_chunks, frame_selection))
+        self.assertEqual(256, count_chunks_read(data_shape, default_chunks, spectrum_selection))
+        self.assertEqual(256, count_chunks_read(data_shape, frame_chunks, spectrum_selection))
+
+    def test_hdf5_handler_creates_dataset_using_policy_for_data_descriptor(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        dataset_policy_fn = HDF5Handler.HDF5Handler.dataset_policy_fn
+        compressed_policy = HDF5Handler.FrameDatasetPolicy(compression="gzip", compression_opts=1, shuffle=True)
+        HDF5Handler.HDF5Handler.dataset_policy_fn = staticmethod(lambda data_descriptor: compressed_policy if data_descriptor else HDF5Handler.default_dataset_policy)
+        try:
+            h = HDF5Handler.HDF5Handler(os.path.join(data_dir, "abc.h5"))
+            with contextlib.closing(h):
+                data_descriptor = DataAndMetadata.DataDescriptor(False, 2, 2)
+                data = numpy.zeros((4, 4, 32, 32), dtype=numpy.uint16)
+                data[1, 2, 3, 4] = 5
+                h.write_data(data, now, data_descriptor=data_descriptor)
+                d = h.read_data()
+                self.assertEqual((4, 4, 32, 32), d.chunks)
+                self.assertEqual("gzip", d.compression)
+                self.assertTrue(numpy.array_equal(data, d[:]))
+                d = None
+                h.reserve_data((8, 4, 32, 32), numpy.uint16, now, data_descriptor=data_descriptor)
+                d = h.read_data()
+                self.assertEqual((8, 4, 32, 32), d.chunks)
+                self.assertEqual("gzip", d.compression)
+                self.assertTrue(numpy.allclose(d[:], 0))
+                d = None
+                # without a data descriptor, the default policy is used
+                h.write_data(numpy.zeros((32, 32), dtype=numpy.uint16), now, data_descriptor=None)
+                self.assertIsNotNone(h.read_data())
+        finally:
+            HDF5Handler.HDF5Handler.dataset_policy_fn = dataset_policy_fn
+            shutil.rmtree(data_dir)
@@ -4,6 +4,7 @@ import datetime
 import threading
 import time
 import unittest
+import unittest.mock
 
 import numpy
 
@@ -798,6 +799,65 @@ class TestHardwareSourceClass(unittest.TestCase):
             self.assertAlmostEqual(data[0, 0], 1.0)
             self.assertAlmostEqual(data[128, 0], 16.0)
 
+    def test_data_channel_buffer_reuses_slots_and_counts_overruns_and_drops(self):
+        hardware_source = SimpleHardwareSource()
+        data_channel = hardware_source.data_channels[0]
+        data_channel_buffer = HardwareSource.DataChannelBuffer(hardware_source.data_channels, buffer_size=2)
+        try:
+            data_channel_buffer.start()
+            for i in range(5):
+                data_channel.update(DataAndMetadata.new_data_and_metadata(numpy.full((4, 4), i, numpy.float32)), "complete", None, None, None, None)
+            self.assertEqual(5, data_channel_buffer.frame_count)
+            self.assertEqual(3, data_channel_buffer.overrun_count)
+            # earliest remaining frame is borrowed from its slot and read only
+            borrowed_xdata = data_channel_buffer.grab_earliest()[0]
+            self.assertEqual(3, borrowed_xdata.data[0, 0])
+            self.assertFalse(borrowed_xdata.data.flags.writeable)
+            owned_xdata = data_channel_buffer.grab_earliest(copy=True)[0]
+            self.assertEqual(4, owned_xdata.data[0, 0])
+            self.assertTrue(owned_xdata.data.flags.writeable)
+            # the next frame reuses the slot of the borrowed frame; the owned copy is unaffected
+            data_channel.update(DataAndMetadata.new_data_and_metadata(numpy.full((4, 4), 5, numpy.float32)), "complete", None, None, None, None)
+            data_channel.update(DataAndMetadata.new_data_and_metadata(numpy.full((4, 4), 6, numpy.float32)), "complete", None, None, None, None)
+            self.assertEqual(5, borrowed_xdata.data[0, 0])
+            self.assertEqual(4, owned_xdata.data[0, 0])
+            # borrowed frames share the metadata of the frame made by the data channel
+            latest_xdata = data_channel_buffer.grab_latest()[0]
+            self.assertEqual(6, latest_xdata.data[0, 0])
+            self.assertIs(data_channel.data_and_metadata.metadata, latest_xdata.metadata)
+            self.assertEqual(1, data_channel_buffer.drop_count)
+            self.assertEqual("simple_hardware_source", data_channel.data_and_metadata.metadata["hardware_source"]["hardware_source_id"])
+        finally:
+            data_channel_buffer.stop()
+            data_channel_buffer.close()
+            hardware_source.close()
+
+    def test_data_channel_buffer_grabs_do_not_deep_copy_frames_by_default(self):
+        hardware_source = SimpleHardwareSource()
+        data_channel = hardware_source.data_channels[0]
+        for reuse_slots in (True, False):
+            with self.subTest(reuse_slots=reuse_slots):
+                data_channel_buffer = HardwareSource.DataChannelBuffer(hardware_source.data_channels, buffer_size=2, reuse_slots=reuse_slots)
+                try:
+                    data_channel_buffer.start()
+                    for i in range(4):
+                        data_channel.update(DataAndMetadata.new_data_and_metadata(numpy.full((4, 4), i, numpy.float32)), "complete", None, None, None, None)
+                    with unittest.mock.patch("copy.deepcopy", wraps=copy.deepcopy) as deepcopy_mock:
+                        earliest_xdata = data_channel_buffer.grab_earliest()[0]
+                        latest_xdata = data_channel_buffer.grab_latest(copy=not reuse_slots)[0]
+                    self.assertFalse(any(isinstance(call.args[0], DataAndMetadata.DataAndMetadata) for call in deepcopy_mock.call_args_list))
+                    self.assertEqual(2, earliest_xdata.data[0, 0])
+                    self.assertEqual(3, latest_xdata.data[0, 0])
+                    # frames not stored in reused slots are owned by the client and are not overwritten by later frames
+                    self.assertEqual(not reuse_slots, earliest_xdata.data.flags.writeable)
+                    for i in range(4, 8):
+                        data_channel.update(DataAndMetadata.new_data_and_metadata(numpy.full((4, 4), i, numpy.float32)), "complete", None, None, None, None)
+                    self.assertEqual(6 if reuse_slots else 2, earliest_xdata.data[0, 0])
+                finally:
+                    data_channel_buffer.stop()
+                    data_channel_buffer.close()
+        hardware_source.close()
+
     def test_standard_data_element_constructs_metadata_with_hardware_source_as_dict(self):
         data_element = ScanAcquisitionTask(False, 0).make_data_element()
         data_item = ImportExportManager.create_data_item_from_data_element(data_element)
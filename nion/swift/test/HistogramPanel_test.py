@@ -9,6 +9,7 @@ import numpy
 from nion.data import DataAndMetadata
 from nion.swift import HistogramPanel
 from nion.swift.model import DataItem
+from nion.swift.model import DisplayItem
 from nion.swift.model import Graphics
 from nion.swift.test import TestContext
 
@@ -151,5 +152,55 @@ class TestHistogramPanelClass(unittest.TestCase):
         self.assertAlmostEqual(float(statistics_dict["min"]), numpy.amin(numpy.sum(data[..., 14:16], -1)))
         self.assertAlmostEqual(float(statistics_dict["max"]), numpy.amax(numpy.sum(data[..., 14:16], -1)))
 
+    def test_data_statistics_in_chunks_match_full_data_statistics(self):
+        data = numpy.random.randn(37, 19) * 10 + 5
+        mean, std, rms, data_min, data_max = HistogramPanel.calculate_data_statistics(data, True, chunk_element_count=40)
+        self.assertAlmostEqual(numpy.mean(data), mean)
+        self.assertAlmostEqual(numpy.std(data), std)
+        self.assertAlmostEqual(numpy.sqrt(numpy.mean(numpy.square(data))), rms)
+        self.assertEqual(numpy.amin(data), data_min)
+        self.assertEqual(numpy.amax(data), data_max)
+        mean, std, rms, data_min, data_max = HistogramPanel.calculate_data_statistics(data, False)
+        self.assertAlmostEqual(numpy.std(data), std)
+        self.assertIsNone(data_min)
+        self.assertIsNone(data_max)
+
+    def test_display_data_key_is_unchanged_for_new_display_values_of_unchanged_data(self):
+        data_item = DataItem.DataItem(numpy.ones((4, 4, 8), numpy.complex64))
+        data_item.set_xdata(DataAndMetadata.new_data_and_metadata(numpy.ones((4, 4, 8), numpy.complex64), data_descriptor=DataAndMetadata.DataDescriptor(True, 0, 2)))
+        self.document_model.append_data_item(data_item)
+        display_data_channel = self.document_model.get_display_item_for_data_item(data_item).display_data_channels[0]
+        display_values = display_data_channel.get_calculated_display_values()
+        data_statistics = display_values.data_statistics
+        display_values.finalize()
+        key = HistogramPanel.get_display_data_key(display_values)
+        display_data_channel.brightness = 0.5
+        display_values2 = display_data_channel.get_calculated_display_values()
+        display_values2.finalize()
+        # the display data is calculated anew but is known to be equal
+        self.assertIsNot(display_values.display_data_and_metadata.data, display_values2.display_data_and_metadata.data)
+        self.assertEqual(key, HistogramPanel.get_display_data_key(display_values2))
+        self.assertIs(data_statistics, display_values2.data_statistics)
+        display_data_channel.sequence_index = 1
+        self.assertNotEqual(key, HistogramPanel.get_display_data_key(display_data_channel.get_calculated_display_values()))
+        data_item.set_xdata(DataAndMetadata.new_data_and_metadata(numpy.ones((4, 4, 8), numpy.complex64), data_descriptor=DataAndMetadata.DataDescriptor(True, 0, 2)))
+        display_data_channel.sequence_index = 0
+        self.assertNotEqual(key, HistogramPanel.get_display_data_key(display_data_channel.get_calculated_display_values()))
+        self.assertIsNone(HistogramPanel.get_display_data_key(None))
+
+    def test_histogram_of_large_data_is_sampled_and_scaled(self):
+        sample_threshold = DisplayItem.DataStatistics.sample_threshold
+        DisplayItem.DataStatistics.sample_threshold = 64
+        try:
+            data = numpy.zeros((64, 64), dtype=numpy.uint32)
+            data[:, 32:] = 100
+            self.display_item.data_item.set_data(data)
+            self.histogram_panel._histogram_widget._histogram_data_func_value_model._run_until_complete()
+            histogram_data = self.histogram_canvas_item.histogram_data
+            self.assertEqual(1.0, histogram_data[0])
+            self.assertEqual(1.0, histogram_data[-1])
+        finally:
+            DisplayItem.DataStatistics.sample_threshold = sample_threshold
+
 if __name__ == '__main__':
     unittest.main()
@@ -9,10 +9,12 @@ import numpy
 from nion.data import Calibration
 from nion.data import DataAndMetadata
 from nion.swift import Application
+from nion.swift import ImageCanvasItem
 from nion.swift.model import DataItem
 from nion.swift.model import Graphics
 from nion.swift.test import TestContext
 from nion.ui import TestUI
+from nion.utils import Geometry
 
 
 class TestImageCanvasItemClass(unittest.TestCase):
@@ -23,6 +25,15 @@ class TestImageCanvasItemClass(unittest.TestCase):
     def tearDown(self):
         pass
 
+    def test_display_level_is_largest_reduction_not_smaller_than_canvas(self):
+        self.assertEqual(0, ImageCanvasItem.calculate_display_level((1024, 1024), Geometry.IntSize(height=1024, width=1024), 5))
+        self.assertEqual(1, ImageCanvasItem.calculate_display_level((1024, 1024), Geometry.IntSize(height=500, width=500), 5))
+        self.assertEqual(3, ImageCanvasItem.calculate_display_level((1024, 1024), Geometry.IntSize(height=100, width=128), 5))
+        self.assertEqual(2, ImageCanvasItem.calculate_display_level((1024, 4096), Geometry.IntSize(height=200, width=200), 5))
+        self.assertEqual(4, ImageCanvasItem.calculate_display_level((1024, 1024), Geometry.IntSize(height=10, width=10), 5))
+        self.assertEqual(0, ImageCanvasItem.calculate_display_level((1024, 1024), None, 5))
+        self.assertEqual(0, ImageCanvasItem.calculate_display_level((1024, 1024), Geometry.IntSize(height=100, width=100), 1))
+
     def test_mapping_widget_to_image_on_2d_data_stack_uses_signal_dimensions(self):
         with TestContext.create_memory_context() as test_context:
             document_controller = test_context.create_document_controller()
@@ -344,6 +344,38 @@ class TestLineGraphCanvasItem(unittest.TestCase):
             # ensure that the drawing commands are sufficiently populated to have drawn the graph
             self.assertGreater(len(drawing_context.commands), 100)
 
+    def test_envelope_decimation_preserves_narrow_peaks(self):
+        data = numpy.zeros((1000,))
+        data[501] = 10.0
+        data[733] = -4.0
+        binned_min, binned_max = LineGraphCanvasItem.decimate_envelope_1d(data, 100)
+        self.assertEqual((100,), binned_min.shape)
+        self.assertEqual((100,), binned_max.shape)
+        self.assertEqual(10.0, numpy.amax(binned_max))
+        self.assertEqual(-4.0, numpy.amin(binned_min))
+        self.assertEqual(10.0, binned_max[50])
+        self.assertEqual(-4.0, binned_min[73])
+
+    def test_line_graph_path_removes_redundant_vertices(self):
+        xs, ys = LineGraphCanvasItem.calculate_line_graph_path(numpy.array([[5.0, 5.0, 3.0]]), 10, 8.0, 13, None)
+        self.assertEqual([10, 10, 12, 12, 13], xs)
+        self.assertEqual([8, 5, 5, 3, 3], ys)
+        xs, ys = LineGraphCanvasItem.calculate_line_graph_path(numpy.array([[5.0, 5.0, 3.0]]), 10, 8.0, 13, 8.0)
+        self.assertEqual([10, 10, 12, 12, 13, 13], xs)
+        self.assertEqual([8, 5, 5, 3, 3, 8], ys)
+
+    def test_line_graph_envelope_path_keeps_vertical_extent_of_each_pixel(self):
+        xs, ys = LineGraphCanvasItem.calculate_line_graph_path(numpy.array([[5.0, 6.0], [3.0, 2.0]]), 0, 5.0, 2, None)
+        self.assertEqual([0, 0, 1, 1, 1, 2], xs)
+        self.assertEqual([5, 3, 3, 6, 2, 2], ys)
+
+    def test_line_graph_fill_reaching_right_edge_closes_at_last_pixel(self):
+        drawing_context = DrawingContext.DrawingContext()
+        xdata = DataAndMetadata.new_data_and_metadata(numpy.array([1.0, 2.0, 3.0, 4.0]))
+        LineGraphCanvasItem.draw_line_graph(drawing_context, 10, 4, 0, 0, xdata, 0.0, 10.0, 0.0, 4.0, Calibration.Calibration(), "black", None, None, "linear")
+        close_index = drawing_context.commands.index(("closePath",))
+        self.assertEqual([("lineTo", 4.0, 6.0), ("lineTo", 3.0, 10.0), ("lineTo", 0.0, 10.0)], drawing_context.commands[close_index - 3:close_index])
+
     def test_check_exponents(self):
         e = LineGraphCanvasItem.Exponenter()
         e.add_label("5e+05")
@@ -9,6 +9,7 @@ import os
 import shutil
 import unittest
 import uuid
+import zipfile
 
 # third party libraries
 import numpy
@@ -141,6 +142,148 @@ class TestNDataHandlerClass(unittest.TestCase):
             #logging.debug("rmtree %s", data_dir)
             shutil.rmtree(data_dir)
 
+    @unittest.skipIf(not NDataHandler.NDataHandler.is_memory_map_supported, "memory maps not supported")
+    def test_ndata_handler_memory_mapped_read(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            h = NDataHandler.NDataHandler(os.path.join(data_dir, "abc.ndata"))
+            h.use_memory_map = True
+            with contextlib.closing(h):
+                p = {u"uuid": str(uuid.uuid4())}
+                h.write_properties(p, now)
+                data = numpy.arange(64, dtype=numpy.float32).reshape(8, 8)
+                h.write_data(data, now)
+                d = h.read_data()
+                self.assertIsInstance(d, numpy.memmap)
+                self.assertTrue(numpy.array_equal(d, data))
+                # writing to the map does not change the file
+                d[0, 0] = 100
+                self.assertEqual(h.read_data()[0, 0], 0)
+                # rewriting properties and data leaves the existing map intact
+                p["title"] = "title"
+                h.write_properties(p, now)
+                h.write_data(numpy.zeros((4, 4), dtype=numpy.int16), now)
+                self.assertTrue(numpy.array_equal(d[1:], data[1:]))
+                self.assertEqual(h.read_properties(), p)
+                d2 = h.read_data()
+                self.assertEqual(d2.shape, (4, 4))
+                self.assertEqual(d2.dtype, numpy.int16)
+                del d, d2
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    @unittest.skipIf(not NDataHandler.NDataHandler.is_memory_map_supported, "memory maps not supported")
+    def test_ndata_handler_replaces_file_only_while_memory_maps_are_in_use(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            file_path = os.path.join(data_dir, "abc.ndata")
+            h = NDataHandler.NDataHandler(file_path)
+            h.use_memory_map = True
+            with contextlib.closing(h):
+                h.write_properties({u"uuid": str(uuid.uuid4())}, now)
+                h.write_data(numpy.zeros((8, 8), dtype=numpy.float32), now)
+                file_id = os.stat(file_path).st_ino
+                d = h.read_data()
+                # a map is in use; the file is replaced and the map keeps the old contents
+                h.write_data(numpy.ones((8, 8), dtype=numpy.float32), now)
+                self.assertNotEqual(file_id, os.stat(file_path).st_ino)
+                self.assertEqual(0, d[0, 0])
+                del d
+                # no map is in use; the file is written in place
+                file_id = os.stat(file_path).st_ino
+                h.write_data(numpy.full((8, 8), 2, dtype=numpy.float32), now)
+                self.assertEqual(file_id, os.stat(file_path).st_ino)
+                self.assertEqual(2, h.read_data()[0, 0])
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_ndata_handler_memory_mapped_read_loads_reversed_zip_file(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            file_path = os.path.join(data_dir, "abc.ndata")
+            data = numpy.arange(16, dtype=numpy.float32).reshape(4, 4)
+            # write zip file where metadata is first
+            with open(file_path, "w+b") as fp:
+                json_bytes = bytes(json.dumps({"uuid": str(uuid.uuid4())}), 'ISO-8859-1')
+                def write_json(fp):
+                    fp.write(json_bytes)
+                    return binascii.crc32(json_bytes) & 0xFFFFFFFF
+                def write_data(fp):
+                    numpy.save(fp, data)
+                    return 0
+                json_len, json_crc32 = NDataHandler.write_local_file(fp, b"metadata.json", write_json, now)
+                offset_data = fp.tell()
+                data_len, crc32 = NDataHandler.write_local_file(fp, b"data.npy", write_data, now)
+                dir_offset = fp.tell()
+                NDataHandler.write_directory_data(fp, 0, b"metadata.json", json_len, json_crc32, now)
+                NDataHandler.write_directory_data(fp, offset_data, b"data.npy", data_len, crc32, now)
+                NDataHandler.write_end_of_directory(fp, fp.tell() - dir_offset, dir_offset, 2)
+            h = NDataHandler.NDataHandler(file_path)
+            h.use_memory_map = True
+            with contextlib.closing(h):
+                d = h.read_data()
+                self.assertNotIsInstance(d, numpy.memmap)
+                self.assertTrue(numpy.array_equal(d, data))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_ndata_handler_rewrites_properties_in_place_when_they_fit(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            file_path = os.path.join(data_dir, "abc.ndata")
+            h = NDataHandler.NDataHandler(file_path)
+            with contextlib.closing(h):
+                p = {u"uuid": str(uuid.uuid4()), u"title": u"a"}
+                data = numpy.arange(64, dtype=numpy.float32).reshape(8, 8)
+                h.write_properties(p, now)
+                h.write_data(data, now)
+                file_size = os.path.getsize(file_path)
+                with open(file_path, "rb") as fp:
+                    local_files, dir_files, eocd = NDataHandler.parse_zip(fp)
+                # small changes fit in the slack and leave the zip structure unchanged
+                p[u"title"] = u"abcdefghijklmnopqrstuvwxyz"
+                h.write_properties(p, now)
+                self.assertEqual(file_size, os.path.getsize(file_path))
+                with open(file_path, "rb") as fp:
+                    new_local_files, new_dir_files, new_eocd = NDataHandler.parse_zip(fp)
+                self.assertEqual(dir_files, new_dir_files)
+                self.assertEqual({k: v[0:3] for k, v in local_files.items()}, {k: v[0:3] for k, v in new_local_files.items()})
+                self.assertEqual(h.read_properties(), p)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+                with zipfile.ZipFile(file_path) as z:
+                    self.assertIsNone(z.testzip())
+                # large changes grow the metadata
+                p[u"title"] = u"a" * 4096
+                h.write_properties(p, now)
+                self.assertLess(file_size, os.path.getsize(file_path))
+                self.assertEqual(h.read_properties(), p)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+                with zipfile.ZipFile(file_path) as z:
+                    self.assertIsNone(z.testzip())
+                # writing data carries the existing properties over
+                h.write_data(numpy.zeros((4, 4), dtype=numpy.int16), now)
+                self.assertEqual(h.read_properties(), p)
+                with zipfile.ZipFile(file_path) as z:
+                    self.assertIsNone(z.testzip())
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
     def test_ndata_handles_corrupt_data(self):
         logging.getLogger().setLevel(logging.DEBUG)
         now = datetime.datetime.now()
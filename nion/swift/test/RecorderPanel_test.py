@@ -86,3 +86,25 @@ class TestRecorderPanelClass(unittest.TestCase):
                         else:
                             self.assertEqual(recorder_state_ref[0], "stopped")
                 self.assertEqual(recorder_state_ref[0], "stopped")
+
+    def test_recorder_writes_frames_into_reserved_sequence_and_trims_when_stopped_early(self):
+        with TestContext.create_memory_context() as test_context:
+            document_controller = test_context.create_document_controller()
+            document_model = document_controller.document_model
+            data_item = DataItem.DataItem(numpy.ones((8, 8)))
+            document_model.append_data_item(data_item)
+            recorder = RecorderPanel.Recorder(document_controller, data_item)
+            with contextlib.closing(recorder):
+                with document_model.data_item_live(data_item):
+                    recorder.start_recording(10, 1, 8)
+                    for i in range(3):
+                        recorder.continue_recording(10 + i + 0.25)
+                        data_item.set_data(data_item.data + 1)
+                    recorded_data_item = document_model.data_items[1]
+                    self.assertEqual((8, 8, 8), recorded_data_item.xdata.dimensional_shape)
+                    recorder.stop_recording()
+            self.assertEqual((3, 8, 8), recorded_data_item.xdata.dimensional_shape)
+            self.assertTrue(recorded_data_item.xdata.is_sequence)
+            self.assertEqual("s", recorded_data_item.xdata.dimensional_calibrations[0].units)
+            for i in range(3):
+                self.assertTrue(numpy.array_equal(numpy.full((8, 8), i + 1), recorded_data_item.data[i]))
@@ -927,6 +927,23 @@ class TestStorageClass(unittest.TestCase):
                 data_item = document_model.data_items[0]
                 self.assertTrue(numpy.array_equal(zeros.data, data_item.data))
 
+    def test_data_large_format_partial_updates_write_only_updated_region(self):
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            with contextlib.closing(document_model):
+                data_item = DataItem.DataItem(large_format=True)
+                document_model.append_data_item(data_item)
+                data_metadata = DataAndMetadata.new_data_and_metadata(numpy.zeros((8, 8), numpy.uint32)).data_metadata
+                for i in range(4):
+                    row = DataAndMetadata.new_data_and_metadata(numpy.full((2, 8), i + 1, numpy.uint32))
+                    data_item.set_data_and_metadata_partial(data_metadata, row, (slice(0, 2), slice(0, 8)), (slice(i * 2, i * 2 + 2), slice(0, 8)))
+                storage_handler = data_item.persistent_storage._data_properties_map[data_item.uuid].storage_handler
+                expected_data = numpy.repeat(numpy.arange(1, 5, dtype=numpy.uint32), 2)[:, numpy.newaxis] * numpy.ones((1, 8), numpy.uint32)
+                self.assertTrue(numpy.array_equal(expected_data, numpy.array(storage_handler.read_data())))
+            document_model = profile_context.create_document_model(auto_close=False)
+            with contextlib.closing(document_model):
+                self.assertTrue(numpy.array_equal(expected_data, document_model.data_items[0].data))
+
     def test_writing_empty_data_item_returns_expected_values(self):
         with create_temp_profile_context() as profile_context:
             document_model = profile_context.create_document_model(auto_close=False)
@@ -3338,6 +3355,44 @@ class TestStorageClass(unittest.TestCase):
                     data_item.close()
                 self.assertEqual("Title", document_model.data_items[0].title)
 
+    def test_auto_migrate_copies_data_items_in_parallel_and_reports_progress(self):
+        with create_temp_profile_context() as profile_context:
+            deleted_uuid_str = str(uuid.uuid4())
+            # construct workspace with old files
+            library_path = profile_context.projects_dir / "Nion Swift Workspace.nslib"
+            data_path = profile_context.projects_dir / "Nion Swift Data"
+            with library_path.open("w") as fp:
+                json.dump({"data_item_deletions": [deleted_uuid_str]}, fp)
+            src_uuid_strs = [str(uuid.uuid4()) for i in range(8)]
+            for index, src_uuid_str in enumerate(src_uuid_strs + [deleted_uuid_str]):
+                data_item_dict = dict()
+                data_item_dict["uuid"] = src_uuid_str
+                data_item_dict["version"] = 9
+                data_source_dict = dict()
+                data_source_dict["uuid"] = str(uuid.uuid4())
+                data_source_dict["type"] = "buffered-data-source"
+                data_source_dict["title"] = "Title" + str(index)
+                data_source_dict["displays"] = [{"uuid": str(uuid.uuid4())}]
+                data_source_dict["data_dtype"] = str(numpy.dtype(numpy.uint32))
+                data_source_dict["data_shape"] = (8, 8)
+                data_item_dict["data_sources"] = [data_source_dict]
+                file_handler = profile_context._file_handlers[0]
+                handler = file_handler(pathlib.Path(data_path, "File" + str(index)).with_suffix(file_handler.get_extension()))
+                with contextlib.closing(handler):
+                    handler.write_properties(data_item_dict, datetime.datetime.utcnow())
+                    handler.write_data(numpy.zeros((8,8)), datetime.datetime.utcnow())
+            # migrate the workspace
+            progress = list()
+            document_model = profile_context.create_document_model(auto_close=False)
+            with contextlib.closing(document_model):
+                project_storage_system = document_model._project.project_storage_system
+                FileStorageSystem.migrate_to_latest(project_storage_system, progress_fn=lambda n, count: progress.append((n, count)))
+                data_items = project_storage_system.find_data_items()
+                self.assertEqual(set(src_uuid_strs), {data_item.read_properties()["uuid"] for data_item in data_items})
+                for data_item in data_items:
+                    data_item.close()
+            self.assertEqual([(i + 1, len(src_uuid_strs)) for i in range(len(src_uuid_strs))], progress)
+
     # there is no defined migration for data item references
     @unittest.expectedFailure
     def test_auto_migrate_connects_data_references_in_migrated_data(self):
@@ -4196,6 +4251,214 @@ class TestStorageClass(unittest.TestCase):
                 self.assertIsNotNone(document_model.data_items[0].r_var)
             self.assertEqual(0, len(DocumentModel.MappedItemManager().item_map.keys()))
 
+    def test_properties_writer_coalesces_requests_and_flushes_latest_state(self):
+        written = list()
+        state = {"value": 0}
+        event = threading.Event()
+
+        def write():
+            event.wait(5.0)
+            written.append(state["value"])
+
+        properties_writer = FileStorageSystem.PropertiesWriter(write, 0.0)
+        properties_writer.request_write()
+        for i in range(1, 100):
+            state["value"] = i
+            properties_writer.request_write()
+        event.set()
+        properties_writer.close()
+        self.assertLessEqual(len(written), 2)
+        self.assertEqual(99, written[-1])
+        # requests after closing are written immediately
+        state["value"] = 100
+        properties_writer.request_write()
+        self.assertEqual(100, written[-1])
+
+    def test_file_project_storage_system_writes_project_properties_by_close(self):
+        with create_temp_profile_context() as profile_context:
+            project_path = profile_context.projects_dir / "Writer.nsproj"
+            storage_system = FileStorageSystem.FileProjectStorageSystem(project_path)
+            storage_system.load_properties()
+            with contextlib.closing(storage_system):
+                with storage_system._properties_lock:
+                    storage_system.get_storage_properties()["title"] = "One"
+                storage_system._write_properties()
+                storage_system.flush()
+                self.assertEqual("One", json.loads(project_path.read_text())["title"])
+                with storage_system._properties_lock:
+                    storage_system.get_storage_properties()["title"] = "Two"
+                storage_system._write_properties()
+            self.assertEqual("Two", json.loads(project_path.read_text())["title"])
+
+    def test_journaled_project_storage_system_replays_journal_onto_project_file(self):
+        with create_temp_profile_context() as profile_context:
+            project_path = profile_context.projects_dir / "Journal.nsproj"
+            item1_d = {"uuid": str(uuid.uuid4()), "title": "1"}
+            item2_d = {"uuid": str(uuid.uuid4()), "title": "2"}
+            item3_d = {"uuid": str(uuid.uuid4()), "title": "3"}
+            project_path.write_text(json.dumps({"title": "A", "display_items": [item1_d, item2_d]}))
+            journal_lines = [
+                json.dumps(FileStorageSystem.JournaledFileProjectStorageSystem.get_journal_header(project_path)),
+                json.dumps([{"type": "property", "name": "title", "value": "B"}]),
+                json.dumps([{"type": "item", "relationship": "display_items", "uuid": item3_d["uuid"], "properties": item3_d},
+                            {"type": "order", "relationship": "display_items", "uuids": [item3_d["uuid"], item1_d["uuid"], item2_d["uuid"]]}]),
+                json.dumps([{"type": "item", "relationship": "display_items", "uuid": item1_d["uuid"], "properties": dict(item1_d, title="11")},
+                            {"type": "remove", "relationship": "display_items", "uuid": item2_d["uuid"]}]),
+                json.dumps([{"type": "property", "name": "title", "value": "C"}])[:-8],  # incomplete last line
+            ]
+            FileStorageSystem.JournaledFileProjectStorageSystem.get_journal_path(project_path).write_text("\n".join(journal_lines))
+            storage_system = FileStorageSystem.make_index_project_storage_system(project_path)
+            self.assertIsInstance(storage_system, FileStorageSystem.JournaledFileProjectStorageSystem)
+            storage_system.load_properties()
+            with contextlib.closing(storage_system):
+                properties = storage_system.get_storage_properties()
+                self.assertEqual("B", properties["title"])
+                self.assertEqual(["3", "11"], [item_d["title"] for item_d in properties["display_items"]])
+            # closing compacts the journal into the project file, leaving only the header
+            journal_text = FileStorageSystem.JournaledFileProjectStorageSystem.get_journal_path(project_path).read_text()
+            self.assertEqual([FileStorageSystem.JournaledFileProjectStorageSystem.get_journal_header(project_path)],
+                             [json.loads(line) for line in journal_text.splitlines()])
+            properties = json.loads(project_path.read_text())
+            self.assertEqual("B", properties["title"])
+            self.assertEqual(["3", "11"], [item_d["title"] for item_d in properties["display_items"]])
+
+    def test_journaled_project_storage_system_discards_journal_of_replaced_project_file(self):
+        with create_temp_profile_context() as profile_context:
+            project_path = profile_context.projects_dir / "Journal.nsproj"
+            journal_path = FileStorageSystem.JournaledFileProjectStorageSystem.get_journal_path(project_path)
+            project_path.write_text(json.dumps({"title": "A"}))
+            journal_lines = [
+                json.dumps(FileStorageSystem.JournaledFileProjectStorageSystem.get_journal_header(project_path)),
+                json.dumps([{"type": "property", "name": "title", "value": "B"}]),
+            ]
+            journal_path.write_text("\n".join(journal_lines) + "\n")
+            # replace the project file, for instance by restoring a backup, without touching the journal
+            project_path.write_text(json.dumps({"title": "Replaced"}))
+            storage_system = FileStorageSystem.make_index_project_storage_system(project_path)
+            storage_system.load_properties()
+            with contextlib.closing(storage_system):
+                self.assertEqual("Replaced", storage_system.get_storage_properties()["title"])
+            self.assertEqual(0, journal_path.stat().st_size)
+            self.assertEqual("Replaced", json.loads(project_path.read_text())["title"])
+
+    def test_journaled_project_storage_system_replays_changes_made_after_rewriting_project_file(self):
+        with create_temp_profile_context() as profile_context:
+            project_path = profile_context.projects_dir / "Journal.nsproj"
+            project_path.write_text(json.dumps({"title": "A"}))
+            storage_system = FileStorageSystem.JournaledFileProjectStorageSystem(project_path)
+            storage_system.load_properties()
+            with contextlib.closing(storage_system):
+                root = Persistence.PersistentObject()
+                root.persistent_dict = storage_system.get_storage_properties()
+                storage_system.set_property(root, "title", "B")
+                # rewrite the project file outside of compaction, as migration does, then append to the journal
+                storage_system._migrate_library_properties({"title": "B", "caption": "C"}, list())
+                storage_system.set_property(root, "title", "D")
+                # reload without closing, which would compact the journal
+                reload_storage_system = FileStorageSystem.make_index_project_storage_system(project_path)
+                reload_storage_system.load_properties()
+                properties = reload_storage_system.get_storage_properties()
+                self.assertEqual("D", properties["title"])
+                self.assertEqual("C", properties["caption"])
+
+    def test_journaled_project_changes_reload_without_rewriting_project_file(self):
+        journal_project_properties = FileStorageSystem.journal_project_properties
+        FileStorageSystem.journal_project_properties = True
+        try:
+            with create_temp_profile_context() as profile_context:
+                project_path = profile_context.projects_dir / "Project.nsproj"
+                journal_path = FileStorageSystem.JournaledFileProjectStorageSystem.get_journal_path(project_path)
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    data_item = DataItem.DataItem(numpy.ones((16, 16), numpy.uint32))
+                    document_model.append_data_item(data_item)
+                    document_model.append_data_item(DataItem.DataItem(numpy.ones((8, 8), numpy.uint32)))
+                    display_item = document_model.get_display_item_for_data_item(data_item)
+                    display_item.display_type = "line_plot"
+                    display_item.add_graphic(Graphics.RectangleGraphic())
+                    document_model.remove_data_item(document_model.data_items[1])
+                    project_text = project_path.read_text()
+                    self.assertNotIn("line_plot", project_text)
+                    self.assertIn("line_plot", journal_path.read_text())
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    self.assertEqual(1, len(document_model.data_items))
+                    self.assertEqual(1, len(document_model.display_items))
+                    self.assertEqual("line_plot", document_model.display_items[0].display_type)
+                    self.assertEqual(1, len(document_model.display_items[0].graphics))
+        finally:
+            FileStorageSystem.journal_project_properties = journal_project_properties
+
+    def test_project_open_reads_only_changed_data_files(self):
+        racy_interval = FileStorageSystem.DataPropertiesManifest.racy_interval
+        read_properties = NDataHandler.NDataHandler.read_properties
+        read_file_paths = list()
+
+        def counting_read_properties(storage_handler):
+            read_file_paths.append(storage_handler.reference)
+            return read_properties(storage_handler)
+
+        FileStorageSystem.DataPropertiesManifest.racy_interval = 0.0
+        NDataHandler.NDataHandler.read_properties = counting_read_properties
+        try:
+            with create_temp_profile_context() as profile_context:
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    data_item1 = DataItem.DataItem(numpy.zeros((8, 8)))
+                    data_item1.title = "one"
+                    document_model.append_data_item(data_item1)
+                    data_item2 = DataItem.DataItem(numpy.zeros((8, 8)))
+                    data_item2.title = "two"
+                    document_model.append_data_item(data_item2)
+                    data_file_path1 = data_item1._test_get_file_path()
+                    data_file_path2 = data_item2._test_get_file_path()
+                # the first open reads every file and records them in the manifest
+                read_file_paths.clear()
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    self.assertEqual({"one", "two"}, {data_item.title for data_item in document_model.data_items})
+                self.assertEqual({data_file_path1, data_file_path2}, set(read_file_paths))
+                # change one file outside of the project, changing its modified time
+                handler = NDataHandler.NDataHandler(data_file_path2)
+                properties = handler.read_properties()
+                properties["title"] = "two changed"
+                handler.write_properties(properties, datetime.datetime.now() + datetime.timedelta(minutes=1))
+                handler.close()
+                # the next open reads only the changed file
+                read_file_paths.clear()
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    self.assertEqual({"one", "two changed"}, {data_item.title for data_item in document_model.data_items})
+                self.assertEqual([data_file_path2], read_file_paths)
+        finally:
+            NDataHandler.NDataHandler.read_properties = read_properties
+            FileStorageSystem.DataPropertiesManifest.racy_interval = racy_interval
+
+    def test_project_open_reads_data_files_rewritten_in_place_with_same_size_and_modified_time(self):
+        racy_interval = FileStorageSystem.DataPropertiesManifest.racy_interval
+        FileStorageSystem.DataPropertiesManifest.racy_interval = 0.0
+        try:
+            with create_temp_profile_context() as profile_context:
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    data_item = DataItem.DataItem(numpy.zeros((8, 8)))
+                    data_item.title = "one"
+                    document_model.append_data_item(data_item)
+                    data_file_path = data_item._test_get_file_path()
+                # the first open records the file in the manifest
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    data_item = document_model.data_items[0]
+                    file_key = FileStorageSystem.DataPropertiesManifest.get_file_key(data_file_path)
+                    # rewrite the properties in place; the file size and modified time do not change
+                    data_item.title = "two"
+                    self.assertEqual(file_key, FileStorageSystem.DataPropertiesManifest.get_file_key(data_file_path))
+                document_model = profile_context.create_document_model(auto_close=False)
+                with contextlib.closing(document_model):
+                    self.assertEqual("two", document_model.data_items[0].title)
+        finally:
+            FileStorageSystem.DataPropertiesManifest.racy_interval = racy_interval
+
     def disabled_test_document_controller_disposes_threads(self):
         thread_count = threading.activeCount()
         with TestContext.create_memory_context() as test_context:
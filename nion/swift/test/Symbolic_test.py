@@ -4,7 +4,9 @@ import copy
 import logging
 import random
 import threading
+import time
 import unittest
+import unittest.mock
 import uuid
 
 # third party libraries
@@ -26,6 +28,7 @@ from nion.swift.model import Utility
 from nion.swift.test import TestContext
 from nion.ui import TestUI
 from nion.utils import Geometry
+from nion.utils import Recorder
 
 
 Facade.initialize()
@@ -430,6 +433,97 @@ class TestSymbolicClass(unittest.TestCase):
             data_and_metadata = DocumentModel.evaluate_data(computation)
             self.assertTrue(numpy.array_equal(data_and_metadata.data, -data))
 
+    def test_computation_with_target_applies_data_and_changed_properties_to_target(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data = numpy.ones((2, 2), numpy.double)
+            data_item = DataItem.DataItem(data)
+            document_model.append_data_item(data_item)
+            computed_data_item = DataItem.DataItem(numpy.zeros((2, 2), numpy.double))
+            computed_data_item.caption = "caption"
+            document_model.append_data_item(computed_data_item)
+            computation = document_model.create_computation("target.xdata = -a.xdata\ntarget.title = 'Negated'\ntarget.set_metadata({'a': target.title})")
+            computation.create_input_item("a", Symbolic.make_item(data_item))
+            document_model.set_data_item_computation(computed_data_item, computation)
+            document_model.recompute_all()
+            self.assertTrue(numpy.array_equal(computed_data_item.data, -data))
+            self.assertEqual("Negated", computed_data_item.title)
+            self.assertEqual({"a": "Negated"}, computed_data_item.metadata)
+            self.assertEqual("caption", computed_data_item.caption)
+
+    def test_computation_with_target_applies_changes_in_order(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.ones((2, 2), numpy.double))
+            document_model.append_data_item(data_item)
+            computed_data_item = DataItem.DataItem(numpy.zeros((2, 2), numpy.double))
+            document_model.append_data_item(computed_data_item)
+            # the metadata is replaced by setting the data afterwards, the intensity calibration is set afterwards.
+            computation = document_model.create_computation("target.set_metadata({'a': 1})\ntarget.xdata = -a.xdata\ntarget.set_intensity_calibration(api.create_calibration(units='b'))")
+            computation.create_input_item("a", Symbolic.make_item(data_item))
+            document_model.set_data_item_computation(computed_data_item, computation)
+            document_model.recompute_all()
+            self.assertEqual(dict(), computed_data_item.metadata)
+            self.assertEqual("b", computed_data_item.intensity_calibration.units)
+
+    def test_computation_with_target_does_not_clone_target_data_item(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.ones((2, 2), numpy.double))
+            document_model.append_data_item(data_item)
+            computed_data_item = DataItem.DataItem(numpy.zeros((2, 2), numpy.double))
+            document_model.append_data_item(computed_data_item)
+            computation = document_model.create_computation("target.xdata = -a.xdata\ntarget.title = 'Negated'")
+            computation.create_input_item("a", Symbolic.make_item(data_item))
+            document_model.set_data_item_computation(computed_data_item, computation)
+            with unittest.mock.patch.object(DataItem.DataItem, "clone") as clone_mock:
+                document_model.recompute_all()
+            clone_mock.assert_not_called()
+            self.assertEqual("Negated", computed_data_item.title)
+            self.assertTrue(numpy.array_equal(computed_data_item.data, -numpy.ones((2, 2))))
+
+    def test_evaluating_computation_into_target_is_faster_than_into_recorded_clone(self):
+        # benchmark the throughput of evaluate_with_target for a pick computation, comparing the target used by the
+        # computation queue with the clone and recorder it used previously. both include merging into the data item.
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.random.randn(16, 16, 1024))
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            pick_data_item = document_model.get_pick_new(display_item, display_item.data_item)
+            document_model.recompute_all()
+            computation = document_model.get_data_item_computation(pick_data_item)
+            api = Facade.get_api("~1.0", "~1.0")
+
+            def evaluate_into_recorded_clone():
+                data_item_clone = pick_data_item.clone()
+                data_item_clone_recorder = Recorder.Recorder(data_item_clone)
+                with contextlib.closing(data_item_clone_recorder):
+                    api_data_item = api._new_api_object(data_item_clone)
+                    computation.evaluate_with_target(api, api_data_item)
+                    with pick_data_item.data_item_changes(), pick_data_item.data_source_changes():
+                        pick_data_item.set_xdata(api_data_item.data_and_metadata)
+                        data_item_clone_recorder.apply(pick_data_item)
+
+            def evaluate_into_target():
+                data_item_target = DataItem.DataItemTarget(pick_data_item)
+                computation.evaluate_with_target(api, api._new_api_object(data_item_target))
+                with pick_data_item.data_item_changes(), pick_data_item.data_source_changes():
+                    data_item_target.apply(pick_data_item)
+
+            def measure(fn, count=100):
+                start_time = time.perf_counter()
+                for _ in range(count):
+                    fn()
+                return count / (time.perf_counter() - start_time)
+
+            measure(evaluate_into_recorded_clone, 10)
+            measure(evaluate_into_target, 10)
+            clone_throughput = measure(evaluate_into_recorded_clone)
+            target_throughput = measure(evaluate_into_target)
+            logging.debug(f"evaluate_with_target: clone {clone_throughput:.0f}/s, target {target_throughput:.0f}/s")
+            self.assertGreater(target_throughput, clone_throughput)
+
     def test_computation_fires_needs_update_event_when_data_changes(self):
         with TestContext.create_memory_context() as test_context:
             document_model = test_context.create_document_model()
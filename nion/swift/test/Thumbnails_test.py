@@ -2,12 +2,14 @@
 import numpy
 import logging
 import threading
+import time
 import unittest
 
 # local libraries
 from nion.swift import Application
 from nion.swift import DataItemThumbnailWidget
 from nion.swift import MimeTypes
+from nion.swift import Thumbnails
 from nion.swift.model import DataItem
 from nion.swift.test import TestContext
 from nion.ui import TestUI
@@ -45,6 +47,55 @@ class TestThumbnailsClass(unittest.TestCase):
             self.assertIsNotNone(thumbnail)
             self.assertTrue(mime_data.has_format(MimeTypes.DISPLAY_ITEM_MIME_TYPE))
 
+    def test_thumbnail_data_is_compressed_and_decoded_unchanged(self):
+        thumbnail_data = numpy.zeros((256, 256), dtype=numpy.uint32)
+        thumbnail_data[64:128, 32:96] = 0xFF336699
+        encoded_thumbnail_data = Thumbnails.encode_thumbnail_data(thumbnail_data)
+        self.assertLess(len(encoded_thumbnail_data["data"]), thumbnail_data.nbytes)
+        decoded_thumbnail_data = Thumbnails.decode_thumbnail_data(encoded_thumbnail_data)
+        self.assertEqual(thumbnail_data.dtype, decoded_thumbnail_data.dtype)
+        self.assertTrue(numpy.array_equal(thumbnail_data, decoded_thumbnail_data))
+        # uncompressed thumbnails from older caches are still accepted
+        self.assertIs(thumbnail_data, Thumbnails.decode_thumbnail_data(thumbnail_data))
+        self.assertIsNone(Thumbnails.decode_thumbnail_data(None))
+
+    def test_thumbnail_scheduler_recomputes_highest_priority_first(self):
+
+        class ThumbnailProcessor:
+            def __init__(self, name, priority, started=None, event=None):
+                self.name = name
+                self.priority = priority
+                self.started = started
+                self.event = event
+
+            def recompute_data(self, ui):
+                recomputed.append(self.name)
+                if self.started:
+                    self.started.set()
+                if self.event:
+                    self.event.wait(5.0)
+
+        recomputed = list()
+        max_workers = Thumbnails.ThumbnailScheduler.max_workers
+        Thumbnails.ThumbnailScheduler.max_workers = 1
+        try:
+            thumbnail_scheduler = Thumbnails.ThumbnailScheduler()
+            started = threading.Event()
+            event = threading.Event()
+            current_time = time.time()
+            thumbnail_scheduler.schedule(ThumbnailProcessor("blocking", 0, started, event), None, current_time)
+            self.assertTrue(started.wait(5.0))
+            thumbnail_scheduler.schedule(ThumbnailProcessor("a", 1), None, current_time)
+            thumbnail_scheduler.schedule(ThumbnailProcessor("b", 3), None, current_time)
+            thumbnail_scheduler.schedule(ThumbnailProcessor("c", 2), None, current_time)
+            event.set()
+            start_time = time.time()
+            while len(recomputed) < 4 and time.time() - start_time < 5.0:
+                time.sleep(0.01)
+            self.assertEqual(["blocking", "b", "c", "a"], recomputed)
+        finally:
+            Thumbnails.ThumbnailScheduler.max_workers = max_workers
+
 
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.DEBUG)
@@ -0,0 +1,71 @@
+import typing
+
+from .Pickler import Unpickler
+
+
+class Batch:
+    """Collect remote operations and run them in a single request with a single hop to the UI thread.
+
+    Each operation method returns the index of its result in the list returned by execute. Operations run in order;
+    the first operation to fail stops the batch and execute raises its error.
+
+    Example::
+
+        batch = nionlib.Batch()
+        for data_item in data_items:
+            batch.get_property(data_item, "title")
+        titles = batch.execute()
+    """
+
+    def __init__(self, proxy=None):
+        self.__proxy = proxy
+        self.__operations = list()
+
+    def __add_operation(self, kind: str, target, name: typing.Optional[str], args: typing.Sequence, kwargs: typing.Mapping) -> int:
+        if self.__proxy is None:
+            self.__proxy = target._proxy
+        self.__operations.append((kind, target, name, tuple(args), dict(kwargs)))
+        return len(self.__operations) - 1
+
+    def call_method(self, target, method_name: str, *args, **kwargs) -> int:
+        return self.__add_operation("call_method", target, method_name, args, kwargs)
+
+    def get_property(self, target, property_name: str) -> int:
+        return self.__add_operation("get_property", target, property_name, (), {})
+
+    def set_property(self, target, property_name: str, value) -> int:
+        return self.__add_operation("set_property", target, property_name, (value,), {})
+
+    def get_properties(self, target, property_names: typing.Optional[typing.Sequence[str]] = None) -> int:
+        """Add an operation returning a dict of property values, by default the simple properties of the target."""
+        return self.__add_operation("get_properties", target, None, (list(property_names) if property_names is not None else None,), {})
+
+    def execute(self) -> typing.List:
+        """Run the collected operations and return the list of their results. The batch is empty afterwards."""
+        operations = self.__operations
+        self.__operations = list()
+        if not operations:
+            return list()
+        return Unpickler.call(self.__proxy, "call_batch", operations)
+
+
+def snapshot(targets: typing.Iterable, property_names: typing.Optional[typing.Sequence[str]] = None) -> None:
+    """Fetch the simple properties of each target in one batch and serve later reads of them from the snapshot.
+
+    Simple properties are released properties with plain values such as titles, metadata, calibrations or graphic
+    bounds; data is never included. Reads of a snapshot property do not go to the server until clear_snapshot is
+    called, so they do not reflect later changes made by other methods or by the user. Setting a property through
+    the target removes it from the snapshot.
+    """
+    targets = list(targets)
+    batch = Batch()
+    for target in targets:
+        batch.get_properties(target, property_names)
+    for target, properties in zip(targets, batch.execute()):
+        target._snapshot = properties
+
+
+def clear_snapshot(targets: typing.Iterable) -> None:
+    """Remove the snapshot from each target so that property reads go to the server again."""
+    for target in targets:
+        target._snapshot = None
@@ -7,9 +7,15 @@ def call_threadsafe_method(target, method_name, *args, **kwargs):
     return Unpickler.call_threadsafe_method(target._proxy, target, method_name, *args, **kwargs)
 
 def get_property(target, property_name):
+    snapshot = getattr(target, "_snapshot", None)
+    if snapshot and property_name in snapshot:
+        return snapshot[property_name]
     return Unpickler.get_property(target._proxy, target, property_name)
 
 def set_property(target, property_name, value):
+    snapshot = getattr(target, "_snapshot", None)
+    if snapshot:
+        snapshot.pop(property_name, None)
     return Unpickler.set_property(target._proxy, target, property_name, value)
 
 
@@ -1,8 +1,11 @@
-import base64
+import copy
 import io
 import pickle
 import typing
-import xmlrpc.client
+
+import numpy
+
+from nion.swift.model import RemoteTransport
 
 
 all_classes = None  # type: typing.List
@@ -10,13 +13,29 @@ all_structs = None  # type: typing.List
 struct_names = None  # type: typing.Mapping[typing.Any, str]
 
 
+def is_extended_data_struct(struct) -> bool:
+    return struct_names.get(struct, struct.__name__) == "ExtendedData"
+
+
 class Pickler(pickle.Pickler):
 
+    def __init__(self, file, shared_paths: typing.Optional[typing.List[str]] = None, buffers: typing.Optional[typing.List] = None):
+        if buffers is not None and RemoteTransport.rpc_out_of_band:
+            super().__init__(file, protocol=RemoteTransport.rpc_pickle_protocol, buffer_callback=buffers.append)
+        else:
+            super().__init__(file)
+        # large arrays are only shared in files when the caller collects the paths to remove any the receiver skips.
+        self.__shared_paths = shared_paths
+        # when arrays can travel as out of band buffers, pass extended data arrays directly instead of encoding them.
+        self.__inline_arrays = buffers is not None and RemoteTransport.rpc_out_of_band
+
     @classmethod
-    def pickle(cls, x):
+    def dumps(cls, x, shared_paths: typing.Optional[typing.List[str]] = None) -> typing.Tuple[bytes, typing.List]:
+        """Pickle x for the binary rpc transport, returning the pickle and its out of band buffers."""
         f = io.BytesIO()
-        Pickler(f).dump(x)
-        return base64.b64encode(f.getvalue()).decode('utf-8')
+        buffers = list()
+        Pickler(f, shared_paths, buffers).dump(x)
+        return f.getvalue(), buffers
 
     def persistent_id(self, obj: typing.Any):
         for class_ in all_classes:
@@ -24,47 +43,70 @@ class Pickler(pickle.Pickler):
                 return class_.__name__, getattr(obj, "specifier")
         for struct in all_structs:
             if isinstance(obj, struct):
+                if is_extended_data_struct(struct):
+                    data = obj.data
+                    if self.__inline_arrays or RemoteTransport.is_shared_array(data):
+                        return RemoteTransport.shared_extended_data_type_tag, self.__make_shared_extended_data_dict(obj, data)
                 return struct_names.get(struct, struct.__name__), obj.rpc_dict
         return None
 
+    def __is_shared_array(self, data) -> bool:
+        return self.__shared_paths is not None and RemoteTransport.is_shared_array(data)
+
+    def __make_shared_extended_data_dict(self, xdata, data: numpy.ndarray) -> dict:
+        # the persistent id is pickled without persistent ids, so it must be made of plain python values only.
+        if self.__is_shared_array(data):
+            handle = RemoteTransport.share_array(data)
+            self.__shared_paths.append(handle["path"])
+            d = {"data": handle}
+        else:
+            d = {"data": data}
+        if xdata.intensity_calibration:
+            d["intensity_calibration"] = xdata.intensity_calibration.rpc_dict
+        if xdata.dimensional_calibrations:
+            d["dimensional_calibrations"] = [dimensional_calibration.rpc_dict for dimensional_calibration in xdata.dimensional_calibrations]
+        if xdata.timestamp:
+            d["timestamp"] = xdata.timestamp
+        if xdata.metadata:
+            d["metadata"] = copy.deepcopy(xdata.metadata)
+        return d
+
 
 class Unpickler(pickle.Unpickler):
 
-    def __init__(self, file, proxy):
-        super().__init__(file)
+    def __init__(self, file, proxy, buffers: typing.Optional[typing.Sequence] = None):
+        if buffers is not None and RemoteTransport.rpc_out_of_band:
+            super().__init__(file, buffers=buffers)
+        else:
+            super().__init__(file)
         self.__proxy = proxy
 
     @classmethod
-    def unpickle(cls, proxy, x):
-        return cls(io.BytesIO(base64.b64decode(x.encode('utf-8'))), proxy).load()
+    def call(cls, proxy, function_name: str, request: typing.Tuple) -> typing.Any:
+        """Call the remote function with the request tuple and return the unpickled result."""
+        shared_paths = list()
+        try:
+            body, buffers = Pickler.dumps(request, shared_paths)
+            result_body, result_buffers = proxy.call(function_name, body, buffers)
+            return cls(io.BytesIO(result_body), proxy, result_buffers).load()
+        finally:
+            RemoteTransport.remove_shared_arrays(shared_paths)
 
     @classmethod
     def call_method(cls, proxy, object, method, *args, **kwargs):
-        try:
-            return Unpickler.unpickle(proxy, proxy.call_method(Pickler.pickle(object), method, Pickler.pickle(args), Pickler.pickle(kwargs)))
-        except xmlrpc.client.Fault as e:
-            error_type, error_string = e.faultString.split(":", 1)
-            if error_type == "<class 'TimeoutError'>":
-                raise TimeoutError(error_string) from None
-            raise
+        return Unpickler.call(proxy, "call_method", (object, method, args, kwargs))
 
     @classmethod
     def call_threadsafe_method(cls, proxy, object, method, *args, **kwargs):
-        try:
-            return Unpickler.unpickle(proxy, proxy.call_method_threadsafe(Pickler.pickle(object), method, Pickler.pickle(args), Pickler.pickle(kwargs)))
-        except xmlrpc.client.Fault as e:
-            error_type, error_string = e.faultString.split(":", 1)
-            if error_type == "<class 'TimeoutError'>":
-                raise TimeoutError(error_string) from None
-            raise
+        return Unpickler.call(proxy, "call_threadsafe_method", (object, method, args, kwargs))
 
     @classmethod
     def get_property(cls, proxy, object: typing.Any, name: str) -> typing.Any:
-        return Unpickler.unpickle(proxy, proxy.get_property(Pickler.pickle(object), name))
+        return Unpickler.call(proxy, "get_property", (object, name))
 
     @classmethod
     def set_property(cls, proxy, object: typing.Any, name: str, value: typing.Any) -> None:
-        proxy.set_property(Pickler.pickle(object), name, Pickler.pickle(value))
+        Unpickler.call(proxy, "set_property", (object, name, value))
 
     def persistent_load(self, pid):
         type_tag, d = pid
@@ -74,6 +116,11 @@ class Unpickler(pickle.Unpickler):
         for struct in all_structs:
             if type_tag == struct_names.get(struct, struct.__name__):
                 return struct.from_rpc_dict(d)
+        if type_tag == RemoteTransport.shared_extended_data_type_tag:
+            for struct in all_structs:
+                if is_extended_data_struct(struct):
+                    data = d["data"]
+                    return struct.from_rpc_dict(d, RemoteTransport.load_shared_array(data) if isinstance(data, dict) else data)
 
         # Always raises an error if you cannot return the correct object.
         # Otherwise, the unpickler will think None is the object referenced
@@ -1,11 +1,11 @@
-import xmlrpc.client
-
 from . import Classes
 from . import Pickler
 from . import Structs
+from . import Transport
+from .Batching import Batch, snapshot, clear_snapshot
 
 
-proxy = xmlrpc.client.ServerProxy("http://127.0.0.1:8199/", allow_none=True)
+proxy = Transport.ServerProxy(("127.0.0.1", 8199))
 api = Classes.API(proxy, None)
 
 
@@ -82,10 +82,12 @@ class DataAndCalibration:
         self.metadata = copy.deepcopy(metadata)
 
     @classmethod
-    def from_rpc_dict(cls, d):
+    def from_rpc_dict(cls, d, data=None):
+        """Make data and calibration from the rpc dict, using data if it was transferred out of band."""
         if d is None:
             return None
-        data = numpy.loads(base64.b64decode(d["data"].encode('utf-8')))
+        if data is None:
+            data = numpy.loads(base64.b64decode(d["data"].encode('utf-8')))
         data_shape_and_dtype = data.shape, data.dtype  # TODO: DataAndMetadata from_rpc_dict fails for RGB
         intensity_calibration = Calibration.from_rpc_dict(d.get("intensity_calibration"))
         if "dimensional_calibrations" in d:
@@ -93,7 +95,9 @@ class DataAndCalibration:
         else:
             dimensional_calibrations = None
         metadata = d.get("metadata", {})
-        timestamp = datetime.datetime(*map(int, re.split('[^\d]', d.get("timestamp")))) if "timestamp" in d else None
+        timestamp = d.get("timestamp")
+        if isinstance(timestamp, str):
+            timestamp = datetime.datetime(*map(int, re.split('[^\d]', timestamp)))
         return DataAndCalibration(lambda: data, data_shape_and_dtype, intensity_calibration, dimensional_calibrations, metadata, timestamp)
 
     @property
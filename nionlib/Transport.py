@@ -0,0 +1,87 @@
+import pickle
+import socket
+import threading
+import typing
+
+from nion.swift.model import RemoteTransport
+
+
+class RemoteError(Exception):
+    """An error raised by the remote function, with the remote error type name prefixed to the message."""
+    pass
+
+
+class ServerProxy:
+    """Call functions on the remote server over pooled keep-alive connections.
+
+    Each call takes an idle connection from the pool, or opens a new one, and returns it to the pool afterwards, so
+    calls from several threads run concurrently on separate connections. Connections are opened lazily.
+    """
+
+    def __init__(self, address: typing.Tuple[str, int], max_idle_count: int = 4):
+        self.__address = address
+        self.__max_idle_count = max_idle_count
+        self.__idle_sockets = list()
+        self.__idle_sockets_lock = threading.Lock()
+
+    def close(self) -> None:
+        with self.__idle_sockets_lock:
+            idle_sockets = self.__idle_sockets
+            self.__idle_sockets = list()
+        for sock in idle_sockets:
+            sock.close()
+
+    @property
+    def idle_count(self) -> int:
+        return len(self.__idle_sockets)
+
+    def __acquire_socket(self) -> typing.Tuple[socket.socket, bool]:
+        with self.__idle_sockets_lock:
+            if self.__idle_sockets:
+                return self.__idle_sockets.pop(), True
+        sock = socket.create_connection(self.__address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, False
+
+    def __release_socket(self, sock: socket.socket) -> None:
+        with self.__idle_sockets_lock:
+            if len(self.__idle_sockets) < self.__max_idle_count:
+                self.__idle_sockets.append(sock)
+                return
+        sock.close()
+
+    def call(self, function_name: str, body: bytes, buffers: typing.Sequence = ()) -> typing.Tuple[bytes, typing.List[bytearray]]:
+        """Call the remote function with the pickled body and its out of band buffers.
+
+        Returns the pickled result and its out of band buffers. Raises TimeoutError or RemoteError if the remote
+        function fails."""
+        payload = pickle.dumps((function_name, body))
+        while True:
+            sock, was_idle = self.__acquire_socket()
+            try:
+                RemoteTransport.send_frame(sock, payload, buffers)
+            except ConnectionError:
+                sock.close()
+                # an idle connection may have been closed by the server. the server only runs complete requests, so
+                # retry on another connection.
+                if was_idle:
+                    continue
+                raise
+            except BaseException:
+                sock.close()
+                raise
+            break
+        try:
+            response_payload, response_buffers = RemoteTransport.receive_frame(sock)
+        except BaseException:
+            # the remote function may have run, so the call is not retried.
+            sock.close()
+            raise
+        self.__release_socket(sock)
+        status, value = pickle.loads(response_payload)
+        if status == "error":
+            error_type, error_string = value
+            if error_type == "TimeoutError":
+                raise TimeoutError(error_string)
+            raise RemoteError("{}: {}".format(error_type, error_string))
+        return value, response_buffers